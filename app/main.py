@@ -34,12 +34,33 @@
 
 
 
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.routes import router
+from app.services.structured_logging import REQUEST_ID, configure_logging, get_logger, log_event
+from app.services.job_queue import JobQueueFullError
+from app.services.stage_metrics import STAGE_HEADERS
+from app.services.worker_pool import POOL, PoolSaturatedError
+
+configure_logging()
+logger = get_logger("http")
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    POOL.shutdown()
 
-app = FastAPI(title="Excel Processor API")
+
+app = FastAPI(title="Excel Processor API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -56,10 +77,43 @@ app.add_middleware(
         "X-Rows-Corrected",
         "X-Errors-Count",
         "X-Codes-Fixed",
+        "X-Prepared-Cached",
+        "X-Request-ID",
         "Content-Disposition",
+        *STAGE_HEADERS,
     ],
 )
 
+
+# Correlation ID por request: se toma de X-Request-ID o se genera, y se devuelve en la respuesta
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid4().hex
+    token = REQUEST_ID.set(request_id)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        log_event(
+            logger, logging.INFO, "request",
+            method=request.method, path=request.url.path, status=response.status_code,
+            duration_ms=round((time.perf_counter() - start) * 1000, 2),
+        )
+        return response
+    except Exception:
+        logger.exception("request.error", extra={"fields": {"method": request.method, "path": request.url.path}})
+        raise
+    finally:
+        REQUEST_ID.reset(token)
+
+
+# Pool de workers o cola de jobs llena: 503 para que el cliente reintente
+@app.exception_handler(PoolSaturatedError)
+@app.exception_handler(JobQueueFullError)
+async def pool_saturated_handler(request: Request, exc: RuntimeError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
 app.include_router(router)
 
 @app.get("/")
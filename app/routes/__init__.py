@@ -1,7 +1,11 @@
 from fastapi import APIRouter
 from .upload import router as excel_router
 from .excel_conversion import router as conversion_router
+from .jobs import router as jobs_router
+from .metrics import router as metrics_router
 
 router = APIRouter()
 router.include_router(excel_router)
-router.include_router(conversion_router)
\ No newline at end of file
+router.include_router(conversion_router)
+router.include_router(jobs_router)
+router.include_router(metrics_router)
\ No newline at end of file
@@ -1,15 +1,19 @@
 from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException, Query
 from fastapi.responses import StreamingResponse
+from functools import partial
 import uuid
 import os
 import re
-import io
 
 from app.services.conversion_processor import (
+    analizar_duplicados_conversion,
     generar_excel_conversion_bytes,
-    leer_excel_conversion,
-    ROW_ID_COL
+    validar_excel_conversion,
 )
+from app.services.stage_metrics import observe_stages
+from app.services.excel_writer import OUTPUT_FORMATS, iter_file_chunks, new_output_path, output_filename
+from app.services.worker_pool import POOL, PoolSaturatedError
+from .upload import FORMAT_DESCRIPTION, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, SHEETS_DESCRIPTION, parse_output_params
 
 router = APIRouter(prefix="/conversion", tags=["Conversion Excel"])
 
@@ -43,22 +47,34 @@ async def convertir_excel(
     is_selva: bool = Query(default=False, description="Modo selva (exonerado de IGV)"),
     tienda_nombre: str = Query(default="Tienda1", description="Nombre de la tienda para columna W-TIENDA1"),
     selected_row_ids: str | None = Query(default=None, description="CSV de __ROW_ID__: ej 5,9,12"),
+    sheets: str | None = Query(default=None, description=SHEETS_DESCRIPTION),
+    output_format: str = Query(default="xlsx", alias="format", description=FORMAT_DESCRIPTION),
 ):
+    hojas = parse_output_params(sheets, output_format)
+    content = await file.read()
     input_name = f"input_conv_{uuid.uuid4()}.xlsx"
+    output_path = new_output_path(output_format)
+    # Si falla o el cliente corta, se borran cuando el worker termina
+    cleanup = partial(cleanup_files, input_name, output_path)
     
     try:
         with open(input_name, "wb") as f:
-            f.write(await file.read())
+            f.write(content)
         
         selected_set = _parse_selected_row_ids_csv(selected_row_ids) if selected_row_ids else set()
         
-        excel_bytes, stats = generar_excel_conversion_bytes(
+        _, stats = await POOL.run_with_cleanup(
+            cleanup,
+            generar_excel_conversion_bytes,
             input_path=input_name,
             selected_row_ids=selected_set,
             apply_igv_cost=apply_igv_cost,
             apply_igv_sale=apply_igv_sale,
             is_selva=is_selva,
             tienda_nombre=tienda_nombre,
+            out=output_path,
+            sheets=hojas,
+            output_format=output_format,
         )
         
         background_tasks.add_task(cleanup_files, input_name)
@@ -69,56 +85,83 @@ async def convertir_excel(
             "X-Rows-Corrected": str(stats.get("rows_corrected", "")),
             "X-Errors-Count": str(stats.get("errors_count", "")),
             "X-Codes-Fixed": str(stats.get("codes_fixed", "")),
-            "Content-Disposition": 'attachment; filename="resultado_conversion_QA.xlsx"',
+            "Content-Length": str(os.path.getsize(output_path)),
+            "Content-Disposition": f'attachment; filename="{output_filename("resultado_conversion_QA", output_format)}"',
+            **observe_stages("conversion", stats),
         }
         
+        # El xlsx queda en disco y se envía por bloques (se borra al terminar)
         return StreamingResponse(
-            io.BytesIO(excel_bytes),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            iter_file_chunks(output_path),
+            media_type=OUTPUT_FORMATS[output_format][0],
             headers=headers,
         )
         
+    except PoolSaturatedError:
+        raise
     except Exception as e:
-        cleanup_files(input_name)
+        cleanup()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/validate")
+async def validar_conversion_excel(
+    file: UploadFile = File(...),
+    apply_igv_cost: bool = Query(default=True, description="Aplicar IGV a precio de costo"),
+    apply_igv_sale: bool = Query(default=True, description="Aplicar IGV a precio de venta"),
+    is_selva: bool = Query(default=False, description="Modo selva (exonerado de IGV)"),
+    selected_row_ids: str | None = Query(default=None, description="CSV de __ROW_ID__: ej 5,9,12"),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+):
+    """Solo lectura + limpieza + auditoría: errores paginados y contadores, sin generar Excel."""
+    try:
+        selected_set = _parse_selected_row_ids_csv(selected_row_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    content = await file.read()
+    input_name = f"input_conv_{uuid.uuid4()}.xlsx"
+    # El input se borra recién cuando el worker dejó de leerlo
+    cleanup = partial(cleanup_files, input_name)
+    try:
+        with open(input_name, "wb") as f:
+            f.write(content)
+
+        result = await POOL.run_with_cleanup(
+            cleanup,
+            validar_excel_conversion,
+            input_path=input_name,
+            selected_row_ids=selected_set,
+            apply_igv_cost=apply_igv_cost,
+            apply_igv_sale=apply_igv_sale,
+            is_selva=is_selva,
+            page=page,
+            page_size=page_size,
+        )
+
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        cleanup()
+        raise HTTPException(status_code=500, detail=str(e))
+    cleanup()
+    return result
+
 @router.post("/analyze")
 async def analyze_conversion_excel(
     file: UploadFile = File(...),
 ):
+    content = await file.read()
     input_name = f"input_conv_{uuid.uuid4()}.xlsx"
+    cleanup = partial(cleanup_files, input_name)
     try:
         with open(input_name, "wb") as f:
-            f.write(await file.read())
-        
-        df = leer_excel_conversion(input_name)
-        
-        grupos = []
-        if "NOMBRE DEL PRODUCTO" in df.columns:
-            s = df["NOMBRE DEL PRODUCTO"].astype(str).str.strip()
-            dup_mask = s.ne("") & df["NOMBRE DEL PRODUCTO"].duplicated(keep=False)
-            dups = df.loc[dup_mask]
-            
-            for nombre, grupo in dups.groupby("NOMBRE DEL PRODUCTO"):
-                rows = []
-                for _, row in grupo.iterrows():
-                    row_dict = {}
-                    for col in df.columns[:10]:
-                        row_dict[col] = str(row[col])[:50]
-                    row_dict[ROW_ID_COL] = int(row[ROW_ID_COL])
-                    rows.append(row_dict)
-                
-                grupos.append({
-                    "key": str(nombre),
-                    "count": len(grupo),
-                    "rows": rows
-                })
+            f.write(content)
         
-        return {
-            "has_duplicates": len(grupos) > 0,
-            "groups": grupos,
-            "columns_hint": list(df.columns[:20])
-        }
-        
-    finally:
-        cleanup_files(input_name)
\ No newline at end of file
+        result = await POOL.run_with_cleanup(cleanup, analizar_duplicados_conversion, input_name)
+
+    except Exception:
+        cleanup()
+        raise
+    cleanup()
+    return result
\ No newline at end of file
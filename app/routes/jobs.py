@@ -0,0 +1,177 @@
+import os
+import shutil
+
+from fastapi import APIRouter, File, UploadFile, Query, HTTPException, Body
+from fastapi.responses import FileResponse
+
+from app.services.conversion_processor import generar_excel_conversion_bytes
+from app.services.excel_normalize_service import normalize_excel_bytes
+from app.services.excel_writer import OUTPUT_FORMATS, output_filename
+from app.services.job_queue import create_job_manager
+from app.services.stage_metrics import stage_headers
+from app.services.worker_pool import POOL
+from .excel_conversion import _parse_selected_row_ids_csv
+from .upload import (
+    FORMAT_DESCRIPTION,
+    SHEETS_DESCRIPTION,
+    UPLOAD_EXPIRED,
+    parse_output_params,
+    prepared_inputs,
+    upload_content,
+)
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# Trabajos asíncronos: submit -> status -> result (para catálogos grandes detrás del proxy)
+JOBS = create_job_manager(POOL)
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # Otro sistema de archivos (o sin hard links): copia en disco, no en memoria
+        shutil.copyfile(src, dst)
+
+
+def _accepted(job: dict) -> dict:
+    job_id = job["job_id"]
+    return {
+        **job,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }
+
+
+@router.post("/normalize", status_code=202)
+async def submit_normalize(
+    upload_id: str = Query(...),
+    apply_igv_cost: bool = Query(default=False, description="Aplicar IGV a precio de costo"),
+    apply_igv_sale: bool = Query(default=False, description="Aplicar IGV a precio de venta"),
+    tienda_nombre: str = Query(default="Tienda1", description="Nombre de la tienda para columna W-TIENDA1"),
+    selected_row_ids: list[int] = Body(default=[]),
+    round_numeric: int | None = Query(default=None, description="Ej: 2 para redondear a 2 decimales"),
+    sheets: str | None = Query(default=None, description=SHEETS_DESCRIPTION),
+    output_format: str = Query(default="xlsx", alias="format", description=FORMAT_DESCRIPTION),
+):
+    hojas = parse_output_params(sheets, output_format)
+    # Reutiliza la etapa memoizada; el resultado de un job no la actualiza
+    inputs = {**prepared_inputs(upload_id, selected_row_ids, upload_content(upload_id)), "keep_prepared": False}
+    job_id = JOBS.new_job_id()
+    cleanup = ()
+    if isinstance(inputs["excel_bytes"], str):
+        # Derrame a disco: el job lee su propia copia (hard link si se puede),
+        # que no depende del TTL ni del presupuesto del almacén
+        input_path = JOBS.input_path(job_id)
+        try:
+            _link_or_copy(inputs["excel_bytes"], input_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=400, detail=UPLOAD_EXPIRED)
+        inputs["excel_bytes"], cleanup = input_path, (input_path,)
+
+    job = JOBS.submit(
+        "normalize",
+        normalize_excel_bytes,
+        {
+            "round_numeric": round_numeric,
+            "selected_row_ids": selected_row_ids,
+            "apply_igv_cost": apply_igv_cost,
+            "apply_igv_sale": apply_igv_sale,
+            "tienda_nombre": tienda_nombre,
+            "sheets": hojas,
+            "output_format": output_format,
+            **inputs,
+        },
+        filename=output_filename("archivo_QA", output_format),
+        media_type=OUTPUT_FORMATS[output_format][0],
+        job_id=job_id,
+        cleanup=cleanup,
+    )
+    return _accepted(job)
+
+
+@router.post("/conversion", status_code=202)
+async def submit_conversion(
+    file: UploadFile = File(...),
+    apply_igv_cost: bool = Query(default=True, description="Aplicar IGV a precio de costo"),
+    apply_igv_sale: bool = Query(default=True, description="Aplicar IGV a precio de venta"),
+    is_selva: bool = Query(default=False, description="Modo selva (exonerado de IGV)"),
+    tienda_nombre: str = Query(default="Tienda1", description="Nombre de la tienda para columna W-TIENDA1"),
+    selected_row_ids: str | None = Query(default=None, description="CSV de __ROW_ID__: ej 5,9,12"),
+    sheets: str | None = Query(default=None, description=SHEETS_DESCRIPTION),
+    output_format: str = Query(default="xlsx", alias="format", description=FORMAT_DESCRIPTION),
+):
+    hojas = parse_output_params(sheets, output_format)
+    try:
+        selected_set = _parse_selected_row_ids_csv(selected_row_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_id = JOBS.new_job_id()
+    input_path = JOBS.input_path(job_id)
+    with open(input_path, "wb") as f:
+        f.write(await file.read())
+
+    job = JOBS.submit(
+        "conversion",
+        generar_excel_conversion_bytes,
+        {
+            "input_path": input_path,
+            "selected_row_ids": selected_set,
+            "apply_igv_cost": apply_igv_cost,
+            "apply_igv_sale": apply_igv_sale,
+            "is_selva": is_selva,
+            "tienda_nombre": tienda_nombre,
+            "sheets": hojas,
+            "output_format": output_format,
+        },
+        filename=output_filename("resultado_conversion_QA", output_format),
+        media_type=OUTPUT_FORMATS[output_format][0],
+        job_id=job_id,
+        cleanup=(input_path,),
+    )
+    return _accepted(job)
+
+
+@router.get("/stats")
+async def job_stats():
+    return JOBS.stats()
+
+
+@router.get("/{job_id}")
+async def job_status(job_id: str):
+    job = JOBS.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_id inválido o expirado")
+    return job
+
+
+@router.get("/{job_id}/result")
+async def job_result(job_id: str):
+    job = JOBS.result(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_id inválido o expirado")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"El trabajo no terminó correctamente (estado: {job['status']})")
+
+    stats = job["stats"]
+    headers = {
+        "X-Rows-Before": str(stats.get("rows_before", "")),
+        "X-Rows-OK": str(stats.get("rows_ok", "")),
+        "X-Rows-Corrected": str(stats.get("rows_corrected", "")),
+        "X-Errors-Count": str(stats.get("errors_count", "")),
+        "X-Codes-Fixed": str(stats.get("codes_fixed", "")),
+        # los histogramas ya se actualizaron al terminar el trabajo
+        **stage_headers(stats.get("stages")),
+    }
+    return FileResponse(job["result_path"], media_type=job["media_type"], filename=job["filename"], headers=headers)
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    job = JOBS.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_id inválido o expirado")
+    return job
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.stage_metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Histogramas por etapa (tiempo, filas, memoria) en formato de texto Prometheus."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,74 +1,117 @@
+from functools import partial
 from uuid import uuid4
-import io
+import logging
+import os
 
-from fastapi import APIRouter, File, UploadFile, Query, HTTPException, Body
+from fastapi import APIRouter, File, UploadFile, Query, HTTPException, Body, Response
 from fastapi.responses import StreamingResponse
 
 from app.services.excel_normalize_service import (
+    MissingColumnError,
+    analyze_catalog_bytes,
     normalize_excel_bytes,
-    normalize_to_dataframe,
-    build_duplicate_groups,
+    prepared_key,
+    validate_catalog_bytes,
 )
+from app.services.excel_cleaners import cleaning_cache_stats
+from app.services.free_threading import free_threading_stats
+from app.services.excel_writer import (
+    OUTPUT_FORMATS,
+    cleanup_output,
+    iter_file_chunks,
+    new_output_path,
+    output_filename,
+    parse_sheets_param,
+    resolve_output,
+)
+from app.services.stage_metrics import observe_stages
+from app.services.upload_store import create_upload_store
+from app.services.structured_logging import get_logger, log_event
+from app.services.worker_pool import POOL
 
 router = APIRouter(prefix="/excel", tags=["excel"])
+logger = get_logger("routes.excel")
+
+SHEETS_DESCRIPTION = "CSV de hojas a generar (default: todas): Errores_Detectados,Productos_OK,Productos_Corregidos,productos"
+FORMAT_DESCRIPTION = "xlsx | csv | jsonl | parquet (los tres últimos solo con la plantilla productos)"
+
+
+def parse_output_params(sheets: str | None, output_format: str) -> tuple[str, ...] | None:
+    """Valida sheets= / format= antes de encolar trabajo (400 si no son válidos)."""
+    try:
+        hojas = parse_sheets_param(sheets)
+        resolve_output(hojas, output_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return hojas
+
+
+# Paginación de errores en /validate
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+
+
+# Bytes del Excel + resultado de parse_catalog por upload_id (memoria acotada, TTL, derrame a disco)
+UPLOADS = create_upload_store()
 
-UPLOADS: dict[str, bytes] = {}
+UPLOAD_EXPIRED = "upload_id inválido o expirado"
+
+# Etapa memoizada por upload_id: parseo + limpieza sin toggles (ver prepare_stage)
+PREPARED_STAGE = "prepared"
+
+
+def upload_content(upload_id: str):
+    """
+    Bytes del upload o la ruta de su derrame a disco: la ruta se manda tal
+    cual al worker, que la mapea (no se copia el archivo a la API).
+    """
+    content = UPLOADS.get(upload_id)
+    if content is None:
+        raise HTTPException(status_code=400, detail=UPLOAD_EXPIRED)
+    return content
+
+
+def prepared_inputs(upload_id: str, selected_row_ids: list[int], content) -> dict:
+    """
+    kwargs de entrada para el pipeline: la salida memoizada si se calculó con
+    la misma selección; si no, el intermedio parseado (y se pide la salida de
+    vuelta solo si el upload sigue en memoria para guardarla). Con cualquiera
+    de los dos, los bytes del upload no viajan al worker.
+    """
+    prepared = UPLOADS.get_stage(upload_id, PREPARED_STAGE, prepared_key(selected_row_ids))
+    if prepared is not None:
+        return {"excel_bytes": b"", "prepared": prepared, "parsed": None, "keep_prepared": False}
+    parsed = UPLOADS.get_parsed(upload_id)
+    if parsed is not None:
+        return {"excel_bytes": b"", "prepared": None, "parsed": parsed, "keep_prepared": True}
+    return {"excel_bytes": content, "prepared": None, "parsed": None, "keep_prepared": False}
+
+
+def remember_prepared(upload_id: str, selected_row_ids: list[int], result: dict) -> None:
+    """Saca del resultado la salida de prepare_stage (si vino) y la memoiza."""
+    prepared = result.pop("prepared", None)
+    if prepared is not None:
+        UPLOADS.put_stage(upload_id, PREPARED_STAGE, prepared_key(selected_row_ids), prepared)
 
 
 @router.post("/analyze")
 async def analyze_excel(
+    response: Response,
     file: UploadFile = File(...),
     round_numeric: int | None = Query(default=None, description="Ej: 2 para redondear a 2 decimales"),
 ):
     content = await file.read()
 
-    df_norm, meta, _stats = normalize_to_dataframe(content, round_numeric=round_numeric)
-
-    col_nombre = meta.get("col_nombre")
-    if not col_nombre:
-        raise HTTPException(status_code=400, detail="No se encontró columna NOMBRE")
-
-    ROW_ID_COL = "__ROW_ID__"
-    df_norm[ROW_ID_COL] = range(5, 5 + len(df_norm))
-
-    groups = build_duplicate_groups(df_norm, col_nombre)
-    
-    # Analizar duplicados en CÓDIGO
-    grupos_codigo = []
-    col_codigo = meta.get("col_codigo")
-    if col_codigo and col_codigo in df_norm.columns:
-        codigos = df_norm[col_codigo].astype(str).str.strip()
-        codigos = codigos[codigos.ne("") & codigos.ne("nan")]
-        dup_codigos_mask = codigos.duplicated(keep=False)
-        if dup_codigos_mask.any():
-            dups_codigo = df_norm.loc[dup_codigos_mask]
-            for codigo, grupo in dups_codigo.groupby(col_codigo):
-                rows = []
-                for _, row in grupo.iterrows():
-                    row_dict = {
-                        "fila": int(row[ROW_ID_COL]),
-                        "codigo": str(row[col_codigo]),
-                        "nombre": str(row.get(col_nombre, ""))[:50]
-                    }
-                    rows.append(row_dict)
-                
-                grupos_codigo.append({
-                    "codigo": str(codigo),
-                    "count": len(grupo),
-                    "rows": rows
-                })
+    try:
+        result, parsed = await POOL.run(analyze_catalog_bytes, content, round_numeric=round_numeric)
+    except MissingColumnError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    response.headers.update(observe_stages("analyze", {"stages": result.pop("stages", None)}))
     upload_id = str(uuid4())
-    UPLOADS[upload_id] = content
-
-    return {
-        "upload_id": upload_id,
-        "has_duplicates": len(groups) > 0,
-        "groups": groups,
-        "has_code_duplicates": len(grupos_codigo) > 0,
-        "code_duplicate_groups": grupos_codigo,
-        "columns_hint": list(df_norm.columns),
-    }
+    UPLOADS.put(upload_id, content, parsed=parsed)
+
+    return {"upload_id": upload_id, **result}
 
 
 @router.post("/normalize")
@@ -84,23 +127,37 @@ async def normalize_excel(
 
     selected_row_ids: list[int] = Body(default=[]),
     round_numeric: int | None = Query(default=None, description="Ej: 2 para redondear a 2 decimales"),
-):
-    print("DEBUG /excel/normalize tienda_nombre =", repr(tienda_nombre))
-    if upload_id not in UPLOADS:
-        raise HTTPException(status_code=400, detail="upload_id inválido o expirado")
-
-    content = UPLOADS[upload_id]
-
-    cleaned_bytes, stats = normalize_excel_bytes(
-        excel_bytes=content,
-        round_numeric=round_numeric,
-        selected_row_ids=selected_row_ids,
-        apply_igv_cost=apply_igv_cost,
-        apply_igv_sale=apply_igv_sale,
-        tienda_nombre=tienda_nombre,
-    )
 
-    filename = "archivo_QA.xlsx"
+    # Hojas y formato de salida
+    sheets: str | None = Query(default=None, description=SHEETS_DESCRIPTION),
+    output_format: str = Query(default="xlsx", alias="format", description=FORMAT_DESCRIPTION),
+):
+    log_event(logger, logging.DEBUG, "normalize.request", upload_id=upload_id, tienda_nombre=tienda_nombre)
+    hojas = parse_output_params(sheets, output_format)
+    content = upload_content(upload_id)
+
+    output_path = new_output_path(output_format)
+    try:
+        # Si falla o el cliente corta, el archivo se borra cuando el worker termina
+        _, stats = await POOL.run_with_cleanup(
+            partial(cleanup_output, output_path),
+            normalize_excel_bytes,
+            round_numeric=round_numeric,
+            selected_row_ids=selected_row_ids,
+            apply_igv_cost=apply_igv_cost,
+            apply_igv_sale=apply_igv_sale,
+            tienda_nombre=tienda_nombre,
+            out=output_path,
+            sheets=hojas,
+            output_format=output_format,
+            **prepared_inputs(upload_id, selected_row_ids, content),
+        )
+    except FileNotFoundError:
+        # El derrame se borró (TTL / presupuesto) antes de que el worker lo abriera
+        raise HTTPException(status_code=400, detail=UPLOAD_EXPIRED)
+    remember_prepared(upload_id, selected_row_ids, stats)
+
+    filename = output_filename("archivo_QA", output_format)
 
     headers = {
         "X-Rows-Before": str(stats.get("rows_before", "")),
@@ -108,10 +165,59 @@ async def normalize_excel(
         "X-Rows-Corrected": str(stats.get("rows_corrected", "")),
         "X-Errors-Count": str(stats.get("errors_count", "")),
         "X-Codes-Fixed": str(stats.get("codes_fixed", stats.get("codes_fixed_or_regenerated", ""))),
+        "X-Prepared-Cached": "1" if stats.get("prepared_cached") else "0",
+        "Content-Length": str(os.path.getsize(output_path)),
+        **observe_stages("normalize", stats),
     }
 
+    # El xlsx queda en disco y se envía por bloques (se borra al terminar)
     return StreamingResponse(
-        io.BytesIO(cleaned_bytes),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        iter_file_chunks(output_path),
+        media_type=OUTPUT_FORMATS[output_format][0],
         headers={**headers, "Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+@router.post("/validate")
+async def validate_excel(
+    upload_id: str = Query(...),
+    apply_igv_cost: bool = Query(default=False, description="Aplicar IGV a precio de costo"),
+    apply_igv_sale: bool = Query(default=False, description="Aplicar IGV a precio de venta"),
+    selected_row_ids: list[int] = Body(default=[]),
+    round_numeric: int | None = Query(default=None, description="Ej: 2 para redondear a 2 decimales"),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+):
+    """Solo parseo + limpieza + auditoría: errores paginados y contadores, sin generar Excel."""
+    content = upload_content(upload_id)
+
+    try:
+        result = await POOL.run(
+            validate_catalog_bytes,
+            round_numeric=round_numeric,
+            selected_row_ids=selected_row_ids,
+            apply_igv_cost=apply_igv_cost,
+            apply_igv_sale=apply_igv_sale,
+            page=page,
+            page_size=page_size,
+            **prepared_inputs(upload_id, selected_row_ids, content),
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=400, detail=UPLOAD_EXPIRED)
+    remember_prepared(upload_id, selected_row_ids, result)
+    return {"upload_id": upload_id, **result}
+
+
+@router.get("/uploads/stats")
+async def upload_store_stats():
+    return UPLOADS.stats()
+
+
+@router.get("/cleaning/stats")
+async def cleaning_stats():
+    return cleaning_cache_stats()
+
+
+@router.get("/pool/stats")
+async def worker_pool_stats():
+    return {**POOL.stats(), "free_threading": free_threading_stats()}
@@ -1,16 +1,29 @@
+import numpy as np
 import pandas as pd
 import re
 import secrets
 import string
-import io
-from typing import Set, Tuple, Dict, Optional
+import logging
+from typing import BinaryIO, Callable, Set, Tuple, Dict, Iterable, Optional, Union
 
 from .excel_cleaners import (
     normalize_text_value,
     clean_unit_value,
     IGV_FACTOR,
-    process_product_code  # Añadir esta importación
+    process_product_code,  # Añadir esta importación
+    process_product_codes,
+    product_codes_report,
+    apply_unique,
+    parse_numeric_series,
+    compact_columns,
 )
+from .free_threading import thread_map
+from .excel_audit import REGLAS_CONVERSION, audit_report, run_audit
+from .excel_writer import resolve_output, write_output
+from .stage_metrics import StageRecorder
+from .structured_logging import get_logger, log_event, log_row_samples
+
+logger = get_logger("conversion")
 
 # Constantes
 ROW_ID_COL = "__ROW_ID__"
@@ -37,6 +50,11 @@ def limpiar_valor_numerico(valor, default=0.0) -> float:
         return default
 
 
+def limpiar_valor_numerico_series(serie: pd.Series, default=0.0) -> pd.Series:
+    """limpiar_valor_numerico sobre toda la columna (float64, una sola pasada)."""
+    return parse_numeric_series(serie, default=default, decimal_comma=False, negative_as_default=True)
+
+
 def generar_codigo_automatico(existentes: set) -> str:
     caracteres = string.ascii_uppercase + string.digits
     while True:
@@ -93,6 +111,28 @@ def limpiar_marca_modelo(valor, default="S/M") -> str:
 # ============================================================
 # LECTURA DE EXCEL
 # ============================================================
+def construir_conversiones(df: pd.DataFrame, columnas_conversion: Dict[int, str]) -> np.ndarray:
+    """
+    Columna "conversion" (NOMBRE-NOMBRE-valor#...) armada por columnas:
+    por cada columna de conversión se concatena su parte solo en las filas
+    con valor (no nulo, no vacío, distinto de "NAN").
+    """
+    conversiones = np.full(len(df), "", dtype=object)
+    for col_idx, nombre_conv in columnas_conversion.items():
+        col = df.iloc[:, col_idx]
+        texto = apply_unique(col, str).astype(object)
+        limpio = texto.str.strip()
+        con_valor = (col.notna() & limpio.ne("") & limpio.str.upper().ne("NAN")).to_numpy()
+        if not con_valor.any():
+            continue
+
+        filas = np.flatnonzero(con_valor)
+        prefijo = np.where(conversiones[filas] != "", "#", "").astype(object)
+        parte = f"{nombre_conv}-{nombre_conv}-" + texto.to_numpy()[filas]
+        conversiones[filas] = conversiones[filas] + prefijo + parte
+    return conversiones
+
+
 def leer_excel_conversion(input_path: str) -> pd.DataFrame:
     df_raw = pd.read_excel(input_path, header=None)
     
@@ -115,18 +155,34 @@ def encontrar_columna_exacta(columnas, nombre_buscar):
 
 
 # ============================================================
-# FUNCIÓN PRINCIPAL (EXACTAMENTE IGUAL, solo usa la nueva limpiar_codigo_producto)
+# DF BASE (pasos 1-9, compartido por /conversion/excel y /conversion/validate)
 # ============================================================
-def generar_excel_conversion_bytes(
-    input_path: str, 
+# Campos que audita REGLAS_CONVERSION sobre df_base
+CAMPOS_CONVERSION = {
+    "codigo": {"col": "código"},
+    "nombre": {"col": "nombre"},
+    "categoria": {"col": "categoria"},
+    "stock": {"col": "stock"},
+    "pcost": {"col": "precio costo"},
+    "pventa": {"col": "precio venta"},
+}
+
+
+def construir_df_base(
+    input_path: str,
     selected_row_ids: set[int] = None,
     apply_igv_cost: bool = False,
     apply_igv_sale: bool = False,
     is_selva: bool = False,
     tienda_nombre: str = "Tienda1",
-) -> tuple[bytes, dict]:
-    
+    report: Callable[[str, float], None] = lambda stage, value: None,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Lectura + limpieza + IGV: df_base con el orden final de columnas.
+    Devuelve (df_base, {"rows_before", "codes_fixed", "codigos"}).
+    """
     # 1. Leer Excel
+    report("lectura", 0.05)
     df = leer_excel_conversion(input_path)
     before_rows = len(df)
     
@@ -142,10 +198,10 @@ def generar_excel_conversion_bytes(
     # 3. Crear diccionario de columnas por nombre exacto
     columnas_lista = list(df.columns)
     
-    print("\n=== COLUMNAS ENCONTRADAS ===")
-    for i, col in enumerate(columnas_lista):
-        col_str = str(col) if pd.notna(col) else ""
-        print(f"Columna {i}: '{col_str}'")
+    log_event(
+        logger, logging.DEBUG, "conversion.columnas",
+        columnas=[str(col) if pd.notna(col) else "" for col in columnas_lista],
+    )
     
     # 4. Mapeo de columnas
     mapeo_columnas = {
@@ -173,9 +229,11 @@ def generar_excel_conversion_bytes(
         idx = encontrar_columna_exacta(columnas_lista, nombre_exacto)
         if idx is not None:
             indices_fijos[col_destino] = idx
-            print(f"✅ {nombre_exacto} → {col_destino} (columna {idx})")
-        else:
-            print(f"❌ {nombre_exacto} no encontrada")
+    log_event(
+        logger, logging.DEBUG, "conversion.mapeo",
+        encontradas={mapeo_columnas[k]: i for k, i in indices_fijos.items()},
+        faltantes=[v for k, v in mapeo_columnas.items() if k not in indices_fijos],
+    )
     
     # 5. Identificar columnas de conversión
     idx_precio_lista_3 = encontrar_columna_exacta(columnas_lista, "PRECIO LISTA 3")
@@ -187,17 +245,11 @@ def generar_excel_conversion_bytes(
         if pd.notna(col_name) and str(col_name).strip() and col_name != ROW_ID_COL:
             nombre_limpio = normalize_text_value(col_name).replace(" ", "").replace("-", "")
             columnas_conversion[i] = nombre_limpio
-            print(f"  ✅ Columna conversión {i}: {col_name} → {nombre_limpio}")
+    log_event(logger, logging.DEBUG, "conversion.columnas_conversion", columnas=columnas_conversion)
     
     # 6. Construir conversiones
-    conversiones = []
-    for idx in range(len(df)):
-        partes = []
-        for col_idx, nombre_conv in columnas_conversion.items():
-            valor = df.iloc[idx, col_idx]
-            if pd.notna(valor) and str(valor).strip() and str(valor).strip().upper() != "NAN":
-                partes.append(f"{nombre_conv}-{nombre_conv}-{valor}")
-        conversiones.append("#".join(partes))
+    report("limpieza", 0.3)
+    conversiones = construir_conversiones(df, columnas_conversion)
     
     # 7. Función auxiliar
     def get_series(col_destino, default_value):
@@ -207,26 +259,11 @@ def generar_excel_conversion_bytes(
         else:
             return pd.Series([default_value] * len(df))
     
-    # 8. Limpieza de códigos (AHORA USA LA NUEVA FUNCIÓN)
-    codigos_existentes = set()
-    codigo_series = get_series("código", "")
-    codigos_limpios = []
-    codes_fixed = 0
-    codigos_info = []
-    
-    for idx, valor in enumerate(codigo_series):
-        resultado = process_product_code(valor, codigos_existentes, idx)
-        codigos_limpios.append(resultado["codigo_final"])
-        if resultado["es_generico"]:
-            codes_fixed += 1
-        codigos_info.append({
-            "fila": idx + 5,
-            "original": resultado["codigo_original"],
-            "final": resultado["codigo_final"],
-            "es_generico": resultado["es_generico"],
-            "razon": resultado["razon"]
-        })
-        print(f"  Fila {idx}: '{resultado['codigo_original']}' → '{resultado['codigo_final']}' ({resultado['razon']})")
+    # 8. Limpieza de códigos (por lote, misma lógica que process_product_code)
+    codigos = process_product_codes(get_series("código", ""))
+    codigos_limpios = codigos["codigo_final"].to_numpy()
+    codes_fixed = int(codigos["es_generico"].sum())
+    log_row_samples(logger, "conversion.codigo", codigos)
     
     # Códigos de barra
     # codigos_barra_existentes = set()
@@ -242,7 +279,7 @@ def generar_excel_conversion_bytes(
     
     # 👇 ORDEN EXACTO DE COLUMNAS (22 columnas)
     # Para NOMBRE, solo convertir a mayúsculas sin limpieza de caracteres especiales
-    df_base["nombre"] = get_series("nombre", "").apply(lambda x: str(x).upper() if pd.notna(x) else "")
+    df_base["nombre"] = apply_unique(get_series("nombre", ""), lambda x: str(x).upper() if pd.notna(x) else "")
     
     df_base["descripcion"] = get_series("descripcion", "")
     df_base["codigo padre"] = get_series("codigo padre", "")
@@ -251,20 +288,16 @@ def generar_excel_conversion_bytes(
     df_base["categoria"] = get_series("categoria", "SIN CATEGORIA")
     
     # Stock
-    df_base["stock"] = get_series("stock", 0).apply(lambda x: limpiar_valor_numerico(x, 0.0))
-    df_base["stock minimo"] = get_series("stock minimo", 0).apply(lambda x: limpiar_valor_numerico(x, 0.0))
+    df_base["stock"] = limpiar_valor_numerico_series(get_series("stock", 0), 0.0)
+    df_base["stock minimo"] = limpiar_valor_numerico_series(get_series("stock minimo", 0), 0.0)
     
     # Precios base
-    precio_costo_base = get_series("precio costo", 0).apply(lambda x: limpiar_valor_numerico(x, 0.0))
-    precio_venta_series = get_series("precio venta", 0).apply(lambda x: limpiar_valor_numerico(x, 1.0))
+    precio_costo_base = limpiar_valor_numerico_series(get_series("precio costo", 0), 0.0)
+    precio_venta_series = limpiar_valor_numerico_series(get_series("precio venta", 0), 1.0)
     
     # Validar precio venta vs costo
-    precios_validados = []
-    for i in range(len(df_base)):
-        pv = precio_venta_series.iloc[i]
-        pc = precio_costo_base.iloc[i]
-        precios_validados.append(1.0 if pv < pc else pv)
-    precio_venta_base = pd.Series(precios_validados)
+    venta_menor = precio_venta_series.to_numpy() < precio_costo_base.to_numpy()
+    precio_venta_base = precio_venta_series.mask(venta_menor, 1.0).reset_index(drop=True)
     
     # Aplicar IGV
     if apply_igv_cost and not is_selva:
@@ -287,131 +320,178 @@ def generar_excel_conversion_bytes(
     df_base["R-RANGO DE LISTA DE PRECIO 1"] = "0-0-0"
     
     # RA precio venta
-    df_base["RA precio venta"] = get_series("RA precio venta", 0).apply(lambda x: limpiar_valor_numerico(x, 1.0))
+    df_base["RA precio venta"] = limpiar_valor_numerico_series(get_series("RA precio venta", 0), 1.0)
     
     df_base["RA-RANGO LISTA DE PRECIO 2"] = "0-0-0"
     
     # RA2 precio venta
-    df_base["RA2 precio venta"] = get_series("RA2 precio venta", 0).apply(lambda x: limpiar_valor_numerico(x, 1.0))
+    df_base["RA2 precio venta"] = limpiar_valor_numerico_series(get_series("RA2 precio venta", 0), 1.0)
     
     df_base["RA2-RANGO LISTA DE PRECIO 2"] = "0-0-0"
     
     # Unidad, marca, modelo
-    df_base["unidad"] = get_series("unidad", "").apply(lambda x: clean_unit_value(x) if pd.notna(x) else "UNIDAD")
-    df_base["marca"] = get_series("marca", "").apply(lambda x: limpiar_marca_modelo(x, "S/M"))
-    df_base["modelo"] = get_series("modelo", "").apply(lambda x: limpiar_marca_modelo(x, "S/M"))
+    # (las tres columnas a la vez en modo free-threaded)
+    df_base["unidad"], df_base["marca"], df_base["modelo"] = thread_map(
+        lambda job: apply_unique(job[0], job[1], memo=True),
+        [
+            (get_series("unidad", ""), clean_unit_value),
+            (get_series("marca", ""), limpiar_marca_modelo),
+            (get_series("modelo", ""), limpiar_marca_modelo),
+        ],
+    )
     df_base["almacenable"] = get_series("almacenable", "si")
     
     # Usar el nombre de la tienda para la columna
     nombre_columna_tienda = f"W-{tienda_nombre}"
     df_base[nombre_columna_tienda] = df_base["stock"]
     
+    # category / float32 / int32 donde no cambia lo que se escribe
+    compact_columns(df_base, [
+        "categoria", "unidad", "marca", "modelo", "almacenable",
+        "R-RANGO DE LISTA DE PRECIO 1", "RA-RANGO LISTA DE PRECIO 2", "RA2-RANGO LISTA DE PRECIO 2",
+        "porcentaje costo", "stock", "stock minimo", nombre_columna_tienda,
+    ])
+    
+    return df_base, {"rows_before": before_rows, "codes_fixed": codes_fixed, "codigos": codigos}
+
+
+# ============================================================
+# FUNCIÓN PRINCIPAL (EXACTAMENTE IGUAL, solo usa la nueva limpiar_codigo_producto)
+# ============================================================
+def generar_excel_conversion_bytes(
+    input_path: str, 
+    selected_row_ids: set[int] = None,
+    apply_igv_cost: bool = False,
+    apply_igv_sale: bool = False,
+    is_selva: bool = False,
+    tienda_nombre: str = "Tienda1",
+    progress: Optional[Callable[[str, float], None]] = None,
+    out: Union[str, BinaryIO, None] = None,
+    sheets: Optional[Iterable[str]] = None,
+    output_format: str = "xlsx",
+) -> tuple[Optional[bytes], dict]:
+    """
+    progress(etapa, fraccion): callback opcional (jobs asíncronos).
+    out: ruta/archivo donde escribir el resultado; sin out se devuelven los bytes.
+    sheets / output_format: hojas a construir y formato (ver resolve_output).
+    """
+    report = StageRecorder(progress)
+    hojas = resolve_output(sheets, output_format)
+    
+    df_base, prep = construir_df_base(
+        input_path,
+        selected_row_ids=selected_row_ids,
+        apply_igv_cost=apply_igv_cost,
+        apply_igv_sale=apply_igv_sale,
+        is_selva=is_selva,
+        tienda_nombre=tienda_nombre,
+        report=report,
+    )
+    before_rows = prep["rows_before"]
+    codes_fixed = prep["codes_fixed"]
+    codigos = prep["codigos"]
+    report.rows(before_rows, "lectura")
+    report.rows(len(df_base))
+    
     # ===== AUDITORÍA =====
-    errores = []
-    ok_mask = []
-    corregidos_mask = []
-    
-    def push_error(i, codigo, colname, valor, err, solucion, comentario):
-        errores.append({
-            "Código": codigo,
-            "Ubicación (Fila / Columna)": f"{i+2} / {colname}",
-            "Valor Detectado con error": valor,
-            "Errores Detectados": err,
-            "Solución Sugerida (Dato Listo)": solucion,
-            "Comentarios": comentario,
-        })
-    
-    for i in range(len(df_base)):
-        ok = True
-        corregido = False
-        
-        codigo = df_base.at[i, "código"]
-        nombre = df_base.at[i, "nombre"]
-        unidad = df_base.at[i, "unidad"]
-        categoria = df_base.at[i, "categoria"]
-        pc = float(df_base.at[i, "precio costo"])
-        pv = float(df_base.at[i, "precio venta"])
-        st = float(df_base.at[i, "stock"])
-        
-        if not str(codigo).strip():
-            ok = False
-            corregido = True
-            push_error(i, codigo, "código", "", "CÓDIGO VACÍO", codigo, "Código generado automáticamente.")
-        
-        if not str(nombre).strip():
-            ok = False
-            push_error(i, codigo, "nombre", "", "NOMBRE VACÍO", "", "Nombre es obligatorio.")
-        
-        if str(categoria).strip() == "SIN CATEGORIA":
-            push_error(i, codigo, "categoria", "", "CATEGORÍA VACÍA", "SIN CATEGORIA", "Se asignó default.")
-        
-        if st < 0:
-            ok = False
-            corregido = True
-            push_error(i, codigo, "stock", st, "STOCK NEGATIVO", 0.0, "Se ajustó a 0.")
-        
-        if pc < 0:
-            ok = False
-            corregido = True
-            push_error(i, codigo, "precio costo", pc, "PRECIO COSTO < 0", 0.0, "Se ajustó a 0.")
-        
-        if pv < 1:
-            ok = False
-            corregido = True
-            push_error(i, codigo, "precio venta", pv, "PRECIO VENTA < 1", 1.0, "Se ajustó a 1.")
-        
-        if pv <= pc and pv >= 1:
-            ok = False
-            push_error(i, codigo, "precio venta", pv, "PRECIO VENTA <= PRECIO COSTO", pv, "Debe ser mayor que costo.")
-        
-        ok_mask.append(ok)
-        corregidos_mask.append(corregido)
+    report("auditoria", 0.5)
+    report.rows(len(df_base))
+    errores_df, ok_mask, corregidos_mask = run_audit(
+        df_base,
+        REGLAS_CONVERSION,
+        CAMPOS_CONVERSION,
+        build_errors="Errores_Detectados" in hojas,
+    )
     
     # DataFrame de códigos procesados
-    codigos_df = pd.DataFrame(codigos_info, columns=[
-        "Fila", "Código Original", "Código Final", 
-        "Es Genérico", "Razón"
-    ])
-    
-    # Separar DataFrames
-    productos_ok = df_base[pd.Series(ok_mask)].copy()
-    productos_corregidos = df_base[pd.Series(corregidos_mask)].copy()
+    codigos_df = product_codes_report(codigos)
     
-    # DataFrame de errores
-    errores_df = pd.DataFrame(errores, columns=[
-        "Código", "Ubicación (Fila / Columna)", "Valor Detectado con error",
-        "Errores Detectados", "Solución Sugerida (Dato Listo)", "Comentarios"
-    ])
+    # Separar DataFrames (solo las hojas pedidas)
+    frames = {"Errores_Detectados": errores_df, "productos": df_base}
+    if "Productos_OK" in hojas:
+        frames["Productos_OK"] = df_base[ok_mask].copy()
+    if "Productos_Corregidos" in hojas:
+        frames["Productos_Corregidos"] = df_base[corregidos_mask].copy()
     
     # 10. Crear Excel con 5 hojas
-    out = io.BytesIO()
-    with pd.ExcelWriter(out, engine="openpyxl") as writer:
-        errores_df.to_excel(writer, index=False, sheet_name="Errores_Detectados")
-        # codigos_df.to_excel(writer, index=False, sheet_name="Códigos_Procesados")
-        productos_ok.to_excel(writer, index=False, sheet_name="Productos_OK")
-        productos_corregidos.to_excel(writer, index=False, sheet_name="Productos_Corregidos")
-        df_base.to_excel(writer, index=False, sheet_name="productos")
+    report("escritura", 0.6)
+    excel_out = write_output([(name, frames[name]) for name in hojas], output_format, out)
+    report.rows(sum(len(frames[name]) for name in hojas))
     
     stats = {
         "rows_before": before_rows,
-        "rows_ok": len(productos_ok),
-        "rows_corrected": len(productos_corregidos),
+        "rows_ok": int(ok_mask.sum()),
+        "rows_corrected": int(corregidos_mask.sum()),
         "errors_count": len(errores_df),
         "codes_fixed": codes_fixed,
-        "is_selva": is_selva
+        "is_selva": is_selva,
+        "stages": report.close(),
     }
     
-    return out.getvalue(), stats
-
-
-
-
-
+    return excel_out, stats
 
 
+# ============================================================
+# SOLO VALIDACIÓN (/conversion/validate): sin Excel de salida
+# ============================================================
+def validar_excel_conversion(
+    input_path: str,
+    selected_row_ids: set[int] = None,
+    apply_igv_cost: bool = False,
+    apply_igv_sale: bool = False,
+    is_selva: bool = False,
+    page: int = 1,
+    page_size: int = 100,
+) -> dict:
+    """Mismos errores que Errores_Detectados de generar_excel_conversion_bytes, paginados como JSON."""
+    df_base, prep = construir_df_base(
+        input_path,
+        selected_row_ids=selected_row_ids,
+        apply_igv_cost=apply_igv_cost,
+        apply_igv_sale=apply_igv_sale,
+        is_selva=is_selva,
+    )
+    errores_df, ok_mask, corregidos_mask = run_audit(df_base, REGLAS_CONVERSION, CAMPOS_CONVERSION)
+    result = audit_report(errores_df, ok_mask, page=page, page_size=page_size)
+    result["counters"].update(
+        rows_corrected=int(corregidos_mask.sum()),
+        rows_before=prep["rows_before"],
+        codes_fixed=prep["codes_fixed"],
+    )
+    # Mismas claves de counters que /excel/validate; el modo va aparte
+    result["is_selva"] = is_selva
+    return result
 
 
+# ============================================================
+# ANÁLISIS DE DUPLICADOS (/conversion/analyze)
+# ============================================================
+def analizar_duplicados_conversion(input_path: str) -> dict:
+    df = leer_excel_conversion(input_path)
 
+    grupos = []
+    if "NOMBRE DEL PRODUCTO" in df.columns:
+        s = df["NOMBRE DEL PRODUCTO"].astype(str).str.strip()
+        dup_mask = s.ne("") & df["NOMBRE DEL PRODUCTO"].duplicated(keep=False)
+        dups = df.loc[dup_mask]
 
+        for nombre, grupo in dups.groupby("NOMBRE DEL PRODUCTO"):
+            rows = []
+            for _, row in grupo.iterrows():
+                row_dict = {}
+                for col in df.columns[:10]:
+                    row_dict[col] = str(row[col])[:50]
+                row_dict[ROW_ID_COL] = int(row[ROW_ID_COL])
+                rows.append(row_dict)
 
+            grupos.append({
+                "key": str(nombre),
+                "count": len(grupo),
+                "rows": rows
+            })
 
+    return {
+        "has_duplicates": len(grupos) > 0,
+        "groups": grupos,
+        "columns_hint": list(df.columns[:20])
+    }
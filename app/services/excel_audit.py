@@ -0,0 +1,306 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# Hoja Errores_Detectados
+# ============================================================
+ERROR_COLUMNS = [
+    "Código",
+    "Ubicación (Fila / Columna)",
+    "Valor Detectado con error",
+    "Errores Detectados",
+    "Solución Sugerida (Dato Listo)",
+    "Comentarios",
+]
+
+# En "valor" / "solucion": usar el valor de la celda auditada
+VALOR_CELDA = object()
+
+
+# ============================================================
+# Condiciones por columna (ctx: campo -> np.ndarray)
+# ============================================================
+def _as_text(values: np.ndarray) -> pd.Series:
+    return pd.Series(values, dtype=object).astype(str).str.strip()
+
+
+def vacio(campo: str):
+    return lambda ctx: _as_text(ctx[campo]).eq("").to_numpy()
+
+
+def categoria_default(campo: str = "categoria"):
+    return lambda ctx: _as_text(ctx[campo]).eq("SIN CATEGORIA").to_numpy()
+
+
+def menor_que(campo: str, limite: float):
+    return lambda ctx: ctx[campo] < limite
+
+
+def venta_no_mayor_que_costo(venta_minima: float = None):
+    def cond(ctx):
+        mask = ctx["pventa"] <= ctx["pcost"]
+        if venta_minima is not None:
+            mask &= ctx["pventa"] >= venta_minima
+        return mask
+    return cond
+
+
+# ============================================================
+# Tablas de reglas (en orden de aparición por fila)
+# - campo: columna que se reporta en "Ubicación"
+# - requiere: campos que deben existir (si no, la regla no aplica)
+# - invalida: la fila no va a Productos_OK
+# - corrige: valor que se escribe en el DF corregido
+# - corregido: la fila cuenta como corregida (Productos_Corregidos del conversor)
+# - sobre_corregido: evalúa con los valores ya corregidos por reglas anteriores
+# ============================================================
+REGLAS_NORMALIZE = [
+    {"campo": "codigo", "cond": vacio("codigo"), "error": "CÓDIGO VACÍO",
+     "valor": "", "solucion": VALOR_CELDA, "comentario": "Código es obligatorio.", "invalida": True},
+    {"campo": "nombre", "cond": vacio("nombre"), "error": "NOMBRE VACÍO",
+     "valor": "", "solucion": "", "comentario": "Nombre es obligatorio.", "invalida": True},
+    {"campo": "unidad", "cond": vacio("unidad"), "error": "UNIDAD VACÍA",
+     "valor": "", "solucion": "UNIDAD", "comentario": "Unidad es obligatoria. Se asigna UNIDAD.", "invalida": True},
+    {"campo": "categoria", "cond": categoria_default(), "error": "CATEGORÍA VACÍA -> DEFAULT",
+     "valor": "", "solucion": "SIN CATEGORIA", "comentario": "Se asignó default por categoría vacía/ inválida."},
+    {"campo": "stock", "cond": menor_que("stock", 0), "error": "STOCK NEGATIVO",
+     "valor": VALOR_CELDA, "solucion": 0.0, "comentario": "Stock no puede ser negativo. Se ajustó a 0.",
+     "invalida": True, "corrige": 0.0},
+    {"campo": "pcost", "cond": menor_que("pcost", 0), "error": "PRECIO COSTO < 0",
+     "valor": VALOR_CELDA, "solucion": 0.0, "comentario": "Costo mínimo 0. Se ajustó a 0.",
+     "invalida": True, "corrige": 0.0},
+    {"campo": "pventa", "cond": menor_que("pventa", 1), "error": "PRECIO VENTA < 1",
+     "valor": VALOR_CELDA, "solucion": 1.0, "comentario": "Venta mínima 1. Se ajustó a 1.",
+     "invalida": True, "corrige": 1.0},
+    {"campo": "pventa", "cond": venta_no_mayor_que_costo(), "error": "PRECIO VENTA <= PRECIO COSTO",
+     "valor": VALOR_CELDA, "solucion": VALOR_CELDA,
+     "comentario": "Regla: venta debe ser mayor que costo. No se ajusta automático.",
+     "invalida": True, "sobre_corregido": True},
+]
+
+REGLAS_CONVERSION_QA = [
+    {"campo": "codigo", "cond": vacio("codigo"), "error": "CÓDIGO VACÍO",
+     "valor": "", "solucion": "", "comentario": "Código es obligatorio.", "invalida": True},
+    {"campo": "nombre", "cond": vacio("nombre"), "error": "NOMBRE VACÍO",
+     "valor": "", "solucion": "", "comentario": "Nombre es obligatorio.", "invalida": True},
+    {"campo": "unidad", "cond": vacio("unidad"), "error": "UNIDAD VACÍA",
+     "valor": "", "solucion": "UNIDAD", "comentario": "Unidad es obligatoria.", "invalida": True},
+    {"campo": "categoria", "cond": categoria_default(), "error": "CATEGORÍA VACÍA -> DEFAULT",
+     "valor": "", "solucion": "SIN CATEGORIA", "comentario": "Se asignó default por categoría vacía/ inválida."},
+    {"campo": "stock", "requiere": ("stock",), "cond": menor_que("stock", 0), "error": "STOCK NEGATIVO",
+     "valor": VALOR_CELDA, "solucion": 0.0, "comentario": "Stock no puede ser negativo. Se ajustó a 0.",
+     "invalida": True, "corrige": 0.0},
+    {"campo": "pcost", "requiere": ("pcost",), "cond": menor_que("pcost", 0), "error": "PRECIO COSTO < 0",
+     "valor": VALOR_CELDA, "solucion": 0.0, "comentario": "Costo mínimo 0. Se ajustó a 0.",
+     "invalida": True, "corrige": 0.0},
+    {"campo": "pventa", "requiere": ("pventa",), "cond": menor_que("pventa", 1), "error": "PRECIO VENTA < 1",
+     "valor": VALOR_CELDA, "solucion": 1.0, "comentario": "Venta mínima 1. Se ajustó a 1.",
+     "invalida": True, "corrige": 1.0},
+    {"campo": "pventa", "requiere": ("pcost", "pventa"), "cond": venta_no_mayor_que_costo(),
+     "error": "PRECIO VENTA <= PRECIO COSTO", "valor": VALOR_CELDA, "solucion": VALOR_CELDA,
+     "comentario": "Regla: venta > costo.", "invalida": True},
+]
+
+REGLAS_CONVERSION = [
+    {"campo": "codigo", "cond": vacio("codigo"), "error": "CÓDIGO VACÍO",
+     "valor": "", "solucion": VALOR_CELDA, "comentario": "Código generado automáticamente.",
+     "invalida": True, "corregido": True},
+    {"campo": "nombre", "cond": vacio("nombre"), "error": "NOMBRE VACÍO",
+     "valor": "", "solucion": "", "comentario": "Nombre es obligatorio.", "invalida": True},
+    {"campo": "categoria", "cond": categoria_default(), "error": "CATEGORÍA VACÍA",
+     "valor": "", "solucion": "SIN CATEGORIA", "comentario": "Se asignó default."},
+    {"campo": "stock", "cond": menor_que("stock", 0), "error": "STOCK NEGATIVO",
+     "valor": VALOR_CELDA, "solucion": 0.0, "comentario": "Se ajustó a 0.",
+     "invalida": True, "corregido": True},
+    {"campo": "pcost", "cond": menor_que("pcost", 0), "error": "PRECIO COSTO < 0",
+     "valor": VALOR_CELDA, "solucion": 0.0, "comentario": "Se ajustó a 0.",
+     "invalida": True, "corregido": True},
+    {"campo": "pventa", "cond": menor_que("pventa", 1), "error": "PRECIO VENTA < 1",
+     "valor": VALOR_CELDA, "solucion": 1.0, "comentario": "Se ajustó a 1.",
+     "invalida": True, "corregido": True},
+    {"campo": "pventa", "cond": venta_no_mayor_que_costo(venta_minima=1), "error": "PRECIO VENTA <= PRECIO COSTO",
+     "valor": VALOR_CELDA, "solucion": VALOR_CELDA, "comentario": "Debe ser mayor que costo.",
+     "invalida": True},
+]
+
+_NUMERIC_FIELDS = {"stock", "pcost", "pventa"}
+
+
+# ============================================================
+# Motor
+# ============================================================
+def run_audit(
+    df: pd.DataFrame,
+    reglas: list[dict],
+    campos: dict,
+    corrected: pd.DataFrame = None,
+    build_errors: bool = True,
+    corrections: list = None,
+    row_offset: int = 0,
+) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Evalúa cada regla como máscara booleana sobre toda la columna y arma
+    Errores_Detectados por columnas (mismo orden que el recorrido fila a fila).
+
+    campos: campo -> {"col": nombre o None, "label": texto si falta la columna,
+                      "default": valor si falta la columna}
+    Sin "col" ni "default" el campo no existe y sus reglas no aplican.
+    Si se pasa corrected, se escriben ahí las correcciones ("corrige").
+    Si se pasa corrections (lista), se agregan ahí como (col, mask, valor) para
+    aplicarlas después solo a las filas que hagan falta (apply_corrections).
+    Con build_errors=False no se arma la hoja: errores_df queda sin columnas,
+    con una fila por error (sirve para contar).
+    row_offset: posición de df[0] en el catálogo completo (auditoría por
+    particiones), para que "Ubicación" numere las filas globalmente.
+    Devuelve (errores_df, ok_mask, corregidos_mask).
+    """
+    n = len(df)
+    ctx = {}
+    labels = {}
+    for campo, spec in campos.items():
+        col = spec.get("col")
+        labels[campo] = col or spec.get("label", campo)
+        if col:
+            values = df[col].to_numpy()
+        elif "default" in spec:
+            values = np.full(n, spec["default"], dtype=object)
+        else:
+            continue
+        ctx[campo] = values.astype(np.float64) if campo in _NUMERIC_FIELDS else values
+
+    fixed = dict(ctx)
+    ok = np.ones(n, dtype=bool)
+    corregidos = np.zeros(n, dtype=bool)
+    codigos = ctx.get("codigo", np.full(n, "", dtype=object))
+
+    parts = []
+    n_errores = 0
+    for k, regla in enumerate(reglas):
+        campo = regla["campo"]
+        if any(c not in ctx for c in regla.get("requiere", (campo,))):
+            continue
+
+        base = fixed if regla.get("sobre_corregido") else ctx
+        mask = np.asarray(regla["cond"](base), dtype=bool)
+
+        if regla.get("invalida"):
+            ok &= ~mask
+        if regla.get("corregido"):
+            corregidos |= mask
+        if "corrige" in regla:
+            fixed[campo] = np.where(mask, regla["corrige"], fixed[campo])
+            if corrected is not None and campos[campo].get("col"):
+                corrected.loc[mask, campos[campo]["col"]] = regla["corrige"]
+            if corrections is not None and campos[campo].get("col"):
+                corrections.append((campos[campo]["col"], mask, regla["corrige"]))
+
+        rows = np.flatnonzero(mask)
+        if not build_errors:
+            n_errores += len(rows)
+        elif len(rows):
+            celda = base[campo][rows].astype(object)
+            parts.append({
+                "rows": rows,
+                "rule": np.full(len(rows), k),
+                "Código": codigos[rows],
+                "Ubicación (Fila / Columna)": (rows + 2 + row_offset).astype(str).astype(object) + f" / {labels[campo]}",
+                "Valor Detectado con error": celda if regla["valor"] is VALOR_CELDA else _const(regla["valor"], rows),
+                "Errores Detectados": _const(regla["error"], rows),
+                "Solución Sugerida (Dato Listo)": celda if regla["solucion"] is VALOR_CELDA else _const(regla["solucion"], rows),
+                "Comentarios": _const(regla["comentario"], rows),
+            })
+
+    if not build_errors:
+        return pd.DataFrame(index=pd.RangeIndex(n_errores)), ok, corregidos
+    if not parts:
+        return pd.DataFrame([], columns=ERROR_COLUMNS), ok, corregidos
+
+    # Orden fila a fila y, dentro de la fila, en el orden de la tabla de reglas
+    rows = np.concatenate([p["rows"] for p in parts])
+    rule = np.concatenate([p["rule"] for p in parts])
+    order = np.lexsort((rule, rows))
+    errores_df = pd.DataFrame(
+        {c: np.concatenate([p[c] for p in parts])[order] for c in ERROR_COLUMNS}
+    ).infer_objects()
+    return errores_df, ok, corregidos
+
+
+def _const(value, rows: np.ndarray) -> np.ndarray:
+    return np.full(len(rows), value, dtype=object)
+
+
+def apply_corrections(df: pd.DataFrame, rows: np.ndarray, corrections: list) -> pd.DataFrame:
+    """
+    Filas `rows` (posiciones) de df con las correcciones de run_audit aplicadas,
+    en el mismo orden de reglas. Solo se copian esas filas.
+    """
+    out = df.take(rows)
+    for col, mask, valor in corrections:
+        out.loc[mask[rows], col] = valor
+    return out
+
+
+def merge_audits(parts: list[tuple[pd.DataFrame, np.ndarray, list]]) -> tuple[pd.DataFrame, np.ndarray, list]:
+    """
+    Une (errores_df, ok_mask, corrections) de particiones contiguas, en orden.
+    Las particiones comparten reglas y campos: corrections tiene las mismas
+    entradas en todas y solo se concatenan sus máscaras.
+    """
+    # las particiones sin errores no aportan filas (y no deben decidir dtypes)
+    errores_df = pd.concat([p[0] for p in parts if len(p[0])] or [parts[0][0]], ignore_index=True)
+    ok = np.concatenate([p[1] for p in parts])
+    corrections = [
+        (col, np.concatenate([p[2][i][1] for p in parts]), valor)
+        for i, (col, _, valor) in enumerate(parts[0][2])
+    ]
+    return errores_df, ok, corrections
+
+
+# ============================================================
+# Reporte JSON (endpoints /validate)
+# ============================================================
+# Columna de Errores_Detectados -> clave en JSON
+ERROR_KEYS = {
+    "Código": "codigo",
+    "Ubicación (Fila / Columna)": "ubicacion",
+    "Valor Detectado con error": "valor",
+    "Errores Detectados": "error",
+    "Solución Sugerida (Dato Listo)": "solucion",
+    "Comentarios": "comentario",
+}
+
+
+def _json_value(v):
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and not np.isfinite(v):
+        return None
+    return v
+
+
+def audit_report(errores_df: pd.DataFrame, ok_mask: np.ndarray, page: int = 1, page_size: int = 100) -> dict:
+    """
+    Contadores + una página de Errores_Detectados como registros JSON.
+    page empieza en 1; una página fuera de rango devuelve errors vacío.
+    """
+    total = len(errores_df)
+    start = (page - 1) * page_size
+    pagina = errores_df.iloc[start:start + page_size]
+    errors = [
+        {ERROR_KEYS[c]: _json_value(v) for c, v in zip(ERROR_COLUMNS, fila)}
+        for fila in pagina[ERROR_COLUMNS].itertuples(index=False, name=None)
+    ]
+    por_tipo = errores_df["Errores Detectados"].value_counts() if total else pd.Series([], dtype=int)
+    return {
+        "counters": {
+            "rows_checked": int(len(ok_mask)),
+            "rows_ok": int(ok_mask.sum()),
+            "rows_invalid": int(len(ok_mask) - ok_mask.sum()),
+            "errors_count": int(total),
+            "errors_by_type": {str(k): int(v) for k, v in por_tipo.items()},
+        },
+        "page": page,
+        "page_size": page_size,
+        "total_pages": max(1, -(-total // page_size)),
+        "errors": errors,
+    }
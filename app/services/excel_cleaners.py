@@ -1,14 +1,52 @@
+import importlib.util
 import re
+import os
 import unicodedata
 import string
 import secrets
 import math
-from typing import Optional, Set
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Set
+import numpy as np
 import pandas as pd
 
+from .free_threading import thread_map
+
 IGV_FACTOR = 1.18
 ROW_ID_COL_DEFAULT = "__ROW_ID__"
 
+# ============================================================
+# Motor de texto
+# - CATALOG_STRING_ENGINE: python (default, object dtype: un str por celda)
+#   | arrow (string[pyarrow]: las columnas limpiadas quedan en Arrow; requiere pyarrow,
+#     sin pyarrow se sigue con python)
+# ============================================================
+STRING_ENGINE_REQUESTED = os.getenv("CATALOG_STRING_ENGINE", "python").lower()
+ARROW_STRINGS = STRING_ENGINE_REQUESTED == "arrow" and importlib.util.find_spec("pyarrow") is not None
+ARROW_STRING_DTYPE = "string[pyarrow]"
+
+
+def _is_repeated_text(dtype) -> bool:
+    # dtypes donde factorize no pasa por objetos Python: Arrow / category
+    return isinstance(dtype, (pd.StringDtype, pd.CategoricalDtype))
+
+
+def as_text(s: pd.Series) -> pd.Series:
+    """s.astype(str), salvo una columna string sin nulos (string[pyarrow] sigue en Arrow)."""
+    if isinstance(s.dtype, pd.StringDtype) and not s.hasnans:
+        return s
+    return s.astype(str)
+
+
+def duplicated_values(s: pd.Series, keep=False) -> pd.Series:
+    """s.duplicated(keep); con string[pyarrow] / category el hash se hace sobre Arrow o los códigos."""
+    if _is_repeated_text(s.dtype):
+        codes, _ = pd.factorize(s, use_na_sentinel=False)
+        return pd.Series(codes, index=s.index).duplicated(keep=keep)
+    return s.duplicated(keep=keep)
+
+
 # ============================================================
 # Normalización base (Ñ OK)
 # ============================================================
@@ -36,6 +74,63 @@ def normalize_text_value(v) -> str:
     return s
 
 
+# ============================================================
+# Normalización por columna (mismo resultado que normalize_text_value)
+# ============================================================
+# Tabla de traducción precompilada: elimina todas las marcas diacríticas (Mn)
+_DROP_MN = {cp: None for cp in range(0x110000) if unicodedata.category(chr(cp)) == "Mn"}
+_RE_DIGIT = re.compile(r"\d")
+_RE_DIGIT_DOT = re.compile(r"(\d)\s*\.\s*(\d)")
+_RE_UNIT_SUFFIX = re.compile(r"(\d(?:\.\d+)?)\s*(ML|L|G|KG|MG|OZ|LB)\b")
+_RE_NON_ALNUM = re.compile(r"[^A-Z0-9 ]+")
+_RE_HAS_ALNUM = re.compile(r"[A-Z0-9]")
+
+
+def _collapse_spaces(s: str) -> str:
+    # str.split() y \s usan el mismo criterio de espacio (str.isspace)
+    return " ".join(s.split())
+
+
+# Reemplazos como funciones: evitan expandir la plantilla r"\1\2" en cada fila
+def _join_digit_dot(m) -> str:
+    return m.group(1) + "." + m.group(2)
+
+
+def _join_unit_suffix(m) -> str:
+    return m.group(1) + m.group(2)
+
+
+def normalize_text_series(s: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada (.str) de normalize_text_value sobre una columna completa.
+    Los pasos caros solo se aplican a las filas que los necesitan:
+    tildes -> textos no ASCII, regex de números -> textos con dígitos.
+    """
+    na = s.isna()
+    t = s.astype(object).where(~na, "").astype(str)
+
+    # _strip_accents_keep_enye (un texto ASCII sin marcadores queda igual)
+    accents = ~t.map(str.isascii) | t.str.contains("__ENYE_", regex=False)
+    if accents.any():
+        a = t[accents]
+        a = a.str.replace("Ñ", "__ENYE_MAY__", regex=False).str.replace("ñ", "__ENYE_MIN__", regex=False)
+        a = a.str.normalize("NFD").str.translate(_DROP_MN).str.normalize("NFC")
+        a = a.str.replace("__ENYE_MAY__", "Ñ", regex=False).str.replace("__ENYE_MIN__", "ñ", regex=False)
+        t = t.where(~accents, a)
+
+    t = t.str.upper().map(_collapse_spaces)
+
+    digits = t.str.contains(_RE_DIGIT, regex=True)
+    if digits.any():
+        d = t[digits]
+        dots = d.str.contains(".", regex=False)
+        if dots.any():
+            d = d.where(~dots, d[dots].str.replace(_RE_DIGIT_DOT, _join_digit_dot, regex=True))
+        d = d.str.replace(_RE_UNIT_SUFFIX, _join_unit_suffix, regex=True)
+        t = t.where(~digits, d)
+    return t
+
+
 # ============================================================
 # Limpieza específica
 # ============================================================
@@ -50,6 +145,15 @@ def clean_category_value(v) -> str:
     return s if re.search(r"[A-Z0-9]", s) else ""
 
 
+def clean_alnum_spaces_series(s: pd.Series) -> pd.Series:
+    return normalize_text_series(s).str.replace(_RE_NON_ALNUM, " ", regex=True).map(_collapse_spaces)
+
+
+def clean_category_series(s: pd.Series) -> pd.Series:
+    t = clean_alnum_spaces_series(s)
+    return t.where(t.str.contains(_RE_HAS_ALNUM, regex=True), "")
+
+
 # ============================================================
 # "UNIDAD"
 # ============================================================
@@ -189,6 +293,106 @@ def process_product_code(valor, existing_codes: set[str], row_id: int = None) ->
     return resultado
 
 
+# ============================================================
+# Códigos por lote (toda la columna de una vez)
+# ============================================================
+_CODE_ALPHABET = np.array(list(string.ascii_uppercase + string.digits))
+_CODE_LENGTH = 10
+# 252 = 7 * 36: los bytes >= 252 se descartan para que cada carácter sea equiprobable
+_CODE_BYTE_LIMIT = 252
+_RE_NOT_CODE_CHAR = re.compile(r"[^A-Z0-9]+")
+
+RAZON_VACIO = "VACÍO"
+RAZON_CARACTERES_INVALIDOS = "CARACTERES INVÁLIDOS"
+RAZON_DUPLICADO = "DUPLICADO (se mantiene)"
+RAZON_VALIDO = "VÁLIDO"
+# Enum de razones (mismos textos que process_product_code); índice = código int8
+RAZONES = (
+    RAZON_VACIO,
+    RAZON_CARACTERES_INVALIDOS,
+    "1 CARACTERES (mínimo 4)",
+    "2 CARACTERES (mínimo 4)",
+    "3 CARACTERES (mínimo 4)",
+    RAZON_DUPLICADO,
+    RAZON_VALIDO,
+)
+_R_VACIO, _R_INVALIDO, _R_DUPLICADO, _R_VALIDO = 0, 1, 5, 6
+
+
+def generate_unique_codes(n: int, existing: set[str], prefix="CM") -> list[str]:
+    """Genera n códigos únicos (prefijo + 10 caracteres) con un solo sorteo de bytes."""
+    codes: list[str] = []
+    while len(codes) < n:
+        missing = n - len(codes)
+        raw = np.frombuffer(secrets.token_bytes(int(missing * _CODE_LENGTH * 1.05) + 16), dtype=np.uint8)
+        raw = raw[raw < _CODE_BYTE_LIMIT]
+        rows = min(missing, len(raw) // _CODE_LENGTH)
+        chars = _CODE_ALPHABET[raw[: rows * _CODE_LENGTH] % len(_CODE_ALPHABET)]
+        drawn = chars.reshape(rows, _CODE_LENGTH).view(f"<U{_CODE_LENGTH}").ravel()
+        # Colisiones (con existentes o dentro del lote): se vuelven a sortear
+        for body in drawn.tolist():
+            c = prefix + body
+            if c not in existing:
+                existing.add(c)
+                codes.append(c)
+    return codes
+
+
+def process_product_codes(values: pd.Series, existing_codes: set[str] = None, prefix="CM") -> pd.DataFrame:
+    """
+    Versión por lote de process_product_code para toda la columna.
+    Devuelve un DataFrame (mismo índice) con codigo_original, codigo_final,
+    es_generico y razon (categórica con RAZONES).
+    Los códigos genéricos se generan al final, evitando también los códigos
+    válidos que aparecen más abajo en la columna.
+    """
+    existing = set() if existing_codes is None else existing_codes
+    s = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+
+    original = apply_unique(s, lambda v: str(v) if pd.notna(v) else "").astype(object)
+    stripped = original.str.strip()
+    limpio = stripped.str.upper().str.replace(_RE_NOT_CODE_CHAR, "", regex=True)
+
+    blank = s.isna().to_numpy() | stripped.eq("").to_numpy()
+    lens = limpio.str.len().to_numpy()
+
+    razon = np.full(len(s), _R_VALIDO, dtype=np.int8)
+    short = ~blank & (lens < 4)
+    razon[short] = _R_INVALIDO + lens[short]  # 0 -> CARACTERES INVÁLIDOS, 1..3 -> "N CARACTERES"
+    razon[blank] = _R_VACIO
+
+    candidatos = np.flatnonzero(razon == _R_VALIDO)
+    cand = limpio.iloc[candidatos]
+    dup = (cand.duplicated(keep="first") | cand.isin(existing)).to_numpy()
+    razon[candidatos[dup]] = _R_DUPLICADO
+    existing.update(cand[~dup].tolist())
+
+    generic = razon < _R_DUPLICADO
+    final = limpio.to_numpy(dtype=object).copy()
+    final[generic] = generate_unique_codes(int(generic.sum()), existing, prefix)
+
+    return pd.DataFrame(
+        {
+            "codigo_original": original.to_numpy(),
+            "codigo_final": final,
+            "es_generico": generic,
+            "razon": pd.Categorical.from_codes(razon, categories=RAZONES),
+        },
+        index=s.index,
+    )
+
+
+def product_codes_report(codigos: pd.DataFrame, first_row: int = 5) -> pd.DataFrame:
+    """Tabla "Códigos procesados" a partir de process_product_codes (+5 por el header)."""
+    return pd.DataFrame({
+        "Fila": np.arange(len(codigos)) + first_row,
+        "Código Original": codigos["codigo_original"].to_numpy(),
+        "Código Final": codigos["codigo_final"].to_numpy(),
+        "Es Genérico": codigos["es_generico"].to_numpy(),
+        "Razón": codigos["razon"].astype(object).to_numpy(),
+    })
+
+
 # ============================================================
 # Números
 # ============================================================
@@ -206,6 +410,323 @@ def to_number(v):
         return None
 
 
+# ============================================================
+# Parseo numérico por columna (to_number / limpiar_valor_numerico)
+# ============================================================
+_RE_NUM_JUNK_ASCII = re.compile(r"[^0-9.\-]")
+_RE_NUM_JUNK = re.compile(r"[^\d.-]")
+_RE_PLAIN_NUMBER_ASCII = re.compile(r"-?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)")
+_RE_PLAIN_NUMBER = re.compile(r"-?(?:\d+(?:\.\d*)?|\.\d+)")
+# Floats cuyo str() no usa notación científica: pasan sin tocar por str -> float
+_PLAIN_FLOAT_MIN = 1e-4
+_PLAIN_FLOAT_MAX = 1e16
+_PLAIN_INT_MAX = 2 ** 53
+
+
+def _parse_numeric_strings(values: list, decimal_comma: bool) -> np.ndarray:
+    """str(v) -> limpieza -> float(), con NaN para lo que float() rechazaría."""
+    t = pd.Series([str(v) for v in values], dtype=object)
+    if decimal_comma:
+        t = t.str.replace(",", ".", regex=False).str.replace(_RE_NUM_JUNK_ASCII, "", regex=True)
+        valid = t.str.fullmatch(_RE_PLAIN_NUMBER_ASCII)
+    else:
+        t = t.str.replace(_RE_NUM_JUNK, "", regex=True)
+        valid = t.str.fullmatch(_RE_PLAIN_NUMBER)
+
+    out = np.full(len(t), np.nan)
+    mask = valid.to_numpy(dtype=bool)
+    if mask.any():
+        # object -> float64 usa float(str) elemento a elemento (mismo redondeo)
+        out[mask] = t.to_numpy()[mask].astype(np.float64)
+    if decimal_comma:
+        out[np.isinf(out)] = np.nan
+    return out
+
+
+def parse_numeric_series(
+    s: pd.Series,
+    default: float = np.nan,
+    decimal_comma: bool = True,
+    negative_as_default: bool = False,
+) -> pd.Series:
+    """
+    Parseo numérico de una columna completa a float64, en una sola pasada.
+    - decimal_comma=True: reglas de to_number ("12,50" -> 12.5; NaN/inf inválidos).
+    - decimal_comma=False: reglas de limpiar_valor_numerico (la coma se descarta).
+    Vacíos e inválidos toman default; con negative_as_default también los negativos.
+    Los números ya leídos como tales no pasan por str() salvo los que se
+    escribirían en notación científica (1e-05, 1e+16), igual que la versión por celda.
+    """
+    if _is_repeated_text(s.dtype):
+        # string[pyarrow] / category: una pasada por valor distinto
+        codes, uniques = pd.factorize(s)
+        parsed = parse_numeric_series(pd.Series(np.asarray(uniques, dtype=object), dtype=object), np.nan, decimal_comma)
+        out = np.append(parsed.to_numpy(), np.nan)[codes]
+        pending = np.zeros(len(s), dtype=bool)
+    elif pd.api.types.is_bool_dtype(s.dtype):
+        values = s.to_numpy(dtype=object)
+        out = np.full(len(s), np.nan)
+        pending = np.ones(len(s), dtype=bool)
+    elif pd.api.types.is_integer_dtype(s.dtype) or pd.api.types.is_float_dtype(s.dtype):
+        out = s.to_numpy(dtype=np.float64, na_value=np.nan).copy()
+        mag = np.abs(out)
+        plain = (out == 0) | ((mag >= _PLAIN_FLOAT_MIN) & (mag < _PLAIN_FLOAT_MAX))
+        if pd.api.types.is_integer_dtype(s.dtype):
+            plain |= mag < _PLAIN_INT_MAX
+        pending = ~plain & ~np.isnan(out)
+        values = s.to_numpy(dtype=object) if pending.any() else None
+    else:
+        values = s.to_numpy(dtype=object)
+        out = np.full(len(s), np.nan)
+        pending = np.zeros(len(s), dtype=bool)
+        for i, v in enumerate(values):
+            tv = type(v)
+            if tv is float:
+                if v == 0 or _PLAIN_FLOAT_MIN <= abs(v) < _PLAIN_FLOAT_MAX:
+                    out[i] = v
+                elif v == v:
+                    pending[i] = True
+            elif tv is int and -_PLAIN_INT_MAX < v < _PLAIN_INT_MAX:
+                out[i] = v
+            elif v is not None:
+                pending[i] = True
+
+    if pending.any():
+        out[pending] = _parse_numeric_strings(values[pending].tolist(), decimal_comma)
+
+    invalid = np.isnan(out)
+    if negative_as_default:
+        invalid |= out < 0
+    out[invalid] = default
+    return pd.Series(out, index=s.index, name=s.name)
+
+
+# ============================================================
+# Limpieza por valores únicos (memo acotado por proceso)
+# - El memo vive en cada proceso: con el WorkerPool en modo process cada
+#   worker tiene el suyo. Los contadores de los workers vuelven con cada
+#   resultado (run_counting_memo) y se suman en el proceso de la API.
+# ============================================================
+_MEMO_MAX_ENTRIES = int(os.getenv("CLEANER_MEMO_MAX_ENTRIES", "100000"))
+_MEMO: "OrderedDict[tuple, object]" = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+_MEMO_STATS = {"cells": 0, "unique_values": 0, "memo_hits": 0, "memo_misses": 0, "memo_evictions": 0}
+# Entradas del memo de cada proceso hijo (pid -> entradas), según su último resultado
+_CHILD_MEMO_ENTRIES: dict[int, int] = {}
+
+# Limpiezas con versión por columna: los valores sin memo se procesan en un solo lote
+_VECTORIZED = {
+    normalize_text_value: normalize_text_series,
+    clean_alnum_spaces: clean_alnum_spaces_series,
+    clean_category_value: clean_category_series,
+}
+_VECTORIZE_MIN_VALUES = 64
+
+
+def _factorize_values(series: pd.Series) -> tuple[np.ndarray, list]:
+    """Códigos + valores distintos (objetos Python) con los que apply_unique llama a func."""
+    if _is_repeated_text(series.dtype):
+        # string[pyarrow] / category: factorize sin pasar cada celda a objeto Python
+        codes, uniques = pd.factorize(series)
+        return codes, np.asarray(uniques, dtype=object).tolist()
+
+    values = series.to_numpy()
+    if values.dtype.kind in "mM" or isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        # Fechas y dtypes de extensión: func recibe Timestamp / escalares, no int64
+        values = series.astype(object).to_numpy()
+    if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in ("string", "empty"):
+        # 1, 1.0 y True son iguales para un dict: se separan por tipo
+        keys = np.empty(len(values), dtype=object)
+        for i, v in enumerate(values):
+            keys[i] = v if v is None or type(v) is str or (type(v) is float and v != v) else (type(v), v)
+        codes, uniques = pd.factorize(keys)
+        return codes, [u[1] if type(u) is tuple else u for u in uniques]
+    codes, uniques = pd.factorize(values)
+    return codes, uniques.tolist()
+
+
+def apply_unique(series: pd.Series, func: Callable, memo: bool = False) -> pd.Series:
+    """
+    Equivalente a series.apply(func), pero func se evalúa una sola vez por
+    valor distinto (factorize + take). Con memo=True los resultados se guardan
+    en un cache LRU del proceso, compartido entre llamadas (solo para funciones puras).
+    Si func tiene versión por columna (_VECTORIZED), los valores nuevos se
+    limpian en un solo lote con operaciones .str.
+    Con el motor arrow, un resultado todo texto se devuelve como string[pyarrow].
+    """
+    n = len(series)
+    if n == 0:
+        return series.apply(func)
+
+    codes, uniques = _factorize_values(series)
+
+    out = np.empty(len(uniques) + 1, dtype=object)
+    pending = range(len(uniques))
+    if memo:
+        with _MEMO_LOCK:
+            missing = []
+            for j in pending:
+                key = (func, type(uniques[j]), uniques[j])
+                if key in _MEMO:
+                    _MEMO.move_to_end(key)
+                    out[j] = _MEMO[key]
+                else:
+                    missing.append(j)
+            _MEMO_STATS["memo_hits"] += len(uniques) - len(missing)
+            _MEMO_STATS["memo_misses"] += len(missing)
+        pending = missing
+
+    vectorized = _VECTORIZED.get(func)
+    if vectorized is not None and len(pending) >= _VECTORIZE_MIN_VALUES:
+        results = vectorized(pd.Series([uniques[j] for j in pending], dtype=object)).tolist()
+    else:
+        results = [func(uniques[j]) for j in pending]
+    for j, r in zip(pending, results):
+        out[j] = r
+
+    if memo and pending:
+        with _MEMO_LOCK:
+            for j, r in zip(pending, results):
+                _MEMO[(func, type(uniques[j]), uniques[j])] = r
+            while len(_MEMO) > _MEMO_MAX_ENTRIES:
+                _MEMO.popitem(last=False)
+                _MEMO_STATS["memo_evictions"] += 1
+
+    na_pos = codes == -1
+    has_na = bool(na_pos.any())
+    if has_na:
+        out[-1] = func(series.iloc[na_pos.argmax()])
+
+    with _MEMO_LOCK:
+        _MEMO_STATS["cells"] += n
+        _MEMO_STATS["unique_values"] += len(uniques) + int(has_na)
+
+    if ARROW_STRINGS:
+        # Resultado todo texto: se arma en Arrow a partir de los valores distintos
+        results = out[:len(uniques) + int(has_na)]
+        if all(type(r) is str for r in results):
+            arr = pd.array(results, dtype=ARROW_STRING_DTYPE).take(codes)
+            return pd.Series(arr, index=series.index, name=series.name)
+    return pd.Series(out[codes], index=series.index, name=series.name).infer_objects()
+
+
+def apply_columns(df: pd.DataFrame, jobs: list[tuple[str, Callable]]) -> None:
+    """
+    df[col] = fn(df[col]) para cada (col, fn), en el lugar. En modo
+    free-threaded las columnas distintas se limpian a la vez en el pool de
+    hilos compartido (sin copiar el DF a otro proceso); si una columna se
+    repite, sus funciones corren en el orden de jobs.
+    """
+    pending = list(jobs)
+    while pending:
+        ronda, resto, vistas = [], [], set()
+        for col, fn in pending:
+            (resto if col in vistas else ronda).append((col, fn))
+            vistas.add(col)
+        # Las Series se toman en este hilo: df[c] no es seguro entre hilos
+        series = [df[col] for col, _ in ronda]
+        results = thread_map(lambda job: job[0](job[1]), [(fn, s) for (_, fn), s in zip(ronda, series)])
+        for (col, _), result in zip(ronda, results):
+            df[col] = result
+        pending = resto
+
+
+def run_counting_memo(fn: Callable, *args, **kwargs) -> tuple[object, dict]:
+    """
+    fn(*args, **kwargs) en un proceso hijo (un trabajo a la vez por proceso):
+    devuelve (resultado, contadores que sumó al memo de este proceso) para
+    que el padre los agregue con add_memo_counters().
+    """
+    with _MEMO_LOCK:
+        before = dict(_MEMO_STATS)
+    result = fn(*args, **kwargs)
+    with _MEMO_LOCK:
+        delta = {k: v - before[k] for k, v in _MEMO_STATS.items()}
+        delta["pid"] = os.getpid()
+        delta["memo_entries"] = len(_MEMO) + sum(_CHILD_MEMO_ENTRIES.values())
+    return result, delta
+
+
+def add_memo_counters(delta: dict) -> None:
+    """Suma los contadores de un proceso hijo (ver run_counting_memo)."""
+    with _MEMO_LOCK:
+        for k in _MEMO_STATS:
+            _MEMO_STATS[k] += delta.get(k, 0)
+        _CHILD_MEMO_ENTRIES[delta["pid"]] = delta["memo_entries"]
+
+
+def cleaning_cache_stats() -> dict:
+    """
+    Contadores de este proceso más los de los workers (sumados al volver cada
+    resultado). memo_entries suma el memo propio y el de cada worker visto;
+    memo_max_entries es el tope de cada uno.
+    """
+    with _MEMO_LOCK:
+        stats = dict(_MEMO_STATS)
+        stats["memo_entries"] = len(_MEMO) + sum(_CHILD_MEMO_ENTRIES.values())
+        stats["memo_processes"] = 1 + len(_CHILD_MEMO_ENTRIES)
+        stats["memo_max_entries"] = _MEMO_MAX_ENTRIES
+    lookups = stats["memo_hits"] + stats["memo_misses"]
+    stats["memo_hit_rate"] = round(stats["memo_hits"] / lookups, 4) if lookups else 0.0
+    # Fracción de celdas que no tuvieron que limpiarse (resueltas por valor repetido)
+    stats["dedup_rate"] = round(1 - stats["unique_values"] / stats["cells"], 4) if stats["cells"] else 0.0
+    stats["string_engine"] = "arrow" if ARROW_STRINGS else "python"
+    stats["string_engine_requested"] = STRING_ENGINE_REQUESTED
+    return stats
+
+
+# ============================================================
+# Dtypes compactos (category / float32 / int32)
+# - CATALOG_COMPACT_DTYPES: 1 (default) | 0 para dejar object / float64 / int64
+# ============================================================
+COMPACT_DTYPES = os.getenv("CATALOG_COMPACT_DTYPES", "1").lower() not in ("0", "false", "no")
+
+# Una columna de texto pasa a category si tiene a lo sumo esta proporción de valores distintos
+_CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# Enteros hasta 2**24 son exactos en float32 (y se escriben igual que en float64)
+_FLOAT32_EXACT_MAX = 2 ** 24
+_INT32 = np.iinfo(np.int32)
+
+
+def compact_series(s: pd.Series) -> pd.Series:
+    """
+    Misma columna con un dtype más chico cuando no cambia ningún valor escrito:
+    texto con pocos valores distintos -> category, floats enteros -> float32,
+    int64 en rango -> int32. Si no aplica, devuelve la serie tal cual.
+    """
+    n = len(s)
+    if n == 0 or not isinstance(s.dtype, (np.dtype, pd.StringDtype)):
+        return s
+    kind = s.dtype.kind
+    if kind == "O":
+        if (
+            pd.api.types.infer_dtype(s, skipna=True) == "string"
+            and s.nunique() <= max(1, n * _CATEGORY_MAX_UNIQUE_RATIO)
+        ):
+            return s.astype("category")
+        return s
+    if kind == "f" and s.dtype.itemsize > 4:
+        values = s.to_numpy()
+        finite = values[~np.isnan(values)]
+        if not len(finite) or (np.abs(finite).max() <= _FLOAT32_EXACT_MAX and (finite == np.trunc(finite)).all()):
+            return s.astype(np.float32)
+        return s
+    if kind == "i" and s.dtype.itemsize > 4:
+        values = s.to_numpy()
+        if _INT32.min <= values.min() and values.max() <= _INT32.max:
+            return s.astype(np.int32)
+    return s
+
+
+def compact_columns(df: pd.DataFrame, cols) -> None:
+    """Aplica compact_series a las columnas indicadas (en el lugar; ignora None y faltantes)."""
+    if not COMPACT_DTYPES:
+        return
+    for c in dict.fromkeys(cols):
+        if c is not None and c in df.columns:
+            df[c] = compact_series(df[c])
+
+
 def _find_col(df: pd.DataFrame, name: str) -> Optional[str]:
     name = normalize_text_value(name)
     for c in df.columns:
@@ -1,12 +1,16 @@
-import io
+from functools import partial
+
 import pandas as pd
-from typing import Optional, Tuple
+from typing import BinaryIO, Callable, Iterable, Optional, Tuple, Union
 from .excel_cleaners import (
     normalize_text_value, clean_alnum_spaces, clean_category_value,
     clean_unit_value, clean_product_code, is_valid_product_code,
-    generate_unique_code, to_number, _find_col, _is_null, _drop_all_empty_rows,
-    IGV_FACTOR, ROW_ID_COL_DEFAULT
+    generate_unique_code, parse_numeric_series, _find_col, _drop_all_empty_rows,
+    apply_unique, apply_columns, IGV_FACTOR, ROW_ID_COL_DEFAULT
 )
+from .excel_audit import REGLAS_CONVERSION_QA, run_audit
+from .excel_writer import resolve_output, write_output
+from .stage_metrics import StageRecorder
 
 # ============================================================
 # CONVERSIÓN: construir DF desde archivo
@@ -29,10 +33,9 @@ def build_conversion_df_from_file(
     # normalizar columnas
     df.columns = [normalize_text_value(c) for c in df.columns]
 
-    # normalizar textos
-    for c in df.columns:
-        if df[c].dtype == "object":
-            df[c] = df[c].apply(normalize_text_value)
+    # normalizar textos (columnas en paralelo en modo free-threaded)
+    normalizar = partial(apply_unique, func=normalize_text_value, memo=True)
+    apply_columns(df, [(c, normalizar) for c in df.columns if df[c].dtype == "object"])
 
     df = _drop_all_empty_rows(df)
 
@@ -87,34 +90,34 @@ def clean_conversion_output_df(
 
     for c in df.columns:
         if df[c].dtype == "object":
-            df[c] = df[c].apply(normalize_text_value)
+            df[c] = apply_unique(df[c], normalize_text_value, memo=True)
 
     if col_nombre:
-        df[col_nombre] = df[col_nombre].apply(clean_alnum_spaces)
+        df[col_nombre] = apply_unique(df[col_nombre], clean_alnum_spaces, memo=True)
     if col_desc:
-        df[col_desc] = df[col_desc].apply(clean_alnum_spaces)
+        df[col_desc] = apply_unique(df[col_desc], clean_alnum_spaces, memo=True)
 
     if col_cat:
-        df[col_cat] = df[col_cat].apply(clean_category_value)
-        df[col_cat] = df[col_cat].apply(lambda x: x if str(x).strip() else "SIN CATEGORIA")
+        df[col_cat] = apply_unique(df[col_cat], clean_category_value, memo=True)
+        df[col_cat] = apply_unique(df[col_cat], lambda x: x if str(x).strip() else "SIN CATEGORIA")
     else:
         df["CATEGORIA"] = "SIN CATEGORIA"
         col_cat = "CATEGORIA"
 
     if col_unidad:
-        df[col_unidad] = df[col_unidad].apply(clean_unit_value)
+        df[col_unidad] = apply_unique(df[col_unidad], clean_unit_value, memo=True)
     else:
         df["UNIDAD"] = "UNIDAD"
         col_unidad = "UNIDAD"
 
     if col_marca:
-        df[col_marca] = df[col_marca].apply(lambda x: "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip())
+        df[col_marca] = apply_unique(df[col_marca], lambda x: "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip())
     else:
         df["MARCA"] = "S/M"
         col_marca = "MARCA"
 
     if col_modelo:
-        df[col_modelo] = df[col_modelo].apply(lambda x: "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip())
+        df[col_modelo] = apply_unique(df[col_modelo], lambda x: "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip())
     else:
         df["MODELO"] = "S/M"
         col_modelo = "MODELO"
@@ -122,7 +125,8 @@ def clean_conversion_output_df(
     # PORCENTAJE ahora SIEMPRE 18
     porcentaje_default = 18.0
     if col_porcentaje:
-        df[col_porcentaje] = df[col_porcentaje].apply(to_number).apply(lambda x: porcentaje_default if _is_null(x) or x <= 0 else x)
+        porcentaje = parse_numeric_series(df[col_porcentaje], default=porcentaje_default)
+        df[col_porcentaje] = porcentaje.mask(porcentaje <= 0, porcentaje_default)
     else:
         df["PORCENTAJE COSTO"] = porcentaje_default
         col_porcentaje = "PORCENTAJE COSTO"
@@ -159,27 +163,19 @@ def clean_conversion_output_df(
         return v is None or (isinstance(v, float) and pd.isna(v)) or str(v).strip() == ""
 
     pv_was_blank = df[col_pventa].apply(_is_blank_raw) if col_pventa else None
-    pc_was_blank = df[col_pcost].apply(_is_blank_raw) if col_pcost else None
 
+    # Vacíos e inválidos -> default, negativos -> default
     if col_stock:
-        df[col_stock] = df[col_stock].apply(to_number).apply(lambda x: 0.0 if _is_null(x) else x)
-        df.loc[df[col_stock] < 0, col_stock] = 0.0
+        df[col_stock] = parse_numeric_series(df[col_stock], default=0.0, negative_as_default=True)
 
     if col_stock_min:
-        df[col_stock_min] = df[col_stock_min].apply(to_number)
+        df[col_stock_min] = parse_numeric_series(df[col_stock_min])
 
     if col_pcost:
-        df[col_pcost] = df[col_pcost].apply(to_number)
-        if pc_was_blank is not None:
-            df.loc[pc_was_blank, col_pcost] = 0.0
-        df.loc[df[col_pcost].isna(), col_pcost] = 0.0
-        df.loc[df[col_pcost] < 0, col_pcost] = 0.0
+        df[col_pcost] = parse_numeric_series(df[col_pcost], default=0.0, negative_as_default=True)
 
     if col_pventa:
-        df[col_pventa] = df[col_pventa].apply(to_number)
-        if pv_was_blank is not None:
-            df.loc[pv_was_blank, col_pventa] = 1.0
-        df.loc[df[col_pventa].isna(), col_pventa] = 1.0
+        df[col_pventa] = parse_numeric_series(df[col_pventa], default=1.0)
         df.loc[df[col_pventa] < 1, col_pventa] = 1.0
 
     # pv > pc SOLO si la venta NO estaba vacía
@@ -189,9 +185,9 @@ def clean_conversion_output_df(
 
     # IGV (SIEMPRE se aplica si los toggles están activos)
     if apply_igv_cost and col_pcost:
-        df[col_pcost] = df[col_pcost].apply(lambda x: x * IGV_FACTOR if not _is_null(x) else x)
+        df[col_pcost] = df[col_pcost] * IGV_FACTOR
     if apply_igv_sale and col_pventa:
-        df[col_pventa] = df[col_pventa].apply(lambda x: x * IGV_FACTOR if not _is_null(x) else x)
+        df[col_pventa] = df[col_pventa] * IGV_FACTOR
 
     # W-TIENDA1 = STOCK limpio con nombre dinámico
     nombre_columna_tienda = f"W-{tienda_nombre}"
@@ -219,9 +215,21 @@ def build_conversion_qa_excel_bytes(
     apply_igv_sale: bool = False,
     round_numeric: Optional[int] = None,
     tienda_nombre: str = "Tienda1",  
-) -> tuple[bytes, dict]:
+    out: Union[str, BinaryIO, None] = None,
+    sheets: Optional[Iterable[str]] = None,
+    output_format: str = "xlsx",
+    progress: Optional[Callable[[str, float], None]] = None,
+) -> tuple[Optional[bytes], dict]:
+    """
+    out: ruta/archivo donde escribir el resultado; sin out se devuelven los bytes.
+    sheets / output_format: hojas a construir y formato (ver resolve_output).
+    progress(etapa, fraccion): callback opcional (el DF ya viene leído).
+    """
     ROW_ID_COL = ROW_ID_COL_DEFAULT
+    report = StageRecorder(progress)
+    hojas = resolve_output(sheets, output_format)
 
+    report("limpieza", 0.3)
     df0 = df_input.copy()
     if ROW_ID_COL not in df0.columns:
         df0[ROW_ID_COL] = range(5, 5 + len(df0))
@@ -249,106 +257,45 @@ def build_conversion_qa_excel_bytes(
     col_cat = _find_col(cleaned, "CATEGORIA")
     col_unidad = _find_col(cleaned, "UNIDAD")
 
-    errores = []
-    ok_mask = []
-    corrected = cleaned.copy()
-
-    def push_error(i, codigo, colname, valor, err, solucion, comentario):
-        errores.append(
-            {
-                "Código": codigo,
-                "Ubicación (Fila / Columna)": f"{i+2} / {colname}",
-                "Valor Detectado con error": valor,
-                "Errores Detectados": err,
-                "Solución Sugerida (Dato Listo)": solucion,
-                "Comentarios": comentario,
-            }
-        )
-
-    for i in range(len(cleaned)):
-        ok = True
-
-        codigo = cleaned.at[i, col_codigo] if col_codigo else ""
-        nombre = cleaned.at[i, col_nombre] if col_nombre else ""
-        unidad = cleaned.at[i, col_unidad] if col_unidad else "UNIDAD"
-        categoria = cleaned.at[i, col_cat] if col_cat else "SIN CATEGORIA"
-
-        pc = float(cleaned.at[i, col_pcost]) if col_pcost else 0.0
-        pv = float(cleaned.at[i, col_pventa]) if col_pventa else 1.0
-        st = float(cleaned.at[i, col_stock]) if col_stock else 0.0
-
-        if not str(codigo).strip():
-            ok = False
-            push_error(i, codigo, col_codigo or "CODIGO", "", "CÓDIGO VACÍO", "", "Código es obligatorio.")
-
-        if not str(nombre).strip():
-            ok = False
-            push_error(i, codigo, col_nombre or "NOMBRE", "", "NOMBRE VACÍO", "", "Nombre es obligatorio.")
-
-        if not str(unidad).strip():
-            ok = False
-            push_error(i, codigo, col_unidad or "UNIDAD", "", "UNIDAD VACÍA", "UNIDAD", "Unidad es obligatoria.")
-
-        if str(categoria).strip() == "SIN CATEGORIA":
-            push_error(i, codigo, col_cat or "CATEGORIA", "", "CATEGORÍA VACÍA -> DEFAULT", "SIN CATEGORIA", "Se asignó default por categoría vacía/ inválida.")
-
-        if col_stock and st < 0:
-            ok = False
-            corrected.at[i, col_stock] = 0.0
-            push_error(i, codigo, col_stock, st, "STOCK NEGATIVO", 0.0, "Stock no puede ser negativo. Se ajustó a 0.")
-
-        if col_pcost and pc < 0:
-            ok = False
-            corrected.at[i, col_pcost] = 0.0
-            push_error(i, codigo, col_pcost, pc, "PRECIO COSTO < 0", 0.0, "Costo mínimo 0. Se ajustó a 0.")
-
-        if col_pventa and pv < 1:
-            ok = False
-            corrected.at[i, col_pventa] = 1.0
-            push_error(i, codigo, col_pventa, pv, "PRECIO VENTA < 1", 1.0, "Venta mínima 1. Se ajustó a 1.")
-
-        # validación
-        if col_pcost and col_pventa and pv <= pc:
-            ok = False
-            push_error(i, codigo, col_pventa, pv, "PRECIO VENTA <= PRECIO COSTO", pv, "Regla: venta > costo.")
-
-        ok_mask.append(ok)
-
-    errores_df = pd.DataFrame(
-        errores,
-        columns=[
-            "Código",
-            "Ubicación (Fila / Columna)",
-            "Valor Detectado con error",
-            "Errores Detectados",
-            "Solución Sugerida (Dato Listo)",
-            "Comentarios",
-        ],
+    report.rows(len(cleaned))
+
+    # La copia corregida solo hace falta para Productos_Corregidos
+    report("auditoria", 0.5)
+    report.rows(len(cleaned))
+    corrected = cleaned.copy() if "Productos_Corregidos" in hojas else None
+    errores_df, ok_mask, _ = run_audit(
+        cleaned,
+        REGLAS_CONVERSION_QA,
+        {
+            "codigo": {"col": col_codigo, "label": "CODIGO", "default": ""},
+            "nombre": {"col": col_nombre, "label": "NOMBRE", "default": ""},
+            "unidad": {"col": col_unidad, "label": "UNIDAD", "default": "UNIDAD"},
+            "categoria": {"col": col_cat, "label": "CATEGORIA", "default": "SIN CATEGORIA"},
+            "stock": {"col": col_stock},
+            "pcost": {"col": col_pcost},
+            "pventa": {"col": col_pventa},
+        },
+        corrected=corrected,
+        build_errors="Errores_Detectados" in hojas,
     )
 
-    productos_ok = cleaned[pd.Series(ok_mask)].copy()
-    productos_corregidos = corrected[~pd.Series(ok_mask)].copy()
-
-    for dfx in (cleaned, corrected, productos_ok, productos_corregidos):
-        if ROW_ID_COL in dfx.columns:
-            dfx.drop(columns=[ROW_ID_COL], inplace=True)
-
-    plantilla_api = cleaned.copy()
-    if ROW_ID_COL in plantilla_api.columns:
-        plantilla_api.drop(columns=[ROW_ID_COL], inplace=True)
+    sin_row_id = lambda dfx: dfx.drop(columns=[ROW_ID_COL]) if ROW_ID_COL in dfx.columns else dfx
+    frames = {"Errores_Detectados": errores_df, "productos": sin_row_id(cleaned)}
+    if "Productos_OK" in hojas:
+        frames["Productos_OK"] = sin_row_id(cleaned[ok_mask])
+    if "Productos_Corregidos" in hojas:
+        frames["Productos_Corregidos"] = sin_row_id(corrected[~ok_mask])
 
-    out = io.BytesIO()
-    with pd.ExcelWriter(out, engine="openpyxl") as w:
-        errores_df.to_excel(w, index=False, sheet_name="Errores_Detectados")
-        productos_ok.to_excel(w, index=False, sheet_name="Productos_OK")
-        productos_corregidos.to_excel(w, index=False, sheet_name="Productos_Corregidos")
-        plantilla_api.to_excel(w, index=False, sheet_name="productos")
+    report("escritura", 0.6)
+    excel_out = write_output([(name, frames[name]) for name in hojas], output_format, out)
+    report.rows(sum(len(frames[name]) for name in hojas))
 
     stats = {
         "rows_before": int(len(df_input)),
-        "rows_ok": int(len(productos_ok)),
-        "rows_corrected": int(len(productos_corregidos)),
+        "rows_ok": int(ok_mask.sum()),
+        "rows_corrected": int((~ok_mask).sum()),
         "errors_count": int(len(errores_df)),
         "codes_fixed": int(stats_clean.get("codes_fixed", 0)),
+        "stages": report.close(),
     }
-    return out.getvalue(), stats
\ No newline at end of file
+    return excel_out, stats
\ No newline at end of file
@@ -1,15 +1,26 @@
-import io
+from functools import partial
+
+import numpy as np
 import pandas as pd
-from typing import Optional, Tuple
+from typing import BinaryIO, Callable, Iterable, Optional, Tuple, Union
 from .excel_cleaners import (
     normalize_text_value, clean_alnum_spaces, clean_category_value,
     clean_unit_value, clean_product_code, is_valid_product_code,
-    generate_unique_code, to_number, _find_col, _is_null, _json_safe,
-    process_product_code, IGV_FACTOR, ROW_ID_COL_DEFAULT
+    generate_unique_code, parse_numeric_series, _find_col, _json_safe,
+    process_product_codes, product_codes_report, apply_unique, IGV_FACTOR, ROW_ID_COL_DEFAULT,
+    as_text, compact_columns, duplicated_values, apply_columns,
 )
+from .excel_audit import REGLAS_NORMALIZE, apply_corrections, audit_report, merge_audits, run_audit
+from .excel_partitions import map_partitions, partition_count
+from .excel_reader import ExcelSource, read_catalog_sheet
+from .excel_writer import resolve_output, write_output
+from .stage_metrics import StageRecorder
+from .structured_logging import get_logger, log_row_samples
+
+logger = get_logger("normalize")
 
 def build_duplicate_groups(df: pd.DataFrame, col_nombre: str) -> list[dict]:
-    mask = df[col_nombre].astype(str).str.strip().ne("") & df[col_nombre].duplicated(keep=False)
+    mask = as_text(df[col_nombre]).str.strip().ne("") & duplicated_values(df[col_nombre])
     dups = df.loc[mask].copy()
     if dups.empty:
         return []
@@ -30,8 +41,8 @@ def build_duplicate_groups_with_row_id(
     if col_nombre not in df.columns or row_id_col not in df.columns:
         return []
 
-    s = df[col_nombre].astype(str).str.strip()
-    mask = s.ne("") & df[col_nombre].duplicated(keep=False)
+    s = as_text(df[col_nombre]).str.strip()
+    mask = s.ne("") & duplicated_values(df[col_nombre])
     dups = df.loc[mask].copy()
     if dups.empty:
         return []
@@ -44,108 +55,227 @@ def build_duplicate_groups_with_row_id(
     return groups
 
 
+class MissingColumnError(ValueError):
+    """Falta una columna obligatoria del catálogo (se responde 400)."""
+
+
 # ============================================================
-# NORMALIZACIÓN A DF (para /excel/analyze) - CARGA NORMAL
+# ANALYZE: duplicados por NOMBRE y por CÓDIGO
 # ============================================================
-def normalize_to_dataframe(
+def analyze_catalog_bytes(
     excel_bytes: bytes,
     round_numeric: Optional[int] = None,
-) -> tuple[pd.DataFrame, dict, dict]:
-    df = pd.read_excel(io.BytesIO(excel_bytes), engine="openpyxl", header=3)
+) -> tuple[dict, tuple[pd.DataFrame, dict, dict]]:
+    """
+    Trabajo de /excel/analyze (se ejecuta en el pool de workers).
+    Devuelve (respuesta sin upload_id, intermedio de parse_catalog para cachear).
+    """
+    report = StageRecorder()
+    report("lectura", 0.05)
+    parsed = parse_catalog(excel_bytes)
+    report.rows(parsed[2]["rows_before"])
+    df_norm, meta, _stats = normalize_to_dataframe(
+        excel_bytes, round_numeric=round_numeric, parsed=parsed, progress=report
+    )
+    report.rows(len(df_norm))
+    report("auditoria", 0.6)
+
+    col_nombre = meta.get("col_nombre")
+    if not col_nombre:
+        raise MissingColumnError("No se encontró columna NOMBRE")
+
+    ROW_ID_COL = "__ROW_ID__"
+    df_norm[ROW_ID_COL] = range(5, 5 + len(df_norm))
+
+    groups = build_duplicate_groups(df_norm, col_nombre)
+
+    # Analizar duplicados en CÓDIGO
+    grupos_codigo = []
+    col_codigo = meta.get("col_codigo")
+    if col_codigo and col_codigo in df_norm.columns:
+        codigos = df_norm[col_codigo].astype(str).str.strip()
+        codigos = codigos[codigos.ne("") & codigos.ne("nan")]
+        dup_codigos_mask = codigos.duplicated(keep=False)
+        if dup_codigos_mask.any():
+            dups_codigo = df_norm.loc[dup_codigos_mask]
+            for codigo, grupo in dups_codigo.groupby(col_codigo):
+                rows = []
+                for _, row in grupo.iterrows():
+                    row_dict = {
+                        "fila": int(row[ROW_ID_COL]),
+                        "codigo": str(row[col_codigo]),
+                        "nombre": str(row.get(col_nombre, ""))[:50]
+                    }
+                    rows.append(row_dict)
+
+                grupos_codigo.append({
+                    "codigo": str(codigo),
+                    "count": len(grupo),
+                    "rows": rows
+                })
+
+    result = {
+        "has_duplicates": len(groups) > 0,
+        "groups": groups,
+        "has_code_duplicates": len(grupos_codigo) > 0,
+        "code_duplicate_groups": grupos_codigo,
+        "columns_hint": list(df_norm.columns),
+    }
+    report.rows(len(df_norm))
+    result["stages"] = report.close()
+    return result, parsed
+
+
+# ============================================================
+# PARSEO + LIMPIEZA COMPARTIDA (analyze y normalize)
+# ============================================================
+def parse_catalog(excel_bytes: ExcelSource) -> tuple[pd.DataFrame, dict, dict]:
+    """
+    Etapa común a /excel/analyze y /excel/normalize: lectura, columnas
+    normalizadas, textos normalizados y limpieza de DESCRIPCION, CATEGORIA,
+    UNIDAD, MARCA y MODELO. No depende de los parámetros de la petición,
+    por eso se puede cachear por upload_id y reutilizar.
+    excel_bytes: bytes del libro o la ruta de un upload derramado a disco.
+    """
+    return parse_catalog_frame(read_catalog_sheet(excel_bytes, header_row=3))
+
+
+def _sin_marca(x):
+    return "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip()
+
+
+def parse_catalog_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, dict, dict]:
+    """parse_catalog sobre la hoja ya leída (encabezados originales)."""
     before_rows = len(df)
 
     df.columns = [normalize_text_value(c) for c in df.columns]
 
-    col_codigo = _find_col(df, "CODIGO")
-    col_nombre = _find_col(df, "NOMBRE")
-    col_desc = _find_col(df, "DESCRIPCION")
-    col_cat = _find_col(df, "CATEGORIA")
-    col_pcost = _find_col(df, "PRECIO DE COSTO")
-    col_pventa = _find_col(df, "PRECIO DE VENTA")
-    col_unidad = _find_col(df, "UNIDAD")
-    col_stock = _find_col(df, "CANTIDAD") or _find_col(df, "STOCK")
-    col_stock_min = _find_col(df, "STOCK MINIMO")
-    col_marca = _find_col(df, "MARCA")
-    col_modelo = _find_col(df, "MODELO")
-    col_porcentaje = _find_col(df, "PORCENTAJE") or _find_col(df, "PORCENTAJE COSTO")
-
-    for c in df.columns:
-        if df[c].dtype == "object":
-            df[c] = df[c].apply(normalize_text_value)
+    meta = {
+        "col_codigo": _find_col(df, "CODIGO"),
+        "col_nombre": _find_col(df, "NOMBRE"),
+        "col_codigo_padre": _find_col(df, "CODIGO PADRE"),
+        "col_codigo_alterno": _find_col(df, "CODIGO ALTERNO"),
+        "col_desc": _find_col(df, "DESCRIPCION"),
+        "col_cat": _find_col(df, "CATEGORIA"),
+        "col_pcost": _find_col(df, "PRECIO DE COSTO"),
+        "col_pventa": _find_col(df, "PRECIO DE VENTA"),
+        "col_unidad": _find_col(df, "UNIDAD"),
+        "col_stock": _find_col(df, "CANTIDAD") or _find_col(df, "STOCK"),
+        "col_stock_min": _find_col(df, "STOCK MINIMO"),
+        "col_marca": _find_col(df, "MARCA"),
+        "col_modelo": _find_col(df, "MODELO"),
+        "col_porcentaje": _find_col(df, "PORCENTAJE") or _find_col(df, "PORCENTAJE COSTO"),
+        "col_almacenable": _find_col(df, "ALMACENABLE"),
+    }
+
+    # Columna a columna (en paralelo en modo free-threaded)
+    normalizar = partial(apply_unique, func=normalize_text_value, memo=True)
+    apply_columns(df, [(c, normalizar) for c in df.columns if df[c].dtype == "object"])
 
-    if col_nombre:
-        df[col_nombre] = df[col_nombre].apply(clean_alnum_spaces)
+    col_desc = meta["col_desc"]
+    col_cat = meta["col_cat"]
+    limpiezas = []
     if col_desc:
-        df[col_desc] = df[col_desc].apply(clean_alnum_spaces)
+        limpiezas.append((col_desc, partial(apply_unique, func=clean_alnum_spaces, memo=True)))
     if col_cat:
-        df[col_cat] = df[col_cat].apply(clean_category_value)
+        limpiezas.append((col_cat, partial(apply_unique, func=clean_category_value, memo=True)))
+    if meta["col_unidad"]:
+        limpiezas.append((meta["col_unidad"], partial(apply_unique, func=clean_unit_value, memo=True)))
+    if meta["col_marca"]:
+        limpiezas.append((meta["col_marca"], partial(apply_unique, func=_sin_marca)))
+    if meta["col_modelo"]:
+        limpiezas.append((meta["col_modelo"], partial(apply_unique, func=_sin_marca)))
+    apply_columns(df, limpiezas)
+
+    if not meta["col_unidad"]:
+        meta["col_unidad"] = "__UNIDAD__"
+        df["__UNIDAD__"] = "UNIDAD"
+    if not meta["col_marca"]:
+        meta["col_marca"] = "__MARCA__"
+        df["__MARCA__"] = "S/M"
+    if not meta["col_modelo"]:
+        meta["col_modelo"] = "__MODELO__"
+        df["__MODELO__"] = "S/M"
+
+    # Columnas de pocos valores -> category (el DF queda cacheado por upload_id)
+    compact_columns(df, [col_cat, meta["col_unidad"], meta["col_marca"], meta["col_modelo"], meta["col_almacenable"]])
+
+    stats = {"rows_before": int(before_rows)}
+    return df, meta, stats
 
-    if col_unidad:
-        df[col_unidad] = df[col_unidad].apply(clean_unit_value)
-    else:
-        col_unidad = "__UNIDAD__"
-        df[col_unidad] = "UNIDAD"
 
-    if col_marca:
-        df[col_marca] = df[col_marca].apply(
-            lambda x: "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip()
-        )
-    else:
-        col_marca = "__MARCA__"
-        df[col_marca] = "S/M"
+# ============================================================
+# NORMALIZACIÓN A DF (para /excel/analyze) - CARGA NORMAL
+# ============================================================
+def normalize_to_dataframe(
+    excel_bytes: bytes,
+    round_numeric: Optional[int] = None,
+    parsed: Optional[tuple[pd.DataFrame, dict, dict]] = None,
+    progress: Optional[Callable[[str, float], None]] = None,
+) -> tuple[pd.DataFrame, dict, dict]:
+    report = StageRecorder(progress)
+    if parsed is None:
+        report("lectura", 0.05)
+        parsed = parse_catalog(excel_bytes)
+    parsed_df, parsed_meta, parsed_stats = parsed
+    before_rows = parsed_stats["rows_before"]
+    report.rows(before_rows, "lectura")
+
+    report("limpieza", 0.3)
+    df = parsed_df.copy()
+
+    col_codigo = parsed_meta["col_codigo"]
+    col_nombre = parsed_meta["col_nombre"]
+    col_desc = parsed_meta["col_desc"]
+    col_cat = parsed_meta["col_cat"]
+    col_pcost = parsed_meta["col_pcost"]
+    col_pventa = parsed_meta["col_pventa"]
+    col_unidad = parsed_meta["col_unidad"]
+    col_stock = parsed_meta["col_stock"]
+    col_stock_min = parsed_meta["col_stock_min"]
+    col_marca = parsed_meta["col_marca"]
+    col_modelo = parsed_meta["col_modelo"]
+    col_porcentaje = parsed_meta["col_porcentaje"]
 
-    if col_modelo:
-        df[col_modelo] = df[col_modelo].apply(
-            lambda x: "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip()
-        )
-    else:
-        col_modelo = "__MODELO__"
-        df[col_modelo] = "S/M"
+    if col_nombre:
+        df[col_nombre] = apply_unique(df[col_nombre], clean_alnum_spaces, memo=True)
 
-    existing = set()
     codes_fixed = 0
-
-    def fix_code(v):
-        nonlocal codes_fixed
-        resultado = process_product_code(v, existing)
-        if resultado["es_generico"]:
-            codes_fixed += 1
-        return resultado["codigo_final"]
-
     if col_codigo:
-        df[col_codigo] = df[col_codigo].apply(fix_code)
+        codigos = process_product_codes(df[col_codigo])
+        df[col_codigo] = codigos["codigo_final"]
+        codes_fixed = int(codigos["es_generico"].sum())
 
     if col_pcost:
-        df[col_pcost] = df[col_pcost].apply(to_number).apply(lambda x: 0.0 if _is_null(x) else x)
+        df[col_pcost] = parse_numeric_series(df[col_pcost], default=0.0)
     else:
         col_pcost = "__PCOST__"
         df[col_pcost] = 0.0
 
     if col_pventa:
-        df[col_pventa] = df[col_pventa].apply(to_number).apply(lambda x: 1.0 if _is_null(x) else x)
+        df[col_pventa] = parse_numeric_series(df[col_pventa], default=1.0)
     else:
         col_pventa = "__PVENTA__"
         df[col_pventa] = 1.0
 
     if col_stock:
-        df[col_stock] = df[col_stock].apply(to_number).apply(lambda x: 0.0 if _is_null(x) else x)
+        df[col_stock] = parse_numeric_series(df[col_stock], default=0.0)
     else:
         col_stock = "__STOCK__"
         df[col_stock] = 0.0
 
     if col_stock_min:
-        df[col_stock_min] = df[col_stock_min].apply(to_number)
+        df[col_stock_min] = parse_numeric_series(df[col_stock_min])
 
     if col_cat:
-        df[col_cat] = df[col_cat].apply(lambda x: x if str(x).strip() else "SIN CATEGORIA")
+        df[col_cat] = apply_unique(df[col_cat], lambda x: x if str(x).strip() else "SIN CATEGORIA")
     else:
         col_cat = "__CAT__"
         df[col_cat] = "SIN CATEGORIA"
 
     if col_porcentaje:
-        df[col_porcentaje] = df[col_porcentaje].apply(to_number).apply(
-            lambda x: 18.0 if _is_null(x) or x <= 0 else x
-        )
+        porcentaje = parse_numeric_series(df[col_porcentaje], default=18.0)
+        df[col_porcentaje] = porcentaje.mask(porcentaje <= 0, 18.0)
     else:
         col_porcentaje = "__PORCENTAJE__"
         df[col_porcentaje] = 18.0
@@ -169,128 +299,98 @@ def normalize_to_dataframe(
         "col_porcentaje": col_porcentaje,
     }
 
-    stats = {"rows_before": int(before_rows), "codes_fixed": int(codes_fixed)}
+    report.rows(len(df))
+    stats = {"rows_before": int(before_rows), "codes_fixed": int(codes_fixed), "stages": report.close()}
     return df, meta, stats
 
 
 # ============================================================
-# FUNCIÓN PRINCIPAL (genera Excel QA) - CARGA NORMAL
+# Etapa memoizable: todo lo que no depende de los toggles
+# (IGV, redondeo, tienda); solo de la selección de duplicados
 # ============================================================
-def normalize_excel_bytes(
+def prepared_key(selected_row_ids: Optional[Iterable[int]]) -> tuple:
+    """Entrada de prepare_stage (además del upload): la selección, sin orden ni repetidos."""
+    return tuple(sorted({int(x) for x in selected_row_ids or ()}))
+
+
+def prepare_stage(
     excel_bytes: bytes,
-    round_numeric: Optional[int] = None,
     selected_row_ids: Optional[list[int]] = None,
-    apply_igv_cost: bool = False,
-    apply_igv_sale: bool = False,
-    tienda_nombre: str = "Tienda1",
-) -> Tuple[bytes, dict]:
-    ROW_ID_COL = ROW_ID_COL_DEFAULT
+    parsed: Optional[tuple[pd.DataFrame, dict, dict]] = None,
+    report: Callable[[str, float], None] = lambda stage, value: None,
+) -> tuple[pd.DataFrame, dict, dict]:
+    """
+    Parseo + limpieza global + limpieza por fila, sin IGV ni redondeo.
+    La salida se puede memoizar por (upload_id, prepared_key(selected_row_ids))
+    y pasar como `prepared` a normalize_excel_bytes / validate_catalog_bytes.
+    """
+    df, meta, stats = _prepare_global(excel_bytes, selected_row_ids, parsed, report)
+    df, meta = _clean_rows(df, meta)
+    return df, meta, stats
 
-    df = pd.read_excel(io.BytesIO(excel_bytes), engine="openpyxl", header=3)
-    before_rows = len(df)
 
-    df.columns = [normalize_text_value(c) for c in df.columns]
+def _reuse_prepared(
+    prepared: tuple[pd.DataFrame, dict, dict],
+    report: Callable[[str, float], None],
+) -> tuple[pd.DataFrame, dict, dict]:
+    # Copia superficial: después solo se reemplazan columnas completas,
+    # el DF memoizado no se modifica
+    report("lectura", 0.05)
+    report("limpieza", 0.3)
+    df, meta, stats = prepared
+    return df.copy(deep=False), dict(meta), dict(stats)
+
 
-    # Row id estable para UI
-    df[ROW_ID_COL] = range(5, 5 + len(df))
-
-    col_codigo = _find_col(df, "CODIGO")
-    col_nombre = _find_col(df, "NOMBRE")
-    col_codigo_padre = _find_col(df, "CODIGO PADRE")
-    col_codigo_alterno = _find_col(df, "CODIGO ALTERNO")
-    col_desc = _find_col(df, "DESCRIPCION")
-    col_cat = _find_col(df, "CATEGORIA")
-    col_pcost = _find_col(df, "PRECIO DE COSTO")
-    col_pventa = _find_col(df, "PRECIO DE VENTA")
-    col_unidad = _find_col(df, "UNIDAD")
-    col_porcentaje = _find_col(df, "PORCENTAJE") or _find_col(df, "PORCENTAJE COSTO")
-    col_marca = _find_col(df, "MARCA")
-    col_modelo = _find_col(df, "MODELO")
-    col_almacenable = _find_col(df, "ALMACENABLE")
-    col_stock = _find_col(df, "CANTIDAD") or _find_col(df, "STOCK")
-    col_stock_min = _find_col(df, "STOCK MINIMO")
-
-    for c in df.columns:
-        if df[c].dtype == "object":
-            df[c] = df[c].apply(normalize_text_value)
+def _prepare_global(
+    excel_bytes: bytes,
+    selected_row_ids: Optional[list[int]],
+    parsed: Optional[tuple[pd.DataFrame, dict, dict]],
+    report: Callable[[str, float], None],
+) -> tuple[pd.DataFrame, dict, dict]:
+    """
+    Pasos que dependen de todo el catálogo: filtro de duplicados por NOMBRE,
+    códigos (duplicados + CM únicos) y CODIGO PADRE (primera aparición).
+    """
+    report("lectura", 0.05)
+    if parsed is None:
+        parsed = parse_catalog(excel_bytes)
+    parsed_df, parsed_meta, parsed_stats = parsed
+    # Copia superficial: aquí solo se reemplazan columnas completas (df[col] = ...),
+    # nunca se escribe sobre los arrays del DF cacheado por upload_id
+    df = parsed_df.copy(deep=False)
+    before_rows = parsed_stats["rows_before"]
+
+    # Row id estable para UI (fuera del DF: solo lo usa el filtro de duplicados)
+    row_ids = np.arange(5, 5 + len(df))
+
+    col_codigo = parsed_meta["col_codigo"]
+    col_nombre = parsed_meta["col_nombre"]
+    col_codigo_padre = parsed_meta["col_codigo_padre"]
+
+    report("limpieza", 0.3)
 
     # Para NOMBRE, solo convertir a mayúsculas sin limpieza de caracteres especiales
     if col_nombre:
-        df[col_nombre] = df[col_nombre].apply(lambda x: str(x).upper() if pd.notna(x) else "")
-    
-    # Las demás columnas mantienen su limpieza normal
-    if col_desc:
-        df[col_desc] = df[col_desc].apply(clean_alnum_spaces)
-    if col_cat:
-        df[col_cat] = df[col_cat].apply(clean_category_value)
-
-    if col_unidad:
-        df[col_unidad] = df[col_unidad].apply(clean_unit_value)
-    else:
-        col_unidad = "__UNIDAD__"
-        df[col_unidad] = "UNIDAD"
-
-    if col_marca:
-        df[col_marca] = df[col_marca].apply(
-            lambda x: "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip()
-        )
-    else:
-        col_marca = "__MARCA__"
-        df[col_marca] = "S/M"
-
-    if col_modelo:
-        df[col_modelo] = df[col_modelo].apply(
-            lambda x: "S/M" if pd.isna(x) or str(x).strip() == "" else str(x).strip()
-        )
-    else:
-        col_modelo = "__MODELO__"
-        df[col_modelo] = "S/M"
-
-    # PORCENTAJE ahora SIEMPRE 18
-    porcentaje_default = 18.0
-    if col_porcentaje:
-        df[col_porcentaje] = df[col_porcentaje].apply(to_number).apply(
-            lambda x: porcentaje_default if _is_null(x) or x <= 0 else x
-        )
-    else:
-        col_porcentaje = "__PORCENTAJE__"
-        df[col_porcentaje] = porcentaje_default
+        df[col_nombre] = apply_unique(df[col_nombre], lambda x: str(x).upper() if pd.notna(x) else "")
 
     # filtro duplicados por NOMBRE (selección UI)
     if selected_row_ids is not None and len(selected_row_ids) > 0 and col_nombre:
         wanted = set(int(x) for x in selected_row_ids)
 
-        dup_mask = df[col_nombre].astype(str).str.strip().ne("") & df[col_nombre].duplicated(keep=False)
-        dup_row_ids = set(df.loc[dup_mask, ROW_ID_COL].astype(int).tolist())
+        dup_mask = as_text(df[col_nombre]).str.strip().ne("") & duplicated_values(df[col_nombre])
 
-        keep_mask = (~df[ROW_ID_COL].isin(dup_row_ids)) | (df[ROW_ID_COL].isin(wanted))
-        df = df.loc[keep_mask].copy().reset_index(drop=True)
+        keep_mask = ~dup_mask.to_numpy() | np.isin(row_ids, list(wanted))
+        # take (sin .copy() + reset_index): una sola copia de las filas que quedan
+        df = df.take(np.flatnonzero(keep_mask))
+        df.index = pd.RangeIndex(len(df))
 
-    # Códigos: NUEVA VERSIÓN CON REGISTRO DE ESTADO
-    existing_codigo = set()
+    # Códigos: NUEVA VERSIÓN CON REGISTRO DE ESTADO (por lote)
     codes_fixed = 0
-    codigos_info = []  # Para tracking en frontend
-
-    def procesar_codigo_con_registro(v, row_idx):
-        nonlocal codes_fixed
-        resultado = process_product_code(v, existing_codigo, row_idx)
-        
-        if resultado["es_generico"]:
-            codes_fixed += 1
-        
-        # Guardar info para frontend/Excel
-        codigos_info.append({
-            "fila": row_idx + 5,  # +5 por el header
-            "original": resultado["codigo_original"],
-            "final": resultado["codigo_final"],
-            "es_generico": resultado["es_generico"],
-            "razon": resultado["razon"]
-        })
-        
-        return resultado["codigo_final"]
-
+    codigos = process_product_codes(df[col_codigo] if col_codigo else pd.Series([], dtype=object))
     if col_codigo:
-        df[col_codigo] = [procesar_codigo_con_registro(v, i) for i, v in enumerate(df[col_codigo])]
+        df[col_codigo] = codigos["codigo_final"]
+        codes_fixed = int(codigos["es_generico"].sum())
+    log_row_samples(logger, "normalize.codigo", codigos)
 
     def fix_code_blank_factory():
         seen = set()
@@ -308,150 +408,300 @@ def normalize_excel_bytes(
     if col_codigo_padre:
         df[col_codigo_padre] = df[col_codigo_padre].apply(fix_code_blank_factory())
 
+    stats = {"rows_before": int(before_rows), "codes_fixed": int(codes_fixed), "codigos": codigos}
+    return df, dict(parsed_meta), stats
+
+
+def _porcentaje_series(s: pd.Series, default: float) -> pd.Series:
+    porcentaje = parse_numeric_series(s, default=default)
+    return porcentaje.mask(porcentaje <= 0, default)
+
+
+def _categoria_o_default(x):
+    return x if str(x).strip() else "SIN CATEGORIA"
+
+
+def _almacenable_si_no(x):
+    return "SI" if str(x).upper() in ["SI", "S", "YES", "Y", "1", "TRUE"] else "NO"
+
+
+def _clean_rows(df: pd.DataFrame, meta: dict) -> tuple[pd.DataFrame, dict]:
+    """
+    Limpieza fila a fila (numéricos, defaults): no depende de otras filas,
+    por eso se puede correr por particiones, ni de los toggles.
+    Devuelve (df, meta con las columnas por defecto agregadas).
+    """
+    meta = dict(meta)
+
+    # Limpieza por columna (to_number, categoría, almacenable); en paralelo
+    # en modo free-threaded. Las columnas faltantes se agregan después.
+    limpiezas = []
+
+    # PORCENTAJE ahora SIEMPRE 18
+    porcentaje_default = 18.0
+    if meta["col_porcentaje"]:
+        limpiezas.append((meta["col_porcentaje"], partial(_porcentaje_series, default=porcentaje_default)))
+
     # Numéricos + defaults
-    if col_pcost:
-        df[col_pcost] = df[col_pcost].apply(to_number).apply(lambda x: 0.0 if _is_null(x) else x)
-    else:
-        col_pcost = "__PCOST__"
-        df[col_pcost] = 0.0
+    numericos = (
+        ("col_pcost", 0.0, "__PCOST__"),
+        ("col_pventa", 1.0, "__PVENTA__"),
+        ("col_stock", 0.0, "__STOCK__"),
+    )
+    for key, default, _ in numericos:
+        if meta[key]:
+            limpiezas.append((meta[key], partial(parse_numeric_series, default=default)))
 
-    if col_pventa:
-        df[col_pventa] = df[col_pventa].apply(to_number).apply(lambda x: 1.0 if _is_null(x) else x)
-    else:
-        col_pventa = "__PVENTA__"
-        df[col_pventa] = 1.0
+    if meta["col_stock_min"]:
+        limpiezas.append((meta["col_stock_min"], parse_numeric_series))
 
-    if col_stock:
-        df[col_stock] = df[col_stock].apply(to_number).apply(lambda x: 0.0 if _is_null(x) else x)
-    else:
-        col_stock = "__STOCK__"
-        df[col_stock] = 0.0
+    if meta["col_cat"]:
+        limpiezas.append((meta["col_cat"], partial(apply_unique, func=_categoria_o_default)))
 
-    if col_stock_min:
-        df[col_stock_min] = df[col_stock_min].apply(to_number)
+    if meta["col_almacenable"]:
+        limpiezas.append((meta["col_almacenable"], partial(apply_unique, func=_almacenable_si_no)))
 
-    if col_cat:
-        df[col_cat] = df[col_cat].apply(lambda x: x if str(x).strip() else "SIN CATEGORIA")
-    else:
-        col_cat = "__CAT__"
-        df[col_cat] = "SIN CATEGORIA"
+    apply_columns(df, limpiezas)
 
-    if col_almacenable:
-        df[col_almacenable] = df[col_almacenable].apply(
-            lambda x: "SI" if str(x).upper() in ["SI", "S", "YES", "Y", "1", "TRUE"] else "NO"
-        )
-    else:
-        col_almacenable = "__ALMACENABLE__"
-        df[col_almacenable] = "SI"
+    if not meta["col_porcentaje"]:
+        meta["col_porcentaje"] = "__PORCENTAJE__"
+        df["__PORCENTAJE__"] = porcentaje_default
+    for key, default, fallback in numericos:
+        if not meta[key]:
+            meta[key] = fallback
+            df[fallback] = default
+    if not meta["col_cat"]:
+        meta["col_cat"] = "__CAT__"
+        df["__CAT__"] = "SIN CATEGORIA"
+    if not meta["col_almacenable"]:
+        meta["col_almacenable"] = "__ALMACENABLE__"
+        df["__ALMACENABLE__"] = "SI"
+
+    return df, meta
 
+
+def _apply_toggles(
+    df: pd.DataFrame,
+    meta: dict,
+    round_numeric: Optional[int],
+    apply_igv_cost: bool,
+    apply_igv_sale: bool,
+) -> pd.DataFrame:
+    """IGV y redondeo sobre el DF ya limpio (fila a fila, por particiones)."""
     # APLICAR IGV A TODOS LOS DATOS ANTES DE LA AUDITORÍA
-    df_con_igv = df.copy()
-    
-    if apply_igv_cost and col_pcost:
-        df_con_igv[col_pcost] = df_con_igv[col_pcost].apply(lambda x: x * IGV_FACTOR if not _is_null(x) else x)
-    
-    if apply_igv_sale and col_pventa:
-        df_con_igv[col_pventa] = df_con_igv[col_pventa].apply(lambda x: x * IGV_FACTOR if not _is_null(x) else x)
+    # (sobre df directamente: la versión sin IGV no se vuelve a usar)
+    if apply_igv_cost:
+        df[meta["col_pcost"]] = df[meta["col_pcost"]] * IGV_FACTOR
+
+    if apply_igv_sale:
+        df[meta["col_pventa"]] = df[meta["col_pventa"]] * IGV_FACTOR
 
     # 🔴 REDONDEAR AQUÍ DESPUÉS DE IGV Y ANTES DE AUDITORÍA 🔴
     if round_numeric is not None:
-        num_cols = df_con_igv.select_dtypes(include=["number"]).columns
-        df_con_igv[num_cols] = df_con_igv[num_cols].round(round_numeric)
+        # columna a columna: no se arma un DF intermedio con todas las numéricas
+        for c in df.select_dtypes(include=["number"]).columns:
+            df[c] = df[c].round(round_numeric)
+
+    return df
+
+
+def _compact_catalog(df: pd.DataFrame, meta: dict) -> None:
+    # category / float32 / int32 donde no cambia lo que se escribe
+    compact_columns(
+        df,
+        [meta[k] for k in (
+            "col_cat", "col_unidad", "col_marca", "col_modelo", "col_almacenable",
+            "col_porcentaje", "col_stock", "col_stock_min",
+        )],
+    )
 
-    # Auditoría + correcciones (usando df_con_igv como base)
-    errores = []
-    ok_mask = []
-    corrected = df_con_igv.copy()
-
-    def push_error(i, codigo, colname, valor, err, solucion, comentario):
-        errores.append(
-            {
-                "Código": codigo,
-                "Ubicación (Fila / Columna)": f"{i+2} / {colname}",
-                "Valor Detectado con error": valor,
-                "Errores Detectados": err,
-                "Solución Sugerida (Dato Listo)": solucion,
-                "Comentarios": comentario,
-            }
-        )
 
-    for i in range(len(df_con_igv)):
-        ok = True
-
-        codigo = df_con_igv.at[i, col_codigo] if col_codigo else ""
-        nombre = df_con_igv.at[i, col_nombre] if col_nombre else ""
-        unidad = df_con_igv.at[i, col_unidad] if col_unidad else ""
-        categoria = df_con_igv.at[i, col_cat] if col_cat else "SIN CATEGORIA"
-
-        pc = float(df_con_igv.at[i, col_pcost])
-        pv = float(df_con_igv.at[i, col_pventa])
-        st = float(df_con_igv.at[i, col_stock])
-
-        if not str(codigo).strip():
-            ok = False
-            push_error(i, codigo, col_codigo or "CODIGO", "", "CÓDIGO VACÍO", codigo, "Código es obligatorio.")
-
-        if not str(nombre).strip():
-            ok = False
-            push_error(i, codigo, col_nombre or "NOMBRE", "", "NOMBRE VACÍO", "", "Nombre es obligatorio.")
-
-        if not str(unidad).strip():
-            ok = False
-            push_error(i, codigo, col_unidad or "UNIDAD", "", "UNIDAD VACÍA", "UNIDAD", "Unidad es obligatoria. Se asigna UNIDAD.")
-
-        if str(categoria).strip() == "SIN CATEGORIA":
-            push_error(i, codigo, col_cat or "CATEGORIA", "", "CATEGORÍA VACÍA -> DEFAULT", "SIN CATEGORIA", "Se asignó default por categoría vacía/ inválida.")
-
-        if st < 0:
-            ok = False
-            corrected.at[i, col_stock] = 0.0
-            push_error(i, codigo, col_stock, st, "STOCK NEGATIVO", 0.0, "Stock no puede ser negativo. Se ajustó a 0.")
-
-        if pc < 0:
-            ok = False
-            corrected.at[i, col_pcost] = 0.0
-            push_error(i, codigo, col_pcost, pc, "PRECIO COSTO < 0", 0.0, "Costo mínimo 0. Se ajustó a 0.")
-
-        if pv < 1:
-            ok = False
-            corrected.at[i, col_pventa] = 1.0
-            push_error(i, codigo, col_pventa, pv, "PRECIO VENTA < 1", 1.0, "Venta mínima 1. Se ajustó a 1.")
-
-        pc2 = float(corrected.at[i, col_pcost])
-        pv2 = float(corrected.at[i, col_pventa])
-        if pv2 <= pc2:
-            ok = False
-            push_error(i, codigo, col_pventa, pv2, "PRECIO VENTA <= PRECIO COSTO", pv2, "Regla: venta debe ser mayor que costo. No se ajusta automático.")
-
-        ok_mask.append(ok)
-
-    errores_df = pd.DataFrame(
-        errores,
-        columns=[
-            "Código",
-            "Ubicación (Fila / Columna)",
-            "Valor Detectado con error",
-            "Errores Detectados",
-            "Solución Sugerida (Dato Listo)",
-            "Comentarios",
-        ],
+def _prepare_and_audit_partition(
+    df: pd.DataFrame,
+    offset: int,
+    meta: dict,
+    cleaned: bool,
+    round_numeric: Optional[int],
+    apply_igv_cost: bool,
+    apply_igv_sale: bool,
+    build_errors: bool,
+) -> tuple[pd.DataFrame, dict, tuple[pd.DataFrame, np.ndarray, list]]:
+    """Trabajo de una partición (en el pool de particiones): _clean_rows + toggles + auditoría."""
+    if not cleaned:
+        df, meta = _clean_rows(df, meta)
+    df = _apply_toggles(df, meta, round_numeric, apply_igv_cost, apply_igv_sale)
+    correcciones = []
+    errores_df, ok_mask, _ = run_audit(
+        df,
+        REGLAS_NORMALIZE,
+        _campos_auditoria(meta),
+        corrections=correcciones,
+        build_errors=build_errors,
+        row_offset=offset,
     )
+    return df, meta, (errores_df, ok_mask, correcciones)
+
+
+def prepare_and_audit(
+    excel_bytes: bytes,
+    round_numeric: Optional[int] = None,
+    selected_row_ids: Optional[list[int]] = None,
+    apply_igv_cost: bool = False,
+    apply_igv_sale: bool = False,
+    parsed: Optional[tuple[pd.DataFrame, dict, dict]] = None,
+    report: Callable[[str, float], None] = lambda stage, value: None,
+    build_errors: bool = True,
+    partitions: Optional[int] = None,
+    prepared: Optional[tuple[pd.DataFrame, dict, dict]] = None,
+    keep_prepared: bool = False,
+) -> tuple[pd.DataFrame, dict, dict, tuple[pd.DataFrame, np.ndarray, list]]:
+    """
+    prepare_stage + IGV/redondeo (_apply_toggles) + run_audit(REGLAS_NORMALIZE).
+    Con más de una partición (ver excel_partitions) la limpieza fila a fila
+    y la auditoría corren por bloques de filas en procesos aparte; lo global
+    (duplicados, códigos, CODIGO PADRE) se resuelve antes, sobre todo el catálogo.
+    prepared: salida memoizada de prepare_stage (misma selección): solo se
+    recalculan IGV, redondeo y auditoría. keep_prepared: devolver la salida
+    de prepare_stage en stats["prepared"] para memoizarla.
+    Devuelve (df, meta, stats, (errores_df, ok_mask, correcciones)).
+    """
+    if prepared is not None:
+        df, meta, stats = _reuse_prepared(prepared, report)
+        cleaned = True
+    elif keep_prepared:
+        # La limpieza por fila va entera antes de particionar: su salida se memoiza
+        df, meta, stats = prepare_stage(excel_bytes, selected_row_ids, parsed, report)
+        stats["prepared"] = (df.copy(deep=False), dict(meta), dict(stats))
+        cleaned = True
+    else:
+        df, meta, stats = _prepare_global(excel_bytes, selected_row_ids, parsed, report)
+        cleaned = False
+
+    n = partition_count(len(df), partitions)
+    if n > 1:
+        # En este modo la auditoría corre junto con la limpieza de cada partición
+        parts = map_partitions(
+            _prepare_and_audit_partition, df, n,
+            meta, cleaned, round_numeric, apply_igv_cost, apply_igv_sale, build_errors,
+        )
+        report("auditoria", 0.5)
+        del df
+        meta = parts[0][1]
+        df = pd.concat([p[0] for p in parts], ignore_index=True)
+        audit = merge_audits([p[2] for p in parts])
+        del parts
+        _compact_catalog(df, meta)
+    else:
+        if not cleaned:
+            df, meta = _clean_rows(df, meta)
+        df = _apply_toggles(df, meta, round_numeric, apply_igv_cost, apply_igv_sale)
+        _compact_catalog(df, meta)
+        report("auditoria", 0.5)
+        correcciones = []
+        errores_df, ok_mask, _ = run_audit(
+            df,
+            REGLAS_NORMALIZE,
+            _campos_auditoria(meta),
+            corrections=correcciones,
+            build_errors=build_errors,
+        )
+        audit = (errores_df, ok_mask, correcciones)
+    stats["partitions"] = n
+    stats["prepared_cached"] = prepared is not None
+    return df, meta, stats, audit
+
+
+def _campos_auditoria(meta: dict) -> dict:
+    return {
+        "codigo": {"col": meta["col_codigo"], "label": "CODIGO", "default": ""},
+        "nombre": {"col": meta["col_nombre"], "label": "NOMBRE", "default": ""},
+        "unidad": {"col": meta["col_unidad"], "label": "UNIDAD", "default": ""},
+        "categoria": {"col": meta["col_cat"], "label": "CATEGORIA", "default": "SIN CATEGORIA"},
+        "stock": {"col": meta["col_stock"]},
+        "pcost": {"col": meta["col_pcost"]},
+        "pventa": {"col": meta["col_pventa"]},
+    }
 
-    # DataFrame de códigos procesados
-    codigos_df = pd.DataFrame(codigos_info, columns=[
-        "Fila", "Código Original", "Código Final", 
-        "Es Genérico", "Razón"
-    ])
 
-    productos_ok = df_con_igv[pd.Series(ok_mask)].copy()
-    productos_corregidos = corrected[~pd.Series(ok_mask)].copy()
+# ============================================================
+# FUNCIÓN PRINCIPAL (genera Excel QA) - CARGA NORMAL
+# ============================================================
+def normalize_excel_bytes(
+    excel_bytes: bytes,
+    round_numeric: Optional[int] = None,
+    selected_row_ids: Optional[list[int]] = None,
+    apply_igv_cost: bool = False,
+    apply_igv_sale: bool = False,
+    tienda_nombre: str = "Tienda1",
+    parsed: Optional[tuple[pd.DataFrame, dict, dict]] = None,
+    progress: Optional[Callable[[str, float], None]] = None,
+    out: Union[str, BinaryIO, None] = None,
+    sheets: Optional[Iterable[str]] = None,
+    output_format: str = "xlsx",
+    partitions: Optional[int] = None,
+    prepared: Optional[tuple[pd.DataFrame, dict, dict]] = None,
+    keep_prepared: bool = False,
+) -> Tuple[Optional[bytes], dict]:
+    """
+    progress(etapa, fraccion): callback opcional (jobs asíncronos).
+    out: ruta/archivo donde escribir el resultado; sin out se devuelven los bytes.
+    sheets / output_format: hojas a construir y formato (ver resolve_output).
+    partitions: particiones para limpieza + auditoría (default: NORMALIZE_PARTITIONS).
+    prepared / keep_prepared: etapa memoizada (ver prepare_and_audit); con
+    keep_prepared la salida de prepare_stage vuelve en stats["prepared"].
+    """
+    report = StageRecorder(progress)
+    hojas = resolve_output(sheets, output_format)
 
-    # eliminar row_id antes de escribir
-    for dfx in (df_con_igv, corrected, productos_ok, productos_corregidos):
-        if ROW_ID_COL in dfx.columns:
-            dfx.drop(columns=[ROW_ID_COL], inplace=True)
+    # Auditoría + correcciones (usando df_con_igv como base)
+    df_con_igv, meta, prep, (errores_df, ok_mask, correcciones) = prepare_and_audit(
+        excel_bytes,
+        round_numeric=round_numeric,
+        selected_row_ids=selected_row_ids,
+        apply_igv_cost=apply_igv_cost,
+        apply_igv_sale=apply_igv_sale,
+        parsed=parsed,
+        report=report,
+        build_errors="Errores_Detectados" in hojas,
+        partitions=partitions,
+        prepared=prepared,
+        keep_prepared=keep_prepared,
+    )
+    before_rows = prep["rows_before"]
+    codes_fixed = prep["codes_fixed"]
+    report.rows(before_rows, "lectura")
+    report.rows(len(df_con_igv), "limpieza")
+    report.rows(len(df_con_igv))
+
+    col_codigo = meta["col_codigo"]
+    col_nombre = meta["col_nombre"]
+    col_codigo_padre = meta["col_codigo_padre"]
+    col_codigo_alterno = meta["col_codigo_alterno"]
+    col_desc = meta["col_desc"]
+    col_cat = meta["col_cat"]
+    col_pcost = meta["col_pcost"]
+    col_pventa = meta["col_pventa"]
+    col_unidad = meta["col_unidad"]
+    col_porcentaje = meta["col_porcentaje"]
+    col_marca = meta["col_marca"]
+    col_modelo = meta["col_modelo"]
+    col_almacenable = meta["col_almacenable"]
+    col_stock = meta["col_stock"]
+    col_stock_min = meta["col_stock_min"]
+
+    # DataFrame de códigos procesados y su versión para frontend
+    codigos_df = product_codes_report(prep["codigos"])
+    codigos_info = codigos_df.set_axis(
+        ["fila", "original", "final", "es_generico", "razon"], axis=1
+    ).to_dict("records")
+
+    # Solo se copian las filas de cada hoja; las correcciones se aplican
+    # sobre las filas inválidas (no sobre una copia completa del catálogo)
+    productos_ok = df_con_igv.take(np.flatnonzero(ok_mask))
+    productos_corregidos = apply_corrections(df_con_igv, np.flatnonzero(~ok_mask), correcciones)
 
     final_df = pd.concat([productos_ok, productos_corregidos], ignore_index=True)
+    del df_con_igv
 
     # Plantilla API - CON EL MISMO ORDEN DE SIEMPRE
     codigo_padre_default = ""
@@ -462,28 +712,6 @@ def normalize_excel_bytes(
     # Usar el nombre de la tienda para la columna
     nombre_columna_tienda = f"W-{tienda_nombre}"
 
-    plantilla_api = pd.DataFrame(
-        {
-            "Nombre": final_df[col_nombre] if col_nombre else "",
-            "Descripcion": final_df[col_desc] if col_desc else "",
-            "codigo padre": final_df[col_codigo_padre] if col_codigo_padre else codigo_padre_default,
-            "codigo": final_df[col_codigo] if col_codigo else "",
-            "Codigo alterno": final_df[col_codigo_alterno] if col_codigo_alterno else codigo_alterno_default,
-            "Categoria": final_df[col_cat],
-            "stock": final_df[col_stock],
-            "stock minimo": final_df[col_stock_min] if col_stock_min else "",
-            "precio costo": final_df[col_pcost],
-            "precio venta": final_df[col_pventa],
-            "porcentaje costo": final_df[col_porcentaje] if col_porcentaje else 18.0,
-            "R-Lista1": r_lista1_default,
-            "unidad": final_df[col_unidad] if col_unidad else "",
-            "Marca": final_df[col_marca] if col_marca else "S/M",
-            "Modelo": final_df[col_modelo] if col_modelo else "S/M",
-            "Almacenable": final_df[col_almacenable] if col_almacenable else "SI",
-            nombre_columna_tienda: w_tienda1_default,
-        }
-    )
-
     # Lista de columnas en orden exacto
     columnas_ordenadas = [
         "Nombre",
@@ -504,16 +732,43 @@ def normalize_excel_bytes(
         "Almacenable",
         nombre_columna_tienda,
     ]
-    
-    plantilla_api = plantilla_api[columnas_ordenadas]
 
-    out = io.BytesIO()
-    with pd.ExcelWriter(out, engine="openpyxl") as w:
-        errores_df.to_excel(w, index=False, sheet_name="Errores_Detectados")
-        # codigos_df.to_excel(w, index=False, sheet_name="Códigos_Procesados")
-        productos_ok.to_excel(w, index=False, sheet_name="Productos_OK")
-        productos_corregidos.to_excel(w, index=False, sheet_name="Productos_Corregidos")
-        plantilla_api.to_excel(w, index=False, sheet_name="productos")
+    plantilla_api = pd.DataFrame(
+        {
+            "Nombre": final_df[col_nombre] if col_nombre else "",
+            "Descripcion": final_df[col_desc] if col_desc else "",
+            "codigo padre": final_df[col_codigo_padre] if col_codigo_padre else codigo_padre_default,
+            "codigo": final_df[col_codigo] if col_codigo else "",
+            "Codigo alterno": final_df[col_codigo_alterno] if col_codigo_alterno else codigo_alterno_default,
+            "Categoria": final_df[col_cat],
+            "stock": final_df[col_stock],
+            "stock minimo": final_df[col_stock_min] if col_stock_min else "",
+            "precio costo": final_df[col_pcost],
+            "precio venta": final_df[col_pventa],
+            "porcentaje costo": final_df[col_porcentaje] if col_porcentaje else 18.0,
+            "R-Lista1": r_lista1_default,
+            "unidad": final_df[col_unidad] if col_unidad else "",
+            "Marca": final_df[col_marca] if col_marca else "S/M",
+            "Modelo": final_df[col_modelo] if col_modelo else "S/M",
+            "Almacenable": final_df[col_almacenable] if col_almacenable else "SI",
+            nombre_columna_tienda: w_tienda1_default,
+        },
+        # en el orden exacto y sin copiar de nuevo las columnas de final_df
+        columns=columnas_ordenadas,
+        copy=False,
+    )
+    compact_columns(plantilla_api, ["R-Lista1"])
+
+    report("escritura", 0.6)
+    frames = {
+        "Errores_Detectados": errores_df,
+        # "Códigos_Procesados": codigos_df,
+        "Productos_OK": productos_ok,
+        "Productos_Corregidos": productos_corregidos,
+        "productos": plantilla_api,
+    }
+    excel_out = write_output([(name, frames[name]) for name in hojas], output_format, out)
+    report.rows(sum(len(frames[name]) for name in hojas))
 
     stats = {
         "rows_before": int(before_rows),
@@ -522,6 +777,52 @@ def normalize_excel_bytes(
         "errors_count": int(len(errores_df)),
         "codes_fixed": int(codes_fixed),
         "codigos_info": codigos_info,  # Para frontend
+        "partitions": prep["partitions"],
+        "prepared_cached": prep["prepared_cached"],
+        "stages": report.close(),
     }
+    if "prepared" in prep:
+        stats["prepared"] = prep["prepared"]
+
+    return excel_out, stats
+
 
-    return out.getvalue(), stats
+# ============================================================
+# SOLO VALIDACIÓN (/excel/validate): sin plantilla ni Excel
+# ============================================================
+def validate_catalog_bytes(
+    excel_bytes: bytes,
+    round_numeric: Optional[int] = None,
+    selected_row_ids: Optional[list[int]] = None,
+    apply_igv_cost: bool = False,
+    apply_igv_sale: bool = False,
+    parsed: Optional[tuple[pd.DataFrame, dict, dict]] = None,
+    page: int = 1,
+    page_size: int = 100,
+    prepared: Optional[tuple[pd.DataFrame, dict, dict]] = None,
+    keep_prepared: bool = False,
+) -> dict:
+    """
+    Mismos errores que Errores_Detectados de normalize_excel_bytes, paginados como JSON.
+    prepared / keep_prepared: como en normalize_excel_bytes (result["prepared"]).
+    """
+    _, _, prep, (errores_df, ok_mask, _) = prepare_and_audit(
+        excel_bytes,
+        round_numeric=round_numeric,
+        selected_row_ids=selected_row_ids,
+        apply_igv_cost=apply_igv_cost,
+        apply_igv_sale=apply_igv_sale,
+        parsed=parsed,
+        prepared=prepared,
+        keep_prepared=keep_prepared,
+    )
+    result = audit_report(errores_df, ok_mask, page=page, page_size=page_size)
+    # rows_corrected: filas que van a Productos_Corregidos (las inválidas), como en normalize
+    result["counters"].update(
+        rows_corrected=int(len(ok_mask) - ok_mask.sum()),
+        rows_before=prep["rows_before"],
+        codes_fixed=prep["codes_fixed"],
+    )
+    if "prepared" in prep:
+        result["prepared"] = prep["prepared"]
+    return result
@@ -0,0 +1,302 @@
+import datetime
+import os
+import struct
+import tempfile
+import zlib
+from typing import BinaryIO, Union
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+from openpyxl.utils.exceptions import IllegalCharacterError
+
+from .free_threading import thread_executor
+
+# ============================================================
+# Configuración por variables de entorno
+# - XLSX_WRITER_THREADS: hojas que se generan a la vez (default: una por hoja, máx. 4);
+#   en modo free-threaded las hojas van al pool de hilos compartido
+# - XLSX_COMPRESS_LEVEL: nivel deflate de las partes (1 = rápido ... 9 = más chico)
+# ============================================================
+XLSX_WRITER_THREADS = int(os.getenv("XLSX_WRITER_THREADS", "4"))
+XLSX_COMPRESS_LEVEL = int(os.getenv("XLSX_COMPRESS_LEVEL", "6"))
+
+# Filas por bloque de XML (memoria acotada por hoja) y tamaño del spool comprimido
+ROW_BLOCK = 5000
+PART_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+# Fecha fija en el zip (1980-01-01 00:00): mismos DataFrames -> mismos bytes
+_ZIP_DATE = (0 << 9) | (1 << 5) | 1
+_ZIP_TIME = 0
+
+# Estilos (índices de cellXfs en styles.xml)
+_S_HEADER = 1
+_S_DATETIME = 2
+_S_DATE = 3
+_S_TIME = 4
+_S_TIMEDELTA = 5
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_STYLES_XML = (
+    _XML_DECL
+    + f'<styleSheet xmlns="{_NS_MAIN}">'
+    '<numFmts count="4">'
+    '<numFmt numFmtId="164" formatCode="yyyy-mm-dd h:mm:ss"/>'
+    '<numFmt numFmtId="165" formatCode="yyyy-mm-dd"/>'
+    '<numFmt numFmtId="166" formatCode="h:mm:ss"/>'
+    '<numFmt numFmtId="167" formatCode="[hh]:mm:ss"/>'
+    '</numFmts>'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '</fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="6">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="top"/></xf>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="166" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="167" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+# ============================================================
+# Celdas -> XML (strings inline: cada hoja es independiente, sin sharedStrings)
+# ============================================================
+def _inline(ref: str, text: str, style: str = "") -> str:
+    if ILLEGAL_CHARACTERS_RE.search(text):
+        raise IllegalCharacterError(f"{text!r} cannot be used in worksheets.")
+    return f'<c r="{ref}"{style} t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _num(value) -> str:
+    # Mismo formato que openpyxl (safe_string): 1.0 -> "1", se relee como int
+    return "%.16g" % value
+
+
+def _cell(ref: str, value, style_id: int = 0) -> str:
+    """
+    Una celda con el mismo tipado que openpyxl; None, NaN y '' no generan
+    celda ('' si no tiene estilo, <c/> vacía si lo tiene): se releen como None.
+    """
+    style = f' s="{style_id}"' if style_id else ""
+    if value is None or (isinstance(value, str) and value == ""):
+        return f'<c r="{ref}"{style}/>' if style_id else ""
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}"{style} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, np.integer)):
+        return f'<c r="{ref}"{style}><v>{_num(value)}</v></c>'
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return f'<c r="{ref}"{style}/>' if style_id else ""
+        if np.isinf(value):
+            return _inline(ref, "inf" if value > 0 else "-inf", style)
+        return f'<c r="{ref}"{style}><v>{_num(value)}</v></c>'
+    if isinstance(value, str):
+        return _inline(ref, value, style)
+    if isinstance(value, datetime.datetime):
+        return f'<c r="{ref}" s="{style_id or _S_DATETIME}"><v>{_num(to_excel(value))}</v></c>'
+    if isinstance(value, datetime.date):
+        return f'<c r="{ref}" s="{style_id or _S_DATE}"><v>{_num(to_excel(value))}</v></c>'
+    if isinstance(value, datetime.time):
+        return f'<c r="{ref}" s="{style_id or _S_TIME}"><v>{_num(to_excel(value))}</v></c>'
+    if isinstance(value, datetime.timedelta):
+        return f'<c r="{ref}" s="{style_id or _S_TIMEDELTA}"><v>{_num(to_excel(value))}</v></c>'
+    return _inline(ref, str(value), style)
+
+
+def _column_cells(s: pd.Series, letter: str, rows: list[str]) -> list[str]:
+    """XML de una columna para un bloque de filas (ramas rápidas para int/float de numpy)."""
+    kind = s.dtype.kind if isinstance(s.dtype, np.dtype) else "O"
+    if kind in "iu":
+        values = s.to_numpy()
+        out = [f'<c r="{letter}{r}"><v>{v}</v></c>' for r, v in zip(rows, values.tolist())]
+        # Enteros de más de 16 dígitos: openpyxl los escribe con %.16g
+        for i in np.flatnonzero(np.abs(values.astype(np.float64)) >= 1e16).tolist():
+            out[i] = _cell(f"{letter}{rows[i]}", values[i])
+        return out
+    if kind == "f":
+        values = s.to_numpy()
+        out = [f'<c r="{letter}{r}"><v>{"%.16g" % v}</v></c>' for r, v in zip(rows, values.tolist())]
+        for i in np.flatnonzero(~np.isfinite(values)).tolist():
+            out[i] = _cell(f"{letter}{rows[i]}", values[i])
+        return out
+
+    if isinstance(s.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+        # category / string[pyarrow]: el XML de cada valor distinto se arma una sola vez
+        codes, uniques = pd.factorize(s)
+        # None = sin celda ('' y NA, como _cell)
+        tails = [_cell("", v)[len('<c r=""'):] or None for v in np.asarray(uniques, dtype=object).tolist()]
+        return [
+            f'<c r="{letter}{r}"{tails[c]}' if c >= 0 and tails[c] is not None else ""
+            for r, c in zip(rows, codes.tolist())
+        ]
+
+    # object / fechas / dtypes de extensión: valores Python (Timestamp, NA -> None)
+    obj = s.astype(object).to_numpy()
+    obj[pd.isna(obj)] = None
+    return [_cell(f"{letter}{r}", v) for r, v in zip(rows, obj.tolist())]
+
+
+def _sheet_blocks(df: pd.DataFrame):
+    """XML de la hoja en trozos (encabezado, bloques de ROW_BLOCK filas, cierre)."""
+    n_rows, n_cols = df.shape
+    letters = [get_column_letter(j + 1) for j in range(n_cols)]
+    last = f"{letters[-1]}{n_rows + 1}" if n_cols else "A1"
+
+    header = "".join(_cell(f"{letters[j]}1", _label(col), _S_HEADER) for j, col in enumerate(df.columns))
+    yield (
+        _XML_DECL
+        + f'<worksheet xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
+        + f'<dimension ref="A1:{last}"/><sheetData>'
+        + (f'<row r="1">{header}</row>' if n_cols else "")
+    )
+
+    for start in range(0, n_rows, ROW_BLOCK):
+        block = df.iloc[start:start + ROW_BLOCK]
+        rows = [str(r) for r in range(start + 2, start + 2 + len(block))]
+        columns = [_column_cells(block.iloc[:, j], letters[j], rows) for j in range(n_cols)]
+        yield "".join(
+            f'<row r="{r}">{"".join(cells)}</row>' for r, cells in zip(rows, zip(*columns))
+        )
+
+    yield "</sheetData></worksheet>"
+
+
+def _label(col):
+    # Encabezado: mismo valor que escribe to_excel (NaN -> vacío)
+    if isinstance(col, float) and np.isnan(col):
+        return None
+    return col
+
+
+# ============================================================
+# Partes comprimidas (una por hoja, en paralelo)
+# ============================================================
+def _deflate_part(chunks) -> tuple[tempfile.SpooledTemporaryFile, int, int, int]:
+    """Comprime los trozos a un spool; devuelve (spool, crc32, tamaño comprimido, tamaño original)."""
+    spool = tempfile.SpooledTemporaryFile(max_size=PART_SPOOL_MAX_MEMORY)
+    comp = zlib.compressobj(XLSX_COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    crc = 0
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        crc = zlib.crc32(data, crc)
+        size += len(data)
+        spool.write(comp.compress(data))
+    spool.write(comp.flush())
+    compressed = spool.tell()
+    spool.seek(0)
+    return spool, crc, compressed, size
+
+
+def _static_parts(names: list[str]) -> list[tuple[str, str]]:
+    n = len(names)
+    sheets = "".join(
+        f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>' for i, name in enumerate(names, start=1)
+    )
+    sheet_rels = "".join(
+        f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, n + 1)
+    )
+    sheet_types = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, n + 1)
+    )
+    return [
+        ("[Content_Types].xml", _XML_DECL
+         + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+         '<Default Extension="xml" ContentType="application/xml"/>'
+         '<Override PartName="/xl/workbook.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+         '<Override PartName="/xl/styles.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+         + sheet_types + '</Types>'),
+        ("_rels/.rels", _XML_DECL
+         + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+         '</Relationships>'),
+        ("xl/workbook.xml", _XML_DECL
+         + f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>{sheets}</sheets></workbook>'),
+        ("xl/_rels/workbook.xml.rels", _XML_DECL
+         + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         + sheet_rels
+         + f'<Relationship Id="rId{n + 1}" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+         '</Relationships>'),
+        ("xl/styles.xml", _STYLES_XML),
+    ]
+
+
+# ============================================================
+# Zip (deflate, sin zip64, fecha fija)
+# ============================================================
+def _write_zip(out: BinaryIO, parts: list[tuple[str, tempfile.SpooledTemporaryFile, int, int, int]]) -> None:
+    central = []
+    offset = 0
+    for name, spool, crc, csize, usize in parts:
+        if csize >= 0xFFFFFFFF or usize >= 0xFFFFFFFF:
+            raise ValueError(f"Parte {name} demasiado grande para zip sin zip64")
+        fname = name.encode("utf-8")
+        header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 20, 0, 8, _ZIP_TIME, _ZIP_DATE, crc, csize, usize, len(fname), 0,
+        )
+        out.write(header + fname)
+        while True:
+            block = spool.read(1024 * 1024)
+            if not block:
+                break
+            out.write(block)
+        central.append(struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, 20, 20, 0, 8, _ZIP_TIME, _ZIP_DATE, crc, csize, usize,
+            len(fname), 0, 0, 0, 0, 0, offset,
+        ) + fname)
+        offset += len(header) + len(fname) + csize
+
+    directory = b"".join(central)
+    out.write(directory)
+    out.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(parts), len(parts), len(directory), offset, 0))
+
+
+def write_sheets_xlsx_parallel(sheets: list[tuple[str, pd.DataFrame]], out: Union[str, BinaryIO]) -> None:
+    """
+    Cada hoja se genera y comprime en su propio hilo (zlib libera el GIL; sin
+    GIL también el XML corre en paralelo) a un spool; luego se arman las
+    partes en orden fijo dentro del zip. Strings inline
+    (sin sharedStrings compartido) y fecha fija: salida byte a byte determinista.
+    """
+    names = [name for name, _ in sheets]
+    parts = []
+    try:
+        with thread_executor(min(XLSX_WRITER_THREADS, len(sheets))) as ex:
+            futures = [ex.submit(_deflate_part, _sheet_blocks(df)) for _, df in sheets]
+            for name, xml in _static_parts(names):
+                parts.append((name, *_deflate_part([xml])))
+            for i, future in enumerate(futures, start=1):
+                parts.append((f"xl/worksheets/sheet{i}.xml", *future.result()))
+
+        if isinstance(out, (str, os.PathLike)):
+            with open(out, "wb") as f:
+                _write_zip(f, parts)
+        else:
+            _write_zip(out, parts)
+    finally:
+        for _, spool, *_ in parts:
+            spool.close()
@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .excel_cleaners import add_memo_counters, run_counting_memo
+from .free_threading import free_threaded_runtime, shared_pool, thread_map
+from .structured_logging import configure_logging
+from .worker_pool import WORKER_POOL_START_METHOD
+
+# ============================================================
+# Configuración por variables de entorno
+# - NORMALIZE_PARTITIONS: particiones (= procesos) para la limpieza y la
+#   auditoría de catálogos grandes; 1 (default) = sin particionar
+# - NORMALIZE_PARTITION_MIN_ROWS: filas mínimas para particionar (debajo de
+#   esto el costo de enviar las particiones supera la ganancia)
+# - NORMALIZE_PARTITION_MODE: auto (default) | process | thread
+#   auto = thread en intérpretes free-threaded (las particiones son vistas
+#   del mismo DF, sin pickle), process con GIL
+# Cada proceso del WorkerPool arma su propio pool de particiones: con el
+# pool en modo process el total de procesos es WORKER_POOL_SIZE x particiones.
+# ============================================================
+NORMALIZE_PARTITIONS = int(os.getenv("NORMALIZE_PARTITIONS", "1"))
+NORMALIZE_PARTITION_MIN_ROWS = int(os.getenv("NORMALIZE_PARTITION_MIN_ROWS", "200000"))
+NORMALIZE_PARTITION_MODE = os.getenv("NORMALIZE_PARTITION_MODE", "auto").lower()
+
+_LOCK = threading.Lock()
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_EXECUTOR_WORKERS = 0
+
+
+def partition_count(rows: int, partitions: Optional[int] = None) -> int:
+    """
+    Particiones a usar para `rows` filas (1 = procesar en línea).
+    Sin `partitions` explícito se usa la configuración (con su mínimo de filas).
+    """
+    if partitions is None:
+        partitions = NORMALIZE_PARTITIONS if rows >= NORMALIZE_PARTITION_MIN_ROWS else 1
+    return max(1, min(partitions, rows))
+
+
+def partition_mode() -> str:
+    """process | thread según NORMALIZE_PARTITION_MODE y el intérprete."""
+    if NORMALIZE_PARTITION_MODE in ("process", "thread"):
+        return NORMALIZE_PARTITION_MODE
+    return "thread" if free_threaded_runtime() else "process"
+
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    # Se reutiliza entre llamadas (arrancar procesos con spawn cuesta ~1 s)
+    global _EXECUTOR, _EXECUTOR_WORKERS
+    with _LOCK:
+        if _EXECUTOR is None or _EXECUTOR_WORKERS != workers:
+            if _EXECUTOR is not None:
+                _EXECUTOR.shutdown(wait=True)
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(WORKER_POOL_START_METHOD),
+                initializer=configure_logging,
+            )
+            _EXECUTOR_WORKERS = workers
+        return _EXECUTOR
+
+
+def _drop_executor(ex: ProcessPoolExecutor) -> None:
+    # Un proceso del pool murió (p.ej. OOM): el executor queda roto para
+    # siempre; se descarta y la siguiente llamada arma uno nuevo
+    global _EXECUTOR, _EXECUTOR_WORKERS
+    with _LOCK:
+        if _EXECUTOR is ex:
+            _EXECUTOR, _EXECUTOR_WORKERS = None, 0
+    ex.shutdown(wait=False, cancel_futures=True)
+
+
+def _noop(i: int) -> int:
+    return i
+
+
+def warm_up(workers: int) -> None:
+    """Arranca los procesos del pool de particiones (benchmarks, arranque del servicio)."""
+    ex = shared_pool() if partition_mode() == "thread" else _executor(workers)
+    list(ex.map(_noop, range(workers * 2)))
+
+
+def map_partitions(fn: Callable, df: pd.DataFrame, partitions: int, *args) -> list:
+    """
+    Parte df en `partitions` bloques contiguos de filas y ejecuta
+    fn(bloque, offset, *args) en el pool de procesos (o en el de hilos
+    compartido, en modo thread); offset es la posición de la primera fila
+    del bloque en df (para numerar filas globalmente).
+    Devuelve los resultados en el orden de las filas.
+    """
+    bounds = np.linspace(0, len(df), partitions + 1).astype(int)
+    chunks = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        # Copia superficial: fn reemplaza columnas del bloque, no de df
+        chunk = df.iloc[start:stop].copy(deep=False)
+        chunk.index = pd.RangeIndex(len(chunk))
+        chunks.append((chunk, int(start)))
+    if partition_mode() == "thread":
+        return thread_map(lambda part: fn(part[0], part[1], *args), chunks, enabled=True)
+    ex = _executor(partitions)
+    results = []
+    try:
+        futures = [ex.submit(run_counting_memo, fn, chunk, start, *args) for chunk, start in chunks]
+        for f in futures:
+            # El memo de limpieza de cada partición se cuenta en este proceso
+            result, memo = f.result()
+            add_memo_counters(memo)
+            results.append(result)
+    except BrokenProcessPool:
+        _drop_executor(ex)
+        raise
+    return results
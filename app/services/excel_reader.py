@@ -0,0 +1,347 @@
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Union
+from xml.etree.ElementTree import iterparse
+
+import numpy as np
+import pandas as pd
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.styles.stylesheet import apply_stylesheet
+from openpyxl.utils.datetime import from_excel, from_ISO8601
+from openpyxl.xml.constants import SHARED_STRINGS, SHEET_MAIN_NS
+
+# str = ruta del archivo (p.ej. un upload derramado a disco): se lee con mmap
+ExcelSource = Union[bytes, bytearray, memoryview, BinaryIO, str]
+
+# Mismos valores que pandas interpreta como NaN por defecto en read_excel
+_NA_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+})
+_BOOL_STRINGS = {"True": True, "TRUE": True, "true": True,
+                 "False": False, "FALSE": False, "false": False}
+
+_ROW_TAG = f"{{{SHEET_MAIN_NS}}}row"
+_CELL_TAG = f"{{{SHEET_MAIN_NS}}}c"
+_VALUE_TAG = f"{{{SHEET_MAIN_NS}}}v"
+_INLINE_TAG = f"{{{SHEET_MAIN_NS}}}is"
+_SI_TAG = f"{{{SHEET_MAIN_NS}}}si"
+_T_TAG = f"{{{SHEET_MAIN_NS}}}t"
+_R_TAG = f"{{{SHEET_MAIN_NS}}}r"
+
+
+class _MappedFile(io.RawIOBase):
+    """Lectura sin copia sobre un mmap (uploads derramados a disco)."""
+
+    def __init__(self, mapped: mmap.mmap):
+        self._view = memoryview(mapped)
+        self._pos = 0
+
+    def close(self) -> None:
+        # Suelta la vista para que el mmap se pueda cerrar
+        self._view.release()
+        super().close()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        chunk = self._view[self._pos:self._pos + len(b)]
+        n = len(chunk)
+        b[:n] = chunk
+        self._pos += n
+        return n
+
+
+@contextmanager
+def _open_source(source: ExcelSource) -> Iterator[Union[BinaryIO, str]]:
+    """Una ruta se mapea en memoria (en el proceso que lee) y se cierra al salir."""
+    if not isinstance(source, str):
+        yield source
+        return
+    with open(source, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BytesIO(b"")
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = _MappedFile(mapped)
+    try:
+        yield view
+    finally:
+        view.close()
+        mapped.close()
+
+
+# ============================================================
+# Metadatos del libro (sin cargar las hojas)
+# ============================================================
+def _open_archive(source: ExcelSource) -> ExcelReader:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    reader = ExcelReader(source, read_only=True, data_only=True, keep_links=False)
+    reader.read_manifest()
+    reader.read_workbook()
+    apply_stylesheet(reader.archive, reader.wb)
+    return reader
+
+
+def _first_worksheet_path(reader: ExcelReader) -> str:
+    for _sheet, rel in reader.parser.find_sheets():
+        if rel.target in reader.valid_files and "chartsheet" not in rel.Type:
+            return rel.target
+    raise ValueError("El archivo no contiene hojas de cálculo")
+
+
+def _text_content(node) -> str:
+    """Texto plano de un <si>/<is>: <t> directo + <r><t> (ignora fonética)."""
+    parts = []
+    for child in node:
+        if child.tag == _T_TAG:
+            parts.append(child.text or "")
+        elif child.tag == _R_TAG:
+            t = child.find(_T_TAG)
+            if t is not None and t.text is not None:
+                parts.append(t.text)
+    return "".join(parts)
+
+
+def _read_shared_strings(reader: ExcelReader) -> list[str]:
+    ct = reader.package.find(SHARED_STRINGS)
+    if ct is None:
+        return []
+    strings = []
+    with reader.archive.open(ct.PartName[1:]) as src:
+        for _, node in iterparse(src):
+            if node.tag == _SI_TAG:
+                strings.append(_text_content(node).replace("x005F_", ""))
+                node.clear()
+    return strings
+
+
+# ============================================================
+# Iterador de filas (valores ya convertidos como los devuelve pandas)
+# ============================================================
+_COL_CACHE: dict[str, int] = {}
+
+
+def _column_index(ref: str) -> int:
+    letters = ref.rstrip("0123456789")
+    idx = _COL_CACHE.get(letters)
+    if idx is None:
+        idx = 0
+        for ch in letters:
+            idx = idx * 26 + (ord(ch) - 64)
+        _COL_CACHE[letters] = idx
+    return idx
+
+
+def _iter_sheet_rows(source: ExcelSource) -> Iterator[list]:
+    """
+    Recorre sheetN.xml en streaming y devuelve cada fila como lista de valores.
+    Celdas vacías -> None, errores de Excel -> NaN, 5.0 -> 5 (igual que pandas).
+    """
+    with _open_source(source) as opened:
+        yield from _iter_archive_rows(_open_archive(opened))
+
+
+def _iter_archive_rows(reader: ExcelReader) -> Iterator[list]:
+    try:
+        shared = _read_shared_strings(reader)
+        wb = reader.wb
+        date_styles = wb._date_formats
+        timedelta_styles = wb._timedelta_formats
+        epoch = wb.epoch
+
+        expected_row = 1
+        with reader.archive.open(_first_worksheet_path(reader)) as src:
+            for _, elem in iterparse(src):
+                if elem.tag != _ROW_TAG:
+                    continue
+
+                r = elem.get("r")
+                row_number = int(r) if r else expected_row
+                while expected_row < row_number:
+                    yield []
+                    expected_row += 1
+                expected_row = row_number + 1
+
+                values = []
+                col = 0
+                for c in elem:
+                    if c.tag != _CELL_TAG:
+                        continue
+                    ref = c.get("r")
+                    col = _column_index(ref) if ref else col + 1
+                    while len(values) < col - 1:
+                        values.append(None)
+
+                    t = c.get("t", "n")
+                    value = None
+                    if t == "inlineStr":
+                        node = c.find(_INLINE_TAG)
+                        if node is not None:
+                            value = _text_content(node)
+                    else:
+                        raw = c.findtext(_VALUE_TAG) or None
+                        if raw is not None:
+                            if t == "n":
+                                if "." in raw or "E" in raw or "e" in raw:
+                                    value = float(raw)
+                                    if value.is_integer():
+                                        value = int(value)
+                                else:
+                                    value = int(raw)
+                                style = int(c.get("s", 0))
+                                if style in date_styles:
+                                    try:
+                                        value = from_excel(
+                                            value, epoch, timedelta=style in timedelta_styles
+                                        )
+                                    except (OverflowError, ValueError):
+                                        value = np.nan
+                            elif t == "s":
+                                value = shared[int(raw)]
+                            elif t == "b":
+                                value = bool(int(raw))
+                            elif t == "str":
+                                value = raw
+                            elif t == "d":
+                                value = from_ISO8601(raw)
+                            elif t == "e":
+                                value = np.nan
+                            else:
+                                value = raw
+                    values.append(value)
+
+                elem.clear()
+                yield values
+    finally:
+        reader.archive.close()
+
+
+def _header_names(raw: list) -> list:
+    names = []
+    unnamed = []
+    for i, v in enumerate(raw):
+        if v is None or v == "":
+            names.append(f"Unnamed: {i}")
+            unnamed.append(i)
+        else:
+            names.append(v)
+
+    # Duplicados: "A", "A.1", "A.2" (mismo criterio que pandas:
+    # primero las columnas con nombre, luego las "Unnamed")
+    counts: dict = {}
+    order = [i for i in range(len(names)) if i not in unnamed] + unnamed
+    for i in order:
+        col = old_col = names[i]
+        cur = counts.get(col, 0)
+        while cur > 0:
+            counts[old_col] = cur + 1
+            col = f"{old_col}.{cur}"
+            cur = cur + 1 if col in names else counts.get(col, 0)
+        names[i] = col
+        counts[col] = cur + 1
+    return names
+
+
+# ============================================================
+# Inferencia de tipos por columna
+# ============================================================
+def _infer_column(values: list) -> np.ndarray:
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    s = pd.Series(arr, dtype=object, copy=False)
+
+    na_mask = s.isna().to_numpy() | s.isin(_NA_STRINGS).to_numpy()
+    if na_mask.any():
+        arr[na_mask] = np.nan
+        if na_mask.all():
+            return arr.astype(np.float64)
+
+    try:
+        return pd.to_numeric(s).to_numpy()
+    except (ValueError, TypeError):
+        pass
+
+    # pandas interna los valores iguales (True == 1 == 1.0): se queda el primero
+    memo: dict = {}
+    for i, v in enumerate(arr):
+        if not na_mask[i]:
+            arr[i] = memo.setdefault(v, v)
+
+    # Columna booleana escrita como texto o celdas TRUE/FALSE de Excel
+    if not na_mask.any():
+        try:
+            mapped = [v if type(v) is bool else _BOOL_STRINGS[v] for v in arr]
+        except (KeyError, TypeError):
+            return arr
+        return np.array(mapped, dtype=bool)
+
+    return arr
+
+
+# ============================================================
+# LECTURA PRINCIPAL: fila de encabezado + buffers por columna
+# ============================================================
+def read_catalog_sheet(source: ExcelSource, header_row: int = 3) -> pd.DataFrame:
+    """
+    Lee la primera hoja en streaming (sin modelo de celdas de openpyxl ni la
+    lista de filas intermedia de pd.read_excel) directo a buffers por columna.
+    Resultado equivalente a pd.read_excel(..., engine="openpyxl", header=header_row).
+    """
+    header: list = []
+    columns: list[list] = []
+    n_rows = 0
+    last_row_with_data = 0
+
+    for row_number, values in enumerate(_iter_sheet_rows(source)):
+        if row_number < header_row:
+            continue
+
+        while values and (values[-1] is None or values[-1] == ""):
+            values.pop()
+
+        if row_number == header_row:
+            header = values
+            continue
+
+        if len(values) > len(columns):
+            for _ in range(len(values) - len(columns)):
+                columns.append([None] * n_rows)
+
+        for j, buf in enumerate(columns):
+            buf.append(values[j] if j < len(values) else None)
+
+        n_rows += 1
+        if values:
+            last_row_with_data = n_rows
+
+    width = max(len(header), len(columns))
+    header = header + [None] * (width - len(header))
+    names = _header_names(header)
+
+    data = {}
+    for j in range(width):
+        buf = columns[j][:last_row_with_data] if j < len(columns) else [None] * last_row_with_data
+        data[j] = _infer_column(buf)
+
+    df = pd.DataFrame(data)
+    df.columns = names
+    if last_row_with_data == 0:
+        df = df.astype(object)
+    return df
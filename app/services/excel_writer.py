@@ -0,0 +1,237 @@
+import importlib.util
+import os
+import tempfile
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+from .excel_parallel_writer import write_sheets_xlsx_parallel
+
+# ============================================================
+# Configuración por variables de entorno
+# - XLSX_SPOOL_MAX_MEMORY_MB: tamaño del xlsx que se mantiene en memoria antes de pasar a disco
+# - XLSX_STREAM_CHUNK_KB: tamaño de cada bloque enviado en la respuesta
+# - XLSX_ENGINE: parallel (default, hojas en paralelo) | openpyxl (write_only secuencial)
+# ============================================================
+XLSX_SPOOL_MAX_MEMORY = int(float(os.getenv("XLSX_SPOOL_MAX_MEMORY_MB", "16")) * 1024 * 1024)
+XLSX_STREAM_CHUNK_SIZE = int(float(os.getenv("XLSX_STREAM_CHUNK_KB", "256")) * 1024)
+
+# Filas que se convierten a objetos Python de una vez (acota la memoria por hoja)
+ROW_BLOCK = 5000
+
+XLSX_ENGINE = os.getenv("XLSX_ENGINE", "parallel").lower()
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Hojas del resultado QA (en este orden) y la que consumen las integraciones
+QA_SHEETS = ("Errores_Detectados", "Productos_OK", "Productos_Corregidos", "productos")
+TEMPLATE_SHEET = "productos"
+
+# Formato -> (media type, extensión). Fuera de xlsx solo se exporta la plantilla "productos"
+OUTPUT_FORMATS = {
+    "xlsx": (XLSX_MEDIA_TYPE, ".xlsx"),
+    "csv": ("text/csv; charset=utf-8", ".csv"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+# Mismo estilo de encabezado que pd.DataFrame.to_excel (engine openpyxl)
+_THIN = Side(style="thin")
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+# ============================================================
+# Conversión por columna a valores de celda
+# ============================================================
+def _column_values(s: pd.Series) -> list:
+    """Valores Python para openpyxl; NaN/None/NaT -> celda vacía (como to_excel)."""
+    kind = s.dtype.kind
+    if kind in "iub":
+        return s.to_numpy().tolist()
+
+    if kind == "f":
+        arr = s.to_numpy()
+        values = arr.tolist()
+        for i in np.flatnonzero(~np.isfinite(arr)).tolist():
+            v = arr[i]
+            values[i] = None if np.isnan(v) else ("inf" if v > 0 else "-inf")
+        return values
+
+    arr = s.to_numpy(dtype=object)
+    values = arr.tolist()
+    for i in np.flatnonzero(pd.isna(arr)).tolist():
+        values[i] = None
+    return values
+
+
+def _header_cell(ws, value) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = _HEADER_FONT
+    cell.border = _HEADER_BORDER
+    cell.alignment = _HEADER_ALIGNMENT
+    return cell
+
+
+# ============================================================
+# Escritura en streaming (openpyxl write_only)
+# ============================================================
+def write_sheets_xlsx(sheets: list[tuple[str, pd.DataFrame]], out: Union[str, BinaryIO]) -> None:
+    """
+    Escribe cada (nombre, DataFrame) como hoja, sin índice, fila a fila.
+    En modo write_only openpyxl no guarda objetos celda: cada hoja se vuelca a
+    un temporal mientras se escribe; los valores se convierten por bloques de
+    ROW_BLOCK filas, así la memoria no crece con el tamaño del catálogo.
+    """
+    wb = Workbook(write_only=True)
+    for name, df in sheets:
+        ws = wb.create_sheet(title=name)
+        ws.append([_header_cell(ws, col) for col in df.columns])
+        for start in range(0, len(df), ROW_BLOCK):
+            block = df.iloc[start:start + ROW_BLOCK]
+            columns = [_column_values(block.iloc[:, j]) for j in range(block.shape[1])]
+            for row in zip(*columns):
+                ws.append(row)
+    wb.save(out)
+
+
+def _write(sheets: list[tuple[str, pd.DataFrame]], out: Union[str, BinaryIO]) -> None:
+    if XLSX_ENGINE == "openpyxl":
+        write_sheets_xlsx(sheets, out)
+    else:
+        write_sheets_xlsx_parallel(sheets, out)
+
+
+def write_sheets_spooled(sheets: list[tuple[str, pd.DataFrame]]) -> tempfile.SpooledTemporaryFile:
+    """xlsx en un SpooledTemporaryFile (memoria hasta XLSX_SPOOL_MAX_MEMORY, luego disco), en posición 0."""
+    spool = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_MEMORY, suffix=".xlsx")
+    _write(sheets, spool)
+    spool.seek(0)
+    return spool
+
+
+def write_sheets_output(sheets: list[tuple[str, pd.DataFrame]], out: Union[str, BinaryIO, None] = None):
+    """
+    Salida común de los pipelines:
+    - out=None: devuelve los bytes del xlsx (compatibilidad)
+    - out=ruta o archivo: escribe ahí y devuelve None
+    """
+    if out is not None:
+        _write(sheets, out)
+        return None
+    with write_sheets_spooled(sheets) as spool:
+        return spool.read()
+
+
+# ============================================================
+# Selección de hojas y formatos de salida (sheets= / format=)
+# ============================================================
+def parse_sheets_param(sheets: Optional[str]) -> Optional[tuple[str, ...]]:
+    """CSV de nombres de hoja -> tupla validada (None = todas)."""
+    if not sheets:
+        return None
+    wanted = tuple(dict.fromkeys(p.strip() for p in sheets.split(",") if p.strip()))
+    unknown = [p for p in wanted if p not in QA_SHEETS]
+    if unknown:
+        raise ValueError(f"Hojas desconocidas: {', '.join(unknown)}. Opciones: {', '.join(QA_SHEETS)}")
+    return wanted
+
+
+def resolve_output(sheets: Optional[Iterable[str]] = None, output_format: str = "xlsx") -> tuple[str, ...]:
+    """
+    Hojas que hay que construir, en el orden de QA_SHEETS.
+    csv/jsonl/parquet solo llevan la plantilla "productos".
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato no soportado: {output_format}. Opciones: {', '.join(OUTPUT_FORMATS)}")
+    wanted = set(sheets) if sheets else set(QA_SHEETS)
+    if output_format != "xlsx":
+        if wanted - {TEMPLATE_SHEET} and sheets:
+            raise ValueError(f"format={output_format} solo exporta la hoja {TEMPLATE_SHEET}")
+        if output_format == "parquet" and not _parquet_available():
+            raise ValueError("format=parquet requiere pyarrow (o fastparquet) instalado")
+        return (TEMPLATE_SHEET,)
+    return tuple(name for name in QA_SHEETS if name in wanted)
+
+
+def _parquet_available() -> bool:
+    return any(importlib.util.find_spec(m) is not None for m in ("pyarrow", "fastparquet"))
+
+
+def output_filename(base: str, output_format: str) -> str:
+    return base + OUTPUT_FORMATS[output_format][1]
+
+
+def _parquet_ready(df: pd.DataFrame) -> pd.DataFrame:
+    # Parquet exige nombres str y un tipo por columna: las columnas object mixtas van como texto
+    df = df.rename(columns=str)
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].map(lambda v: v if v is None or (isinstance(v, float) and np.isnan(v)) else str(v))
+    return df
+
+
+def write_output(
+    sheets: list[tuple[str, pd.DataFrame]],
+    output_format: str = "xlsx",
+    out: Union[str, BinaryIO, None] = None,
+):
+    """
+    Como write_sheets_output, para cualquier formato de OUTPUT_FORMATS.
+    Fuera de xlsx se escribe solo la hoja "productos".
+    """
+    if output_format == "xlsx":
+        return write_sheets_output(sheets, out)
+
+    table = dict(sheets)[TEMPLATE_SHEET]
+    target = out if out is not None else tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_MEMORY)
+    try:
+        if output_format == "csv":
+            table.to_csv(target, index=False, encoding="utf-8")
+        elif output_format == "jsonl":
+            table.to_json(target, orient="records", lines=True, force_ascii=False)
+        else:
+            _parquet_ready(table).to_parquet(target, index=False)
+        if out is not None:
+            return None
+        target.seek(0)
+        return target.read()
+    finally:
+        if out is None:
+            target.close()
+
+
+# ============================================================
+# Respuesta por bloques
+# ============================================================
+def new_output_path(output_format: str = "xlsx") -> str:
+    """Ruta temporal para que un worker (hilo o proceso) escriba el resultado."""
+    fd, path = tempfile.mkstemp(suffix=OUTPUT_FORMATS[output_format][1], prefix="qa_")
+    os.close(fd)
+    return path
+
+
+def cleanup_output(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def iter_file_chunks(path: str, chunk_size: int = XLSX_STREAM_CHUNK_SIZE, delete: bool = True) -> Iterator[bytes]:
+    """Lee el archivo por bloques; lo borra al terminar (o si el cliente corta)."""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if delete:
+            cleanup_output(path)
@@ -0,0 +1,108 @@
+import os
+import sys
+import sysconfig
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+# ============================================================
+# Configuración por variables de entorno
+# - FREE_THREADING: auto (default) | on | off
+#   auto = limpieza por columna y escritura por hoja en el pool de hilos
+#   compartido solo si el intérprete es free-threaded (3.13t / 3.14t) y el
+#   GIL sigue apagado (importar una extensión sin soporte lo vuelve a
+#   encender); on fuerza los hilos también con GIL (pruebas, benchmarks)
+# - FREE_THREADING_THREADS: hilos del pool compartido (default: núcleos)
+# ============================================================
+FREE_THREADING = os.getenv("FREE_THREADING", "auto").lower()
+FREE_THREADING_THREADS = int(os.getenv("FREE_THREADING_THREADS", str(os.cpu_count() or 1)))
+
+# Compilado con --disable-gil (python3.14t)
+FREE_THREADED_BUILD = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+
+_LOCK = threading.Lock()
+_POOL: Optional[ThreadPoolExecutor] = None
+_LOCAL = threading.local()
+
+
+def gil_enabled() -> bool:
+    """Estado del GIL ahora mismo (siempre True antes de 3.13)."""
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_enabled is None else bool(is_enabled())
+
+
+def free_threaded_runtime() -> bool:
+    """Intérprete free-threaded con el GIL apagado en este momento."""
+    return FREE_THREADED_BUILD and not gil_enabled()
+
+
+def free_threading_enabled() -> bool:
+    """True si la limpieza por columna y la escritura por hoja van al pool de hilos."""
+    if FREE_THREADING in ("on", "1", "true", "yes"):
+        return True
+    if FREE_THREADING in ("off", "0", "false", "no"):
+        return False
+    return free_threaded_runtime()
+
+
+def _mark_pool_thread() -> None:
+    _LOCAL.in_pool = True
+
+
+def in_shared_pool() -> bool:
+    return getattr(_LOCAL, "in_pool", False)
+
+
+def shared_pool() -> ThreadPoolExecutor:
+    """Pool de hilos del proceso, compartido por todos los pipelines que corren en él."""
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(
+                max_workers=max(1, FREE_THREADING_THREADS),
+                thread_name_prefix="ft",
+                initializer=_mark_pool_thread,
+            )
+        return _POOL
+
+
+def thread_map(fn: Callable, items: Iterable, enabled: Optional[bool] = None) -> list:
+    """
+    [fn(x) for x in items] en el pool compartido, en orden.
+    Corre en línea si el modo está apagado (enabled=None -> free_threading_enabled()),
+    si hay un solo item o si ya se está dentro del pool: una tarea del pool
+    que espera a otras del mismo pool puede dejarlo sin hilos libres.
+    """
+    items = list(items)
+    if enabled is None:
+        enabled = free_threading_enabled()
+    if not enabled or len(items) < 2 or in_shared_pool():
+        return [fn(x) for x in items]
+    pool = shared_pool()
+    futures = [pool.submit(fn, x) for x in items]
+    return [f.result() for f in futures]
+
+
+@contextmanager
+def thread_executor(max_workers: int) -> Iterator[Executor]:
+    """
+    Executor para tareas por hoja: el pool compartido en modo free-threaded;
+    si no (o dentro del pool), uno propio de max_workers hilos que se cierra al salir.
+    """
+    if free_threading_enabled() and not in_shared_pool():
+        yield shared_pool()
+        return
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+        yield ex
+
+
+def free_threading_stats() -> dict:
+    return {
+        "python": sys.version.split()[0],
+        "free_threaded_build": FREE_THREADED_BUILD,
+        "gil_enabled": gil_enabled(),
+        "requested": FREE_THREADING,
+        "enabled": free_threading_enabled(),
+        "threads": FREE_THREADING_THREADS,
+    }
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable
+from uuid import uuid4
+
+from .stage_metrics import record_stages
+from .structured_logging import get_logger, log_event
+from .worker_pool import WorkerPool
+
+logger = get_logger("jobs")
+
+# ============================================================
+# Configuración por variables de entorno
+# - JOB_MAX_PENDING: trabajos en cola + en curso antes de responder 503
+#   (mantenerlo <= WORKER_POOL_SIZE + WORKER_POOL_MAX_QUEUE)
+# - JOB_TTL_SECONDS: tiempo que se conserva un resultado terminado
+# - JOB_RESULT_DIR: carpeta de entradas y resultados de los trabajos
+# ============================================================
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "8"))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+JOB_RESULT_DIR = os.getenv("JOB_RESULT_DIR", os.path.join(tempfile.gettempdir(), "excel_jobs"))
+
+# Estados: queued -> running [-> cancelling] -> done | failed | cancelled
+# cancelling cuenta como pendiente: el worker sigue ocupando su cupo hasta cortar
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobQueueFullError(RuntimeError):
+    """Demasiados trabajos pendientes: el cliente debe reintentar."""
+
+
+class JobCancelledError(RuntimeError):
+    """El trabajo fue cancelado mientras corría."""
+
+
+class ProgressReporter:
+    """
+    Callback progress(etapa, fraccion) que reciben los pipelines.
+    Publica la etapa en el dict compartido y corta el pipeline si se pidió cancelar.
+    Es serializable: viaja al worker junto con el trabajo.
+    """
+
+    def __init__(self, job_id: str, shared: dict):
+        self.job_id = job_id
+        self.shared = shared
+
+    def __call__(self, stage: str, progress: float) -> None:
+        if self.shared.get(f"{self.job_id}:cancel"):
+            raise JobCancelledError(f"Trabajo {self.job_id} cancelado")
+        self.shared[self.job_id] = (stage, progress)
+
+
+def _execute_job(fn: Callable, kwargs: dict, reporter: ProgressReporter, result_path: str, cleanup: tuple) -> dict:
+    # Corre en el worker: el resultado se escribe directo en result_path (no vuelve por pickle)
+    try:
+        reporter("inicio", 0.0)
+        _, stats = fn(**kwargs, progress=reporter, out=result_path)
+        reporter("guardando", 0.95)
+        return stats
+    finally:
+        for path in cleanup:
+            _unlink(path)
+
+
+# ============================================================
+# Gestor de trabajos (vive en el event loop)
+# ============================================================
+class JobManager:
+    """
+    - submit() encola el pipeline en el WorkerPool y devuelve el job al instante.
+    - A lo sumo max_pending trabajos sin terminar; más allá -> JobQueueFullError.
+    - Los resultados terminados se borran ttl_seconds después de terminar.
+    - cancel(): si aún espera cupo se descarta; si ya está en un worker queda
+      en cancelling hasta que el worker corte en la siguiente etapa.
+    - El estado lleva solo contadores y etapas de stats (sin listas por fila).
+    """
+
+    def __init__(self, pool: WorkerPool, max_pending: int, ttl_seconds: float, result_dir: str):
+        self.pool = pool
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self.result_dir = result_dir
+
+        self._jobs: dict[str, dict] = {}
+        self._shared = None
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "rejected": 0, "expired": 0}
+        os.makedirs(result_dir, exist_ok=True)
+
+    # ---------------- API ----------------
+    def new_job_id(self) -> str:
+        return uuid4().hex
+
+    def input_path(self, job_id: str) -> str:
+        return os.path.join(self.result_dir, f"{job_id}.input.xlsx")
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable,
+        kwargs: dict,
+        filename: str,
+        media_type: str,
+        job_id: str = None,
+        cleanup: tuple = (),
+    ) -> dict:
+        """fn(**kwargs, progress=..., out=ruta) escribe el resultado en out y devuelve (_, stats)."""
+        job_id = job_id or self.new_job_id()
+        with self._lock:
+            self._expire(time.time())
+            pending = sum(1 for j in self._jobs.values() if j["status"] not in FINISHED)
+            if pending >= self.max_pending:
+                self._counters["rejected"] += 1
+                for path in cleanup:
+                    _unlink(path)
+                raise JobQueueFullError(f"Cola de trabajos llena ({self.max_pending} pendientes)")
+
+            if self._shared is None:
+                self._shared = self.pool.shared_dict()
+
+            job = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "stage": "en cola",
+                "progress": 0.0,
+                "created": time.time(),
+                "started": None,
+                "finished": None,
+                "error": None,
+                "stats": None,
+                "filename": filename,
+                "media_type": media_type,
+                "result_path": os.path.join(self.result_dir, f"{job_id}.result"),
+            }
+            self._jobs[job_id] = job
+            self._counters["submitted"] += 1
+
+        reporter = ProgressReporter(job_id, self._shared)
+        job["_cleanup"] = cleanup
+        job["_task"] = asyncio.create_task(self._run(job, fn, kwargs, reporter, cleanup))
+        log_event(logger, logging.INFO, "job.submitted", job_id=job_id, kind=kind)
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> dict | None:
+        with self._lock:
+            self._expire(time.time())
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] not in FINISHED:
+                # El worker publica su etapa en el dict compartido
+                stage = self._shared.get(job_id)
+                if stage is not None and job["status"] != "cancelling":
+                    job["stage"], job["progress"] = stage
+                    if job["status"] == "queued":
+                        job["status"], job["started"] = "running", time.time()
+            return {k: v for k, v in job.items() if not k.startswith("_") and k != "result_path"}
+
+    def result(self, job_id: str) -> dict | None:
+        """Copia interna del job (incluye result_path); None si no existe o expiró."""
+        with self._lock:
+            self._expire(time.time())
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def cancel(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in FINISHED:
+                pass
+            elif "_future" not in job:
+                # Aún espera cupo: no hay nada en un worker
+                job["_task"].cancel()
+                for path in job["_cleanup"]:
+                    _unlink(path)
+                self._finish_locked(job, "cancelled")
+            else:
+                # Ya está en un worker: se corta en el siguiente progress() y
+                # sigue pendiente hasta que el worker devuelva el cupo
+                self._shared[f"{job_id}:cancel"] = True
+                job["status"], job["stage"] = "cancelling", "cancelando"
+        return self.status(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_status = {}
+            for job in self._jobs.values():
+                by_status[job["status"]] = by_status.get(job["status"], 0) + 1
+            return {
+                **self._counters,
+                "jobs": by_status,
+                "max_pending": self.max_pending,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    # ---------------- internos ----------------
+    async def _run(self, job: dict, fn: Callable, kwargs: dict, reporter: ProgressReporter, cleanup: tuple) -> None:
+        job_id = job["job_id"]
+        try:
+            await self.pool.acquire()
+        except asyncio.CancelledError:
+            return  # cancel() ya lo cerró y borró las entradas
+        except Exception as e:
+            for path in cleanup:
+                _unlink(path)
+            self._finish(job, "failed", error=str(e))
+            log_event(logger, logging.WARNING, "job.failed", job_id=job_id, error=str(e))
+            return
+
+        try:
+            # Desde aquí no se cancela la tarea: se espera a que el worker termine
+            job["_future"] = self.pool.submit(
+                _execute_job, fn, kwargs, reporter, job["result_path"], cleanup,
+            )
+            stats = await job["_future"]
+            record_stages(job["kind"], stats.get("stages"))
+            self._finish(job, "done", stats=_summary(stats))
+        except JobCancelledError:
+            _unlink(job["result_path"])
+            self._finish(job, "cancelled")
+        except Exception as e:
+            for path in (job["result_path"], *cleanup):
+                _unlink(path)
+            self._finish(job, "failed", error=str(e))
+            log_event(logger, logging.WARNING, "job.failed", job_id=job_id, error=str(e))
+
+    def _finish(self, job: dict, status: str, stats: dict = None, error: str = None) -> None:
+        with self._lock:
+            self._finish_locked(job, status, stats, error)
+
+    def _finish_locked(self, job: dict, status: str, stats: dict = None, error: str = None) -> None:
+        job["status"] = status
+        job["finished"] = time.time()
+        job["stats"] = stats
+        job["error"] = error
+        job["stage"] = status
+        job["progress"] = 1.0 if status == "done" else job["progress"]
+        for key in ("_task", "_future", "_cleanup"):
+            job.pop(key, None)
+        self._counters[status] += 1
+        # El worker ya devolvió su cupo (o nunca lo tomó): nadie lee más la marca
+        self._shared.pop(job["job_id"], None)
+        self._shared.pop(f"{job['job_id']}:cancel", None)
+        log_event(logger, logging.INFO, "job.finished", job_id=job["job_id"], status=status)
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            k for k, j in self._jobs.items()
+            if j["status"] in FINISHED and now - j["finished"] > self.ttl_seconds
+        ]
+        for k in expired:
+            job = self._jobs.pop(k)
+            _unlink(job["result_path"])
+            self._shared.pop(k, None)
+            self._shared.pop(f"{k}:cancel", None)
+            self._counters["expired"] += 1
+
+
+def _summary(stats: dict) -> dict:
+    """Contadores y etapas de stats: las listas por fila (codigos_info, codigos) no van en el estado."""
+    return {k: v for k, v in stats.items() if k == "stages" or not isinstance(v, (list, tuple, dict, set))}
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def create_job_manager(pool: WorkerPool) -> JobManager:
+    return JobManager(
+        pool=pool,
+        max_pending=JOB_MAX_PENDING,
+        ttl_seconds=JOB_TTL_SECONDS,
+        result_dir=JOB_RESULT_DIR,
+    )
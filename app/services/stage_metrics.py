@@ -0,0 +1,261 @@
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from typing import Callable, Iterable, Optional
+
+# ============================================================
+# Configuración por variables de entorno
+# - STAGE_MEMORY: rss (default, pico del RSS actual muestreado dentro de la
+#   etapa; solo Linux, /proc/self/statm) | tracemalloc (pico de memoria
+#   Python dentro de la etapa; más lento) | off
+# - STAGE_RSS_SAMPLE_MS: intervalo de muestreo del modo rss (default 10 ms)
+# ============================================================
+STAGE_MEMORY = os.getenv("STAGE_MEMORY", "rss").lower()
+STAGE_RSS_SAMPLE_MS = float(os.getenv("STAGE_RSS_SAMPLE_MS", "10"))
+
+MB = 1024 * 1024
+
+# Etapas que reportan los pipelines (mismos nombres que el progress de los jobs)
+STAGES = ("lectura", "limpieza", "auditoria", "escritura")
+STAGE_HEADERS = tuple(f"X-Stage-{s.capitalize()}" for s in STAGES) + ("X-Stage-Total",)
+
+
+# ============================================================
+# tracemalloc compartido (varios pipelines a la vez en modo thread)
+# ============================================================
+_TRACE_LOCK = threading.Lock()
+_TRACE_USERS = 0
+
+
+def _trace_start() -> None:
+    global _TRACE_USERS
+    with _TRACE_LOCK:
+        if _TRACE_USERS == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _TRACE_USERS += 1
+
+
+def _trace_stop() -> None:
+    global _TRACE_USERS
+    with _TRACE_LOCK:
+        _TRACE_USERS -= 1
+        if _TRACE_USERS == 0:
+            tracemalloc.stop()
+
+
+def _rss_peak_bytes() -> int:
+    """Pico de RSS de toda la vida del proceso (ru_maxrss): no sirve por etapa."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux: KB
+
+
+# ============================================================
+# RSS actual muestreado (modo rss)
+# ============================================================
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes() -> Optional[int]:
+    """RSS actual del proceso; None si no hay /proc (macOS, Windows)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler:
+    """
+    Hilo que lee el RSS actual cada STAGE_RSS_SAMPLE_MS y guarda el máximo
+    desde el último reset(). El RSS es del proceso: con varios pipelines a la
+    vez en modo thread, el pico de una etapa incluye lo de los demás.
+    """
+
+    def __init__(self):
+        self._peak = _rss_bytes() or 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="stage-rss", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        interval = max(STAGE_RSS_SAMPLE_MS, 1.0) / 1000
+        while not self._stop.wait(interval):
+            rss = _rss_bytes()
+            if rss is not None and rss > self._peak:
+                self._peak = rss
+
+    def reset(self) -> None:
+        self._peak = _rss_bytes() or 0
+
+    def peak(self) -> int:
+        return max(self._peak, _rss_bytes() or 0)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# ============================================================
+# Medición por etapa
+# ============================================================
+class StageRecorder:
+    """
+    Se usa como el callback progress(etapa, fraccion) dentro del pipeline:
+    cada llamada cierra la etapa anterior y abre la siguiente (y reenvía a
+    progress, si hay). rows() anota las filas de una etapa y close() devuelve
+    [{"stage", "seconds", "rows", "peak_bytes"}, ...].
+    """
+
+    def __init__(self, progress: Optional[Callable[[str, float], None]] = None):
+        self._progress = progress
+        self._stages = []
+        self._current = None
+        self._start = 0.0
+        self._finalize = None
+        self._sampler = None
+        if STAGE_MEMORY == "tracemalloc":
+            _trace_start()
+            self._finalize = weakref.finalize(self, _trace_stop)
+        elif STAGE_MEMORY == "rss" and _rss_bytes() is not None:
+            self._sampler = _RssSampler()
+            self._finalize = weakref.finalize(self, self._sampler.stop)
+
+    def __call__(self, stage: str, fraction: float) -> None:
+        self._close_current()
+        if self._progress is not None:
+            self._progress(stage, fraction)
+        self._current = {"stage": stage, "seconds": 0.0, "rows": None, "peak_bytes": None}
+        if self._sampler is not None:
+            self._sampler.reset()
+        elif self._finalize is not None:
+            tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+
+    def rows(self, n: int, stage: Optional[str] = None) -> None:
+        """Filas de la etapa actual (o de una ya cerrada, por nombre)."""
+        for s in [self._current, *reversed(self._stages)]:
+            if s is not None and (stage is None or s["stage"] == stage):
+                s["rows"] = int(n)
+                return
+
+    def close(self) -> list[dict]:
+        self._close_current()
+        if self._finalize is not None:
+            self._finalize()
+        return self._stages
+
+    def _close_current(self) -> None:
+        if self._current is None:
+            return
+        self._current["seconds"] = round(time.perf_counter() - self._start, 6)
+        if self._sampler is not None:
+            self._current["peak_bytes"] = self._sampler.peak()
+        elif self._finalize is not None:
+            self._current["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        self._stages.append(self._current)
+        self._current = None
+
+
+def stage_headers(stages: Optional[Iterable[dict]]) -> dict:
+    """X-Stage-<Etapa>: time_ms=..; rows=..; peak_mb=..  y  X-Stage-Total: time_ms=.."""
+    headers = {}
+    total = 0.0
+    for s in stages or ():
+        total += s["seconds"]
+        parts = [f"time_ms={s['seconds'] * 1000:.1f}"]
+        if s["rows"] is not None:
+            parts.append(f"rows={s['rows']}")
+        if s["peak_bytes"] is not None:
+            parts.append(f"peak_mb={s['peak_bytes'] / MB:.1f}")
+        headers[f"X-Stage-{s['stage'].capitalize()}"] = "; ".join(parts)
+    if headers:
+        headers["X-Stage-Total"] = f"time_ms={total * 1000:.1f}"
+    return headers
+
+
+# ============================================================
+# Histogramas Prometheus (formato de texto, sin dependencias)
+# ============================================================
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple, labels: tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[k]) for k in self.labels)
+        with self._lock:
+            counts, total, n = self._series.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, le in enumerate(self.buckets):
+                if value <= le:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value, n + 1)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, (counts, total, n) in series:
+            base = ",".join(f'{k}="{_escape_label(v)}"' for k, v in zip(self.labels, key))
+            for le, c in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base},le="{_number(le)}"}} {c}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {n}')
+            lines.append(f"{self.name}_sum{{{base}}} {_number(total)}")
+            lines.append(f"{self.name}_count{{{base}}} {n}")
+        return lines
+
+
+def _number(x: float) -> str:
+    """Valor exacto para el formato de texto (sin redondear a 6 cifras como :g)."""
+    return repr(float(x))
+
+
+def _escape_label(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds", "Tiempo de pared por etapa del pipeline.",
+    (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+    ("pipeline", "stage"),
+)
+STAGE_ROWS = Histogram(
+    "pipeline_stage_rows", "Filas procesadas por etapa del pipeline.",
+    (100, 1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000),
+    ("pipeline", "stage"),
+)
+STAGE_PEAK_BYTES = Histogram(
+    "pipeline_stage_peak_memory_bytes", "Pico de memoria dentro de la etapa (ver STAGE_MEMORY).",
+    tuple(mb * MB for mb in (16, 64, 128, 256, 512, 1024, 2048, 4096)),
+    ("pipeline", "stage"),
+)
+
+
+def record_stages(pipeline: str, stages: Optional[Iterable[dict]]) -> None:
+    """Suma las etapas de una ejecución a los histogramas (en el proceso de la API)."""
+    for s in stages or ():
+        STAGE_SECONDS.observe(s["seconds"], pipeline=pipeline, stage=s["stage"])
+        if s["rows"] is not None:
+            STAGE_ROWS.observe(s["rows"], pipeline=pipeline, stage=s["stage"])
+        if s["peak_bytes"] is not None:
+            STAGE_PEAK_BYTES.observe(s["peak_bytes"], pipeline=pipeline, stage=s["stage"])
+
+
+def observe_stages(pipeline: str, stats: dict) -> dict:
+    """record_stages + headers X-Stage-* para la respuesta."""
+    stages = stats.get("stages")
+    record_stages(pipeline, stages)
+    return stage_headers(stages)
+
+
+def render_metrics() -> str:
+    lines = []
+    for h in (STAGE_SECONDS, STAGE_ROWS, STAGE_PEAK_BYTES):
+        lines.extend(h.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,126 @@
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# Configuración por variables de entorno
+# - LOG_LEVEL: DEBUG / INFO / WARNING (default) / ERROR
+# - LOG_ROW_SAMPLE_RATE: fracción de filas con diagnóstico en DEBUG (0 = ninguna)
+# - LOG_ROW_SAMPLE_MAX: máximo de filas diagnosticadas por etapa
+# ============================================================
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+LOG_ROW_SAMPLE_RATE = float(os.getenv("LOG_ROW_SAMPLE_RATE", "0.001"))
+LOG_ROW_SAMPLE_MAX = int(os.getenv("LOG_ROW_SAMPLE_MAX", "20"))
+
+ROOT_LOGGER = "app"
+
+# Correlation ID de la request en curso (lo fija el middleware de app.main)
+REQUEST_ID: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por evento: ts, level, logger, event, request_id + campos extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    El prepare() estándar pega el traceback al mensaje y borra exc_info: aquí
+    el traceback se formatea en exc_text (campo "exc") y el evento queda limpio.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # El traceback retiene frames: no se encola
+        record.exc_info = None
+        return record
+
+
+class _RequestIdFilter(logging.Filter):
+    # Se toma el ID en el hilo que emite (el contextvar no viaja a la cola)
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = REQUEST_ID.get()
+        return True
+
+
+def configure_logging() -> None:
+    """
+    Idempotente. Los handlers escriben desde un hilo aparte (QueueHandler):
+    las requests solo encolan el registro y no se serializan en stderr.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(q)
+    queue_handler.addFilter(_RequestIdFilter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(queue_handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(q, handler)
+    _listener.start()
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields) -> None:
+    """Evento estructurado; si el nivel está apagado no se arma nada."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+# ============================================================
+# Diagnóstico por fila (muestreado)
+# ============================================================
+def sample_rows(logger: logging.Logger, n: int) -> np.ndarray:
+    """Posiciones de filas a diagnosticar; vacío si DEBUG está apagado o la tasa es 0."""
+    if n == 0 or LOG_ROW_SAMPLE_RATE <= 0 or not logger.isEnabledFor(logging.DEBUG):
+        return np.empty(0, dtype=np.int64)
+    k = min(LOG_ROW_SAMPLE_MAX, max(1, int(n * LOG_ROW_SAMPLE_RATE)))
+    return np.sort(np.random.default_rng().choice(n, size=min(k, n), replace=False))
+
+
+def log_row_samples(logger: logging.Logger, event: str, frame: pd.DataFrame, first_row: int = 5) -> None:
+    """Un evento DEBUG por fila muestreada de frame (fila = posición + first_row)."""
+    rows = sample_rows(logger, len(frame))
+    for pos in rows.tolist():
+        fields = {k: v.item() if isinstance(v, np.generic) else v for k, v in frame.iloc[pos].items()}
+        logger.debug(event, extra={"fields": {"fila": pos + first_row, **fields}})
+
@@ -0,0 +1,321 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+
+import pandas as pd
+
+
+# ============================================================
+# Interfaz del almacén de uploads (/excel/analyze -> /excel/normalize)
+# ============================================================
+class UploadStore(ABC):
+    @abstractmethod
+    def put(self, upload_id: str, content: bytes, parsed: Any = None) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, upload_id: str):
+        """
+        Bytes del Excel si está en memoria, o la ruta del archivo derramado a
+        disco (el worker la abre con mmap; no se copia a la API). None si no existe.
+        """
+
+    @abstractmethod
+    def get_parsed(self, upload_id: str) -> Any:
+        """Intermedio de parse_catalog si sigue en memoria, si no None."""
+
+    @abstractmethod
+    def get_stage(self, upload_id: str, stage: str, key: Any) -> Any:
+        """Salida memoizada de una etapa del pipeline si se calculó con la misma key, si no None."""
+
+    @abstractmethod
+    def put_stage(self, upload_id: str, stage: str, key: Any, value: Any) -> None:
+        """Memoiza la salida de una etapa (una por etapa y upload: reemplaza la anterior)."""
+
+    @abstractmethod
+    def delete(self, upload_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    def __contains__(self, upload_id: str) -> bool:
+        return self.get(upload_id) is not None
+
+
+def _frame_size(value: Any) -> int:
+    # (df, meta, stats) o un DataFrame suelto
+    df = value[0] if isinstance(value, tuple) else value
+    if isinstance(df, pd.DataFrame):
+        return int(df.memory_usage(deep=True).sum())
+    return 0
+
+
+def _size_of(content: bytes, parsed: Any) -> int:
+    return len(content) + _frame_size(parsed)
+
+
+# ============================================================
+# Implementación local: memoria acotada (LRU + TTL) con derrame a disco
+# ============================================================
+class LocalUploadStore(UploadStore):
+    """
+    - Las entradas viven en memoria hasta max_memory_bytes (bytes + DataFrame cacheado).
+    - Al superar el presupuesto, las menos usadas se escriben a spill_dir
+      (se descartan el intermedio parseado y las etapas memoizadas, que se
+      pueden recalcular).
+    - Las entradas en disco se entregan como ruta y se borran por TTL o por max_disk_bytes.
+    - Cada proceso derrama en su propia carpeta spill_dir/<host>-<pid>: varios
+      workers de uvicorn o réplicas pueden compartir spill_dir sin tocar los
+      archivos de los demás.
+    - Al arrancar se reclaman las carpetas de procesos muertos del mismo host
+      y se re-indexa la propia (edad por mtime): lo vencido o fuera de
+      presupuesto se borra.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int,
+        ttl_seconds: float,
+        spill_dir: str,
+        max_disk_bytes: int,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_root = spill_dir
+        self.spill_dir = os.path.join(spill_dir, f"{socket.gethostname()}-{os.getpid()}")
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._disk: OrderedDict[str, dict] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+            "expired": 0,
+            "stage_hits": 0,
+            "stage_misses": 0,
+        }
+        os.makedirs(self.spill_dir, exist_ok=True)
+        with self._lock:
+            self._claim_orphaned_spills()
+            self._reindex_spill_dir()
+
+    # ---------------- API ----------------
+    def put(self, upload_id: str, content: bytes, parsed: Any = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._remove(upload_id)
+            self._expire(now)
+            entry = {
+                "content": content,
+                "parsed": parsed,
+                "stages": {},
+                "size": _size_of(content, parsed),
+                "created": now,
+            }
+            self._memory[upload_id] = entry
+            self._memory_bytes += entry["size"]
+            self._enforce_memory_budget()
+
+    def get(self, upload_id: str):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._memory.get(upload_id)
+            if entry is not None:
+                self._memory.move_to_end(upload_id)
+                self._counters["hits"] += 1
+                return entry["content"]
+
+            entry = self._disk.get(upload_id)
+            if entry is not None:
+                try:
+                    os.stat(entry["path"])
+                except OSError:
+                    # Borrado por fuera (p.ej. limpieza de /tmp): cuenta como miss
+                    self._disk.pop(upload_id)
+                    self._disk_bytes -= entry["size"]
+                else:
+                    self._disk.move_to_end(upload_id)
+                    self._counters["disk_hits"] += 1
+                    return entry["path"]
+
+            self._counters["misses"] += 1
+            return None
+
+    def get_parsed(self, upload_id: str) -> Any:
+        with self._lock:
+            entry = self._memory.get(upload_id)
+            return entry["parsed"] if entry is not None else None
+
+    def get_stage(self, upload_id: str, stage: str, key: Any) -> Any:
+        with self._lock:
+            entry = self._memory.get(upload_id)
+            memo = entry["stages"].get(stage) if entry is not None else None
+            if memo is None or memo[0] != key:
+                self._counters["stage_misses"] += 1
+                return None
+            self._counters["stage_hits"] += 1
+            return memo[1]
+
+    def put_stage(self, upload_id: str, stage: str, key: Any, value: Any) -> None:
+        with self._lock:
+            # Solo en memoria: si el upload ya se derramó a disco no se guarda
+            entry = self._memory.get(upload_id)
+            if entry is None:
+                return
+            old = entry["stages"].pop(stage, None)
+            delta = _frame_size(value) - (_frame_size(old[1]) if old is not None else 0)
+            entry["stages"][stage] = (key, value)
+            entry["size"] += delta
+            self._memory_bytes += delta
+            self._enforce_memory_budget()
+
+    def delete(self, upload_id: str) -> None:
+        with self._lock:
+            self._remove(upload_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    # ---------------- internos (con lock tomado) ----------------
+    def _expire(self, now: float) -> None:
+        for store in (self._memory, self._disk):
+            expired = [k for k, e in store.items() if now - e["created"] > self.ttl_seconds]
+            for k in expired:
+                self._remove(k)
+                self._counters["expired"] += 1
+
+    def _enforce_memory_budget(self) -> None:
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            upload_id, entry = self._memory.popitem(last=False)
+            self._memory_bytes -= entry["size"]
+            self._counters["evictions"] += 1
+            self._spill(upload_id, entry)
+
+    def _spill(self, upload_id: str, entry: dict) -> None:
+        content = entry["content"]
+        if len(content) > self.max_disk_bytes:
+            self._counters["disk_evictions"] += 1
+            return
+
+        path = os.path.join(self.spill_dir, f"{upload_id}.xlsx")
+        with open(path, "wb") as f:
+            f.write(content)
+        self._disk[upload_id] = {"path": path, "size": len(content), "created": entry["created"]}
+        self._disk_bytes += len(content)
+        self._enforce_disk_budget()
+
+    def _enforce_disk_budget(self) -> None:
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            _, old = self._disk.popitem(last=False)
+            self._disk_bytes -= old["size"]
+            self._counters["disk_evictions"] += 1
+            _unlink(old["path"])
+
+    def _claim_orphaned_spills(self) -> None:
+        # Carpetas <host>-<pid> de procesos de este host que ya no existen: sus
+        # archivos pasan a la propia (rename atómico; si otro proceso que
+        # arranca a la vez lo reclamó primero, se salta)
+        host, own_pid = socket.gethostname(), os.getpid()
+        for name in os.listdir(self.spill_root):
+            owner, sep, pid = name.rpartition("-")
+            path = os.path.join(self.spill_root, name)
+            if not sep or owner != host or not pid.isdigit() or int(pid) == own_pid:
+                continue
+            if not os.path.isdir(path) or _pid_alive(int(pid)):
+                continue
+            try:
+                names = os.listdir(path)
+            except OSError:
+                continue
+            for spill in names:
+                if spill.endswith(".xlsx"):
+                    try:
+                        os.rename(os.path.join(path, spill), os.path.join(self.spill_dir, spill))
+                    except OSError:
+                        pass
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+
+    def _reindex_spill_dir(self) -> None:
+        # Derrames de una ejecución anterior (o reclamados): siguen sirviendo
+        # a su upload_id hasta el TTL y cuentan para max_disk_bytes
+        now, mono = time.time(), time.monotonic()
+        found = []
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            if not name.endswith(".xlsx") or not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            found.append((st.st_mtime, name[:-len(".xlsx")], path, st.st_size))
+        for mtime, upload_id, path, size in sorted(found):
+            self._disk[upload_id] = {"path": path, "size": size, "created": mono - max(0.0, now - mtime)}
+            self._disk_bytes += size
+        self._expire(mono)
+        self._enforce_disk_budget()
+
+    def _remove(self, upload_id: str) -> None:
+        entry = self._memory.pop(upload_id, None)
+        if entry is not None:
+            self._memory_bytes -= entry["size"]
+        entry = self._disk.pop(upload_id, None)
+        if entry is not None:
+            self._disk_bytes -= entry["size"]
+            _unlink(entry["path"])
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ============================================================
+# Configuración por variables de entorno
+# ============================================================
+def create_upload_store() -> UploadStore:
+    mb = 1024 * 1024
+    return LocalUploadStore(
+        max_memory_bytes=int(float(os.getenv("UPLOAD_STORE_MAX_MEMORY_MB", "512")) * mb),
+        ttl_seconds=float(os.getenv("UPLOAD_STORE_TTL_SECONDS", "3600")),
+        spill_dir=os.getenv(
+            "UPLOAD_STORE_SPILL_DIR", os.path.join(tempfile.gettempdir(), "excel_uploads")
+        ),
+        max_disk_bytes=int(float(os.getenv("UPLOAD_STORE_MAX_DISK_MB", "4096")) * mb),
+    )
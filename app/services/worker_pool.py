@@ -0,0 +1,241 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Callable
+
+from .excel_cleaners import add_memo_counters, run_counting_memo
+from .free_threading import free_threaded_runtime
+from .structured_logging import REQUEST_ID, configure_logging
+
+# ============================================================
+# Configuración por variables de entorno
+# - WORKER_POOL_MODE: auto (default) | process | thread
+#   auto = thread en intérpretes free-threaded (los DataFrames no se
+#   serializan entre procesos), process con GIL
+# - WORKER_POOL_SIZE: procesos/hilos que ejecutan pipelines a la vez
+# - WORKER_POOL_MAX_QUEUE: trabajos esperando turno antes de responder 503
+# - WORKER_POOL_START_METHOD: spawn (default) | forkserver | fork
+# ============================================================
+WORKER_POOL_MODE = os.getenv("WORKER_POOL_MODE", "auto").lower()
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", str(max(1, min(4, os.cpu_count() or 1)))))
+WORKER_POOL_MAX_QUEUE = int(os.getenv("WORKER_POOL_MAX_QUEUE", "16"))
+WORKER_POOL_START_METHOD = os.getenv("WORKER_POOL_START_METHOD", "spawn")
+
+
+class PoolSaturatedError(RuntimeError):
+    """La cola del pool está llena: el cliente debe reintentar."""
+
+
+def _init_worker() -> None:
+    configure_logging()
+
+
+def _run_with_request_id(request_id: str, fn: Callable, args: tuple, kwargs: dict):
+    # El contextvar no cruza procesos: se vuelve a fijar en el worker
+    token = REQUEST_ID.set(request_id)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        REQUEST_ID.reset(token)
+
+
+def _run_in_process(request_id: str, fn: Callable, args: tuple, kwargs: dict):
+    # (resultado, contadores del memo de limpieza del worker) -> se suman en la API
+    return run_counting_memo(_run_with_request_id, request_id, fn, args, kwargs)
+
+
+# ============================================================
+# Pool con concurrencia acotada
+# ============================================================
+class WorkerPool:
+    """
+    Ejecuta pipelines síncronos (pandas/openpyxl) fuera del event loop.
+    - A lo sumo `size` trabajos corren a la vez (semáforo).
+    - A lo sumo `max_queue` esperan turno; más allá -> PoolSaturatedError.
+    """
+
+    def __init__(self, mode: str, size: int, max_queue: int, start_method: str):
+        self.mode = mode
+        self.size = size
+        self.max_queue = max_queue
+        self.start_method = start_method
+
+        self._executor: Executor = None
+        self._manager = None
+        self._semaphore: asyncio.Semaphore = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "pool_restarts": 0}
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "thread":
+                    self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="pipeline")
+                else:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.size,
+                        mp_context=multiprocessing.get_context(self.start_method),
+                        initializer=_init_worker,
+                    )
+            return self._executor
+
+    def _reset_executor(self, executor: Executor) -> None:
+        """
+        Recrea el pool solo si executor sigue siendo el actual y de verdad está
+        roto: varios futures fallidos del mismo pool lo reinician una vez, y un
+        BrokenProcessPool que fn lanzó adentro (p.ej. del pool de particiones)
+        no reinicia un pool sano.
+        """
+        with self._lock:
+            if self._executor is not executor or not getattr(executor, "_broken", False):
+                return
+            self._executor = None
+            self._counters["pool_restarts"] += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """await pool.run(fn, ...): fn y sus argumentos deben ser serializables (pickle)."""
+        await self.acquire()
+        return await self.submit(fn, *args, **kwargs)
+
+    async def run_with_cleanup(self, cleanup: Callable[[], None], fn: Callable, *args, **kwargs):
+        """
+        Como run(), para trabajos que dejan archivos: si falla o quien espera se
+        cancela (cliente que corta), cleanup() corre cuando el worker terminó de
+        verdad, no antes (si no, el worker vuelve a crear lo que se borró).
+        Si termina bien, los archivos quedan para quien llamó.
+        """
+        try:
+            await self.acquire()
+        except BaseException:
+            cleanup()
+            raise
+        future, done = self._submit(fn, args, kwargs)
+        try:
+            return await future
+        except BaseException:
+            if done.done():
+                cleanup()
+            else:
+                done.add_done_callback(lambda _: cleanup())
+            raise
+
+    async def acquire(self) -> None:
+        """
+        Espera un cupo (PoolSaturatedError si la cola está llena). Cancelarlo
+        mientras espera no deja nada corriendo; después va submit().
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+
+        if self._queued >= self.max_queue and self._semaphore.locked():
+            self._counters["rejected"] += 1
+            raise PoolSaturatedError(f"Cola de procesamiento llena ({self.max_queue} en espera)")
+
+        self._counters["submitted"] += 1
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+        self._running += 1
+
+    def submit(self, fn: Callable, *args, **kwargs) -> asyncio.Future:
+        """Manda fn al executor con el cupo tomado por acquire()."""
+        return self._submit(fn, args, kwargs)[0]
+
+    def _submit(self, fn: Callable, args: tuple, kwargs: dict) -> tuple[asyncio.Future, Future]:
+        # (future para await, future del executor: termina cuando el worker termina)
+        loop = asyncio.get_running_loop()
+        run = _run_with_request_id if self.mode == "thread" else _run_in_process
+        executor = self._get_executor()
+        try:
+            job = partial(run, REQUEST_ID.get(), fn, args, kwargs)
+            future = executor.submit(job)
+        except BrokenProcessPool:
+            self._counters["failed"] += 1
+            self._reset_executor(executor)
+            self._release()
+            raise
+        except BaseException:
+            self._release()
+            raise
+        # El cupo se libera cuando el worker termina de verdad, aunque quien
+        # esperaba el resultado haya sido cancelado (p.ej. un job cancelado)
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._settle, f, executor))
+        if self.mode == "thread":
+            return asyncio.wrap_future(future), future
+        return asyncio.ensure_future(_result(asyncio.wrap_future(future))), future
+
+    def _settle(self, future, executor: Executor) -> None:
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error is not None:
+            self._counters["failed"] += 1
+        else:
+            self._counters["completed"] += 1
+        if error is None and not future.cancelled() and self.mode != "thread":
+            add_memo_counters(future.result()[1])
+        if isinstance(error, BrokenProcessPool):
+            # Un worker murió (p.ej. OOM): se recrea el pool para los siguientes trabajos
+            self._reset_executor(executor)
+        self._release()
+
+    def _release(self) -> None:
+        self._running -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "mode": self.mode,
+            "size": self.size,
+            "running": self._running,
+            "queue_depth": self._queued,
+            "max_queue": self.max_queue,
+        }
+
+    def shared_dict(self) -> dict:
+        """Dict visible desde los workers (proxy de Manager en modo process)."""
+        if self.mode == "thread":
+            return {}
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context(self.start_method).Manager()
+            return self._manager.dict()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+
+async def _result(future: asyncio.Future):
+    # Modo process: el worker devuelve (resultado, memo); el memo ya se sumó en _settle
+    result, _ = await future
+    return result
+
+
+def create_worker_pool() -> WorkerPool:
+    mode = WORKER_POOL_MODE
+    if mode not in ("process", "thread"):
+        mode = "thread" if free_threaded_runtime() else "process"
+    return WorkerPool(
+        mode=mode,
+        size=WORKER_POOL_SIZE,
+        max_queue=WORKER_POOL_MAX_QUEUE,
+        start_method=WORKER_POOL_START_METHOD,
+    )
+
+
+# Pool compartido por todas las rutas
+POOL = create_worker_pool()
@@ -0,0 +1,49 @@
+"""
+Memoria por columna con y sin dtypes compactos (CATALOG_COMPACT_DTYPES):
+DF preparado para la auditoría (prepare_stage + IGV) sobre el catálogo sintético
+de bench_normalize_memory.
+
+Uso:
+    python -m benchmarks.bench_compact_dtypes --rows 200000
+"""
+import argparse
+
+import pandas as pd
+
+from app.services import excel_cleaners
+from app.services.excel_normalize_service import _apply_toggles, _compact_catalog, prepare_stage
+from benchmarks.bench_normalize_memory import build_parsed
+
+
+def prepared(parsed, compact: bool) -> pd.DataFrame:
+    excel_cleaners.COMPACT_DTYPES = compact
+    df, meta, _ = prepare_stage(b"", parsed=parsed)
+    df = _apply_toggles(df, meta, None, apply_igv_cost=True, apply_igv_sale=False)
+    _compact_catalog(df, meta)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    parsed = build_parsed(args.rows)
+    antes = prepared(parsed, compact=False)
+    despues = prepared(parsed, compact=True)
+
+    mb = 1024 * 1024
+    mem_antes = antes.memory_usage(deep=True, index=False)
+    mem_despues = despues.memory_usage(deep=True, index=False)
+    print(f"{'columna':20s} {'dtype':>10s} {'antes MB':>10s} {'después MB':>11s}")
+    for col in antes.columns:
+        print(
+            f"{str(col):20s} {str(despues[col].dtype):>10s} "
+            f"{mem_antes[col] / mb:10.2f} {mem_despues[col] / mb:11.2f}"
+        )
+    total_antes, total_despues = mem_antes.sum(), mem_despues.sum()
+    print(f"{'TOTAL':20s} {'':>10s} {total_antes / mb:10.2f} {total_despues / mb:11.2f}  ({total_despues / total_antes:.0%})")
+
+
+if __name__ == "__main__":
+    main()
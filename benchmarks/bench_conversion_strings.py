@@ -0,0 +1,70 @@
+"""
+Benchmark de la columna "conversion": doble bucle con df.iloc por celda
+(versión anterior) vs construir_conversiones (por columnas).
+
+Uso:
+    python -m benchmarks.bench_conversion_strings --rows 100000 --cols 20
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.conversion_processor import construir_conversiones
+
+
+def construir_conversiones_por_celda(df: pd.DataFrame, columnas_conversion: dict) -> list:
+    """Paso 6 original de generar_excel_conversion_bytes."""
+    conversiones = []
+    for idx in range(len(df)):
+        partes = []
+        for col_idx, nombre_conv in columnas_conversion.items():
+            valor = df.iloc[idx, col_idx]
+            if pd.notna(valor) and str(valor).strip() and str(valor).strip().upper() != "NAN":
+                partes.append(f"{nombre_conv}-{nombre_conv}-{valor}")
+        conversiones.append("#".join(partes))
+    return conversiones
+
+
+def build_frame(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for j in range(cols):
+        if j % 3 == 0:
+            # Columna numérica con huecos
+            v = rng.integers(1, 50, rows).astype(float)
+            v[rng.random(rows) < 0.6] = np.nan
+            data[f"CAJA{j}"] = v
+        else:
+            # Columna mixta leída como object
+            pool = np.array([None, "", " ", "nan", "NaN", 12, 2.5, "6", " x12 ", "UND"], dtype=object)
+            data[f"PAQ-{j}"] = pool[rng.integers(0, len(pool), rows)]
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cols", type=int, default=20)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows, args.cols)
+    columnas_conversion = {i: str(c).replace("-", "") for i, c in enumerate(df.columns)}
+    print(f"{args.rows} filas x {args.cols} columnas de conversión")
+
+    t0 = time.perf_counter()
+    legacy = construir_conversiones_por_celda(df, columnas_conversion)
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    nuevo = construir_conversiones(df, columnas_conversion)
+    t_nuevo = time.perf_counter() - t0
+
+    assert list(nuevo) == legacy, "construir_conversiones difiere de la versión por celda"
+    print(f"por celda (df.iloc)       {t_legacy:8.2f} s")
+    print(f"construir_conversiones    {t_nuevo:8.2f} s   x{t_legacy / t_nuevo:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Modo free-threaded frente al build con GIL. Para cada intérprete (--python,
+con K=V opcionales, p.ej. "python3.14t,PYTHON_GIL=1") corre normalize sobre
+un catálogo sintético en memoria (synthetic_catalog.catalog_frame, sin leer
+xlsx) en tres modos, cada uno en su subproceso:
+- secuencial: sin hilos ni particiones
+- hilos: columnas, particiones y hojas en el pool de hilos compartido
+- procesos: particiones en procesos (cada bloque viaja por pickle)
+Reporta la limpieza por columna (parse_catalog_frame), limpieza+auditoría,
+escritura y total, y verifica que los stats sean iguales en todos los casos.
+
+Uso:
+    python -m benchmarks.bench_free_threading --python python3.14 --python python3.14t --rows 200000
+    python -m benchmarks.bench_free_threading --python "python3.14t,PYTHON_GIL=1" --python python3.14t
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_catalog import catalog_frame, parse_size
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("secuencial", "hilos", "procesos")
+STATS_KEYS = ("rows_before", "rows_ok", "rows_corrected", "errors_count", "codes_fixed")
+
+
+def mode_env(mode: str, threads: int) -> dict:
+    """Variables de entorno de cada modo (ver free_threading y excel_partitions)."""
+    if mode == "secuencial":
+        return {"FREE_THREADING": "off", "NORMALIZE_PARTITIONS": "1"}
+    paralelo = {
+        "NORMALIZE_PARTITIONS": str(threads),
+        "NORMALIZE_PARTITION_MIN_ROWS": "0",
+    }
+    if mode == "hilos":
+        return {
+            **paralelo, "FREE_THREADING": "on", "FREE_THREADING_THREADS": str(threads),
+            "NORMALIZE_PARTITION_MODE": "thread",
+        }
+    return {**paralelo, "FREE_THREADING": "off", "NORMALIZE_PARTITION_MODE": "process"}
+
+
+# ============================================================
+# Un caso (se ejecuta en el subproceso)
+# ============================================================
+def run_case(rows: int, seed: int, sheets) -> dict:
+    from app.services.excel_normalize_service import normalize_excel_bytes, parse_catalog_frame
+    from app.services.excel_partitions import NORMALIZE_PARTITIONS, partition_mode, warm_up
+    from app.services.free_threading import free_threading_stats
+
+    df = catalog_frame(rows, seed=seed)
+    if NORMALIZE_PARTITIONS > 1:
+        warm_up(NORMALIZE_PARTITIONS)
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        t0 = time.perf_counter()
+        parsed = parse_catalog_frame(df)
+        columnas = time.perf_counter() - t0
+        _, stats = normalize_excel_bytes(b"", parsed=parsed, apply_igv_cost=True, out=path, sheets=sheets)
+        total = time.perf_counter() - t0
+    finally:
+        os.remove(path)
+    etapas = {s["stage"]: s["seconds"] for s in stats["stages"]}
+    return {
+        "columnas": columnas,
+        "particionado": etapas.get("limpieza", 0.0) + etapas.get("auditoria", 0.0),
+        "escritura": etapas.get("escritura", 0.0),
+        "total": total,
+        "partitions": stats["partitions"],
+        "partition_mode": partition_mode(),
+        "runtime": free_threading_stats(),
+        "stats": {k: stats[k] for k in STATS_KEYS},
+    }
+
+
+def parse_python(spec: str) -> tuple[str, dict]:
+    """'python3.14t,PYTHON_GIL=1' -> (ejecutable, env)."""
+    exe, *overrides = [p.strip() for p in spec.split(",") if p.strip()]
+    env = {}
+    for item in overrides:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"variable inválida en {spec}: {item}")
+        env[key] = value
+    return exe, env
+
+
+def run_subprocess(spec: str, mode: str, args) -> dict:
+    exe, env = parse_python(spec)
+    cmd = [exe, "-m", "benchmarks.bench_free_threading", "--case", "--rows", str(args.rows), "--seed", str(args.seed)]
+    if args.sheets:
+        cmd += ["--sheets", args.sheets]
+    proc = subprocess.run(
+        cmd, capture_output=True, text=True, cwd=REPO_ROOT,
+        env={**os.environ, **mode_env(mode, args.threads), **env},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{spec} / {mode} falló:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--python", action="append", default=None,
+                        help="intérprete (repetible), con K=V opcionales separados por coma (default: el actual)")
+    parser.add_argument("--rows", type=parse_size, default=200_000, help="1k | 10k | 100k | 500k o un número")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="hilos / particiones de los modos paralelos")
+    parser.add_argument("--modes", default=",".join(MODES), help="CSV de " + ", ".join(MODES))
+    parser.add_argument("--sheets", default=None, help="CSV de hojas (default: todas)")
+    # interno: un solo caso, imprime JSON
+    parser.add_argument("--case", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sheets = args.sheets.split(",") if args.sheets else None
+    if args.case:
+        print(json.dumps(run_case(args.rows, args.seed, sheets)))
+        return
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    invalidos = set(modes) - set(MODES)
+    if invalidos:
+        parser.error(f"modos inválidos: {sorted(invalidos)}")
+
+    referencia = None
+    for spec in args.python or [sys.executable]:
+        base = None
+        for mode in modes:
+            r = run_subprocess(spec, mode, args)
+            if referencia is None:
+                referencia = r
+            elif r["stats"] != referencia["stats"]:
+                raise SystemExit(f"FALLA: stats distintos en {spec} / {mode}: {r['stats']} vs {referencia['stats']}")
+            if base is None:
+                rt = r["runtime"]
+                print(
+                    f"{spec}: Python {rt['python']}  free-threaded={rt['free_threaded_build']}  "
+                    f"GIL={'sí' if rt['gil_enabled'] else 'no'}  ({args.rows} filas, {args.threads} hilos)"
+                )
+                base = r
+            print(
+                f"  {mode:10s} columnas {r['columnas']:6.2f} s  limpieza+auditoría {r['particionado']:6.2f} s  "
+                f"escritura {r['escritura']:6.2f} s  total {r['total']:7.2f} s "
+                f"({base['total'] / r['total']:4.2f}x, {referencia['total'] / r['total']:4.2f}x vs primero)  "
+                f"[{r['partitions']} part. {r['partition_mode']}]"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Re-normalización incremental: el mismo upload con distintos toggles (IGV,
+redondeo, tienda). La primera llamada calcula y devuelve la etapa
+memoizable (prepare_stage); las siguientes la reciben como `prepared` y
+solo recalculan IGV, redondeo, auditoría y salida. Compara contra
+recalcular todo desde el intermedio parseado en cada llamada.
+
+Uso:
+    python -m benchmarks.bench_incremental --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.services.excel_normalize_service import normalize_excel_bytes, parse_catalog_frame
+from benchmarks.synthetic_catalog import catalog_frame, parse_size
+
+TOGGLES = [
+    {},
+    {"apply_igv_cost": True},
+    {"apply_igv_cost": True, "apply_igv_sale": True},
+    {"apply_igv_cost": True, "apply_igv_sale": True, "round_numeric": 2},
+    {"round_numeric": 0, "tienda_nombre": "Tienda2"},
+]
+STATS_KEYS = ("rows_before", "rows_ok", "rows_corrected", "errors_count", "codes_fixed")
+
+
+def run(parsed, path: str, sheets, **kw) -> tuple[float, dict]:
+    t0 = time.perf_counter()
+    _, stats = normalize_excel_bytes(b"", parsed=parsed, out=path, sheets=sheets, **kw)
+    return time.perf_counter() - t0, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=parse_size, default=200_000, help="1k | 10k | 100k | 500k o un número")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sheets", default=None, help="CSV de hojas (default: todas)")
+    args = parser.parse_args()
+
+    sheets = args.sheets.split(",") if args.sheets else None
+    parsed = parse_catalog_frame(catalog_frame(args.rows, seed=args.seed))
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        _, first = run(parsed, path, sheets, keep_prepared=True)
+        prepared = first["prepared"]
+        total_full = total_memo = 0.0
+        for kw in TOGGLES:
+            full, a = run(parsed, path, sheets, **kw)
+            memo, b = run(None, path, sheets, prepared=prepared, **kw)
+            if {k: a[k] for k in STATS_KEYS} != {k: b[k] for k in STATS_KEYS}:
+                raise SystemExit(f"FALLA: stats distintos con {kw}")
+            etapas = {s["stage"]: s["seconds"] for s in b["stages"]}
+            total_full += full
+            total_memo += memo
+            print(
+                f"{str(kw):75s} completo {full:6.2f} s  memoizado {memo:6.2f} s ({full / memo:4.2f}x)  "
+                f"limpieza {etapas.get('limpieza', 0.0):5.2f} s"
+            )
+        print(f"{'total':75s} completo {total_full:6.2f} s  memoizado {total_memo:6.2f} s ({total_full / total_memo:4.2f}x)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de ingesta: pd.read_excel (ruta anterior) vs read_catalog_sheet (streaming).
+
+Uso:
+    python -m benchmarks.bench_ingestion --rows 150000
+"""
+import argparse
+import io
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+from openpyxl import Workbook
+
+from app.services.excel_reader import read_catalog_sheet
+
+HEADERS = [
+    "CODIGO", "NOMBRE", "DESCRIPCION", "CATEGORIA", "PRECIO DE COSTO",
+    "PRECIO DE VENTA", "UNIDAD", "STOCK", "MARCA", "MODELO",
+]
+
+
+def build_workbook(rows: int, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["PLANTILLA DE CARGA"])
+    ws.append([])
+    ws.append([])
+    ws.append(HEADERS)
+    for i in range(rows):
+        ws.append([
+            f"P{i:06d}" if rnd.random() > 0.05 else None,
+            f"Producto ñandú {i % 5000} 1 L",
+            "Descripción de prueba",
+            rnd.choice(["Bebidas", "Lácteos", "Limpieza", None]),
+            round(rnd.uniform(0, 100), 2),
+            rnd.choice([round(rnd.uniform(1, 150), 2), "12,50", None]),
+            rnd.choice(["UND", "caja", "Paq.", None]),
+            rnd.randint(-5, 500),
+            rnd.choice(["ACME", "", None]),
+            rnd.choice(["X1", None]),
+        ])
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def measure(fn, data: bytes) -> tuple[float, float]:
+    # Tiempo y memoria en corridas separadas: tracemalloc distorsiona el tiempo
+    t0 = time.perf_counter()
+    fn(data)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=150_000)
+    args = parser.parse_args()
+
+    data = build_workbook(args.rows)
+    print(f"Libro: {args.rows} filas, {len(data) / (1024 * 1024):.1f} MB")
+
+    paths = {
+        "pd.read_excel": lambda b: pd.read_excel(io.BytesIO(b), engine="openpyxl", header=3),
+        "read_catalog_sheet": lambda b: read_catalog_sheet(b, header_row=3),
+    }
+    for name, fn in paths.items():
+        elapsed, peak_mb = measure(fn, data)
+        print(f"{name:<20} {elapsed:8.2f} s   pico {peak_mb:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Pico de memoria de normalize_excel_bytes (tracemalloc) frente al tamaño del
+catálogo de entrada. Parte de un resultado de parse_catalog sintético (sin
+leer xlsx) y escribe el QA a un temporal. Falla si el pico de toda la
+corrida, con la escritura incluida, supera --max-ratio veces el DF de
+entrada más WRITER_ALLOWANCE. El escritor xlsx suma una cantidad acotada que
+no crece con el catálogo: por hoja en paralelo, un bloque de ROW_BLOCK filas
+de XML más su spool comprimido en memoria.
+tests/test_normalize_memory.py aplica el mismo límite a 200k filas.
+
+Uso:
+    python -m benchmarks.bench_normalize_memory --rows 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.services.excel_normalize_service import normalize_excel_bytes
+from app.services.excel_parallel_writer import PART_SPOOL_MAX_MEMORY, XLSX_WRITER_THREADS
+
+MB = 1024 * 1024
+# Memoria del escritor por hoja en paralelo: spool en memoria + bloque de XML
+WRITER_ALLOWANCE = XLSX_WRITER_THREADS * (PART_SPOOL_MAX_MEMORY + 16 * MB)
+MAX_RATIO = 2.0
+
+
+def build_parsed(rows: int, seed: int = 0) -> tuple[pd.DataFrame, dict, dict]:
+    rng = np.random.default_rng(seed)
+    nombres = np.array([f"PRODUCTO {i}" for i in range(rows // 2)] + [""], dtype=object)
+    df = pd.DataFrame({
+        "CODIGO": np.where(rng.random(rows) < 0.1, "", [f"P{i:08d}" for i in range(rows)]).astype(object),
+        "NOMBRE": nombres[rng.integers(0, len(nombres), rows)],
+        "DESCRIPCION": np.array(["CAFE NANDU", "LECHE 15 L", ""], dtype=object)[rng.integers(0, 3, rows)],
+        "CATEGORIA": np.array(["BEBIDAS", "LACTEOS", ""], dtype=object)[rng.integers(0, 3, rows)],
+        "PRECIO DE COSTO": np.round(rng.normal(20, 15, rows), 2).astype(object),
+        "PRECIO DE VENTA": np.round(rng.normal(25, 15, rows), 2).astype(object),
+        "UNIDAD": np.array(["UNIDAD", "CAJA", "KILOGRAMO"], dtype=object)[rng.integers(0, 3, rows)],
+        "CANTIDAD": rng.integers(-5, 500, rows).astype(object),
+        "MARCA": np.array(["ACME", "S/M"], dtype=object)[rng.integers(0, 2, rows)],
+        "MODELO": "S/M",
+        "ALMACENABLE": np.array(["SI", "NO"], dtype=object)[rng.integers(0, 2, rows)],
+    })
+    meta = {
+        "col_codigo": "CODIGO",
+        "col_nombre": "NOMBRE",
+        "col_codigo_padre": None,
+        "col_codigo_alterno": None,
+        "col_desc": "DESCRIPCION",
+        "col_cat": "CATEGORIA",
+        "col_pcost": "PRECIO DE COSTO",
+        "col_pventa": "PRECIO DE VENTA",
+        "col_unidad": "UNIDAD",
+        "col_stock": "CANTIDAD",
+        "col_stock_min": None,
+        "col_marca": "MARCA",
+        "col_modelo": "MODELO",
+        "col_porcentaje": None,
+        "col_almacenable": "ALMACENABLE",
+    }
+    return df, meta, {"rows_before": rows}
+
+
+def measure(rows: int, sheets=None) -> dict:
+    """Corre normalize_excel_bytes bajo tracemalloc y devuelve los picos (bytes)."""
+    parsed = build_parsed(rows)
+    base = int(parsed[0].memory_usage(deep=True).sum())
+
+    # pico hasta antes de escribir = pipeline pandas (sin el escritor xlsx)
+    etapas = {}
+
+    def progress(stage, value):
+        etapas[stage] = tracemalloc.get_traced_memory()[1]
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        _, stats = normalize_excel_bytes(
+            b"", parsed=parsed, apply_igv_cost=True, out=path, sheets=sheets, progress=progress
+        )
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        os.remove(path)
+    return {"base": base, "pipeline": etapas["escritura"], "total": peak, "elapsed": elapsed, "stats": stats}
+
+
+def allowed_peak(base: int, max_ratio: float = MAX_RATIO) -> int:
+    """Pico permitido para toda la corrida: max_ratio x entrada + lo acotado del escritor."""
+    return int(max_ratio * base + WRITER_ALLOWANCE)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--max-ratio", type=float, default=MAX_RATIO, help="pico permitido / tamaño del DF de entrada (más WRITER_ALLOWANCE)")
+    parser.add_argument("--sheets", default=None, help="CSV de hojas (default: todas)")
+    args = parser.parse_args()
+
+    r = measure(args.rows, args.sheets.split(",") if args.sheets else None)
+    base, stats = r["base"], r["stats"]
+    limite = allowed_peak(base, args.max_ratio)
+    print(f"{args.rows} filas  entrada {base / MB:.1f} MB  {r['elapsed']:.1f} s")
+    print(
+        f"pico pipeline {r['pipeline'] / MB:.1f} MB ({r['pipeline'] / base:.2f}x)  "
+        f"pico total {r['total'] / MB:.1f} MB ({r['total'] / base:.2f}x)  "
+        f"límite {limite / MB:.1f} MB ({args.max_ratio}x + escritor {WRITER_ALLOWANCE / MB:.0f} MB)"
+    )
+    print(f"rows_ok={stats['rows_ok']} rows_corrected={stats['rows_corrected']} errors={stats['errors_count']}")
+    if r["total"] > limite:
+        print(f"FALLA: pico total {r['total'] / MB:.1f} MB > {limite / MB:.1f} MB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
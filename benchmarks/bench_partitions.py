@@ -0,0 +1,64 @@
+"""
+Escalamiento de normalize_excel_bytes con particiones (1..N procesos) sobre
+el catálogo sintético de bench_normalize_memory (sin leer xlsx). Reporta el
+total y la parte particionada (limpieza + auditoría); la escritura no se
+particiona. Verifica que los stats sean iguales para todo N.
+
+Uso:
+    python -m benchmarks.bench_partitions --rows 500000 --max-cores 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.services.excel_normalize_service import normalize_excel_bytes
+from app.services.excel_partitions import warm_up
+from benchmarks.bench_normalize_memory import build_parsed
+
+STATS_KEYS = ("rows_before", "rows_ok", "rows_corrected", "errors_count", "codes_fixed")
+
+
+def run(parsed, partitions: int, sheets) -> tuple[float, dict, dict]:
+    if partitions > 1:
+        warm_up(partitions)
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        t0 = time.perf_counter()
+        _, stats = normalize_excel_bytes(
+            b"", parsed=parsed, apply_igv_cost=True, out=path, sheets=sheets, partitions=partitions,
+        )
+        elapsed = time.perf_counter() - t0
+    finally:
+        os.remove(path)
+    etapas = {s["stage"]: s["seconds"] for s in stats["stages"]}
+    return elapsed, etapas, {k: stats[k] for k in STATS_KEYS}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--max-cores", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sheets", default=None, help="CSV de hojas (default: todas)")
+    args = parser.parse_args()
+
+    parsed = build_parsed(args.rows)
+    sheets = args.sheets.split(",") if args.sheets else None
+    base = None
+    for n in range(1, args.max_cores + 1):
+        elapsed, etapas, stats = run(parsed, n, sheets)
+        particionado = etapas.get("limpieza", 0.0) + etapas.get("auditoria", 0.0)
+        if base is None:
+            base = (elapsed, particionado, stats)
+        elif stats != base[2]:
+            raise SystemExit(f"FALLA: stats distintos con {n} particiones: {stats} vs {base[2]}")
+        print(
+            f"{n:2d} núcleos  total {elapsed:7.2f} s ({base[0] / elapsed:4.2f}x)  "
+            f"limpieza+auditoría {particionado:6.2f} s ({base[1] / particionado:4.2f}x)  "
+            f"escritura {etapas.get('escritura', 0.0):6.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
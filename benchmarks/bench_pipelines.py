@@ -0,0 +1,219 @@
+"""
+Suite de regresión de los tres pipelines sobre catálogos sintéticos
+(benchmarks.synthetic_catalog): normalize_excel_bytes,
+generar_excel_conversion_bytes y build_conversion_qa_excel_bytes.
+
+Cada caso (pipeline x tamaño) corre en un subproceso propio para que el
+pico de RSS sea solo suyo. Reporta tiempo por etapa, filas/s y pico de
+RSS (mediana de --repeat corridas); --out guarda el resultado como JSON y
+--compare lo contrasta con un baseline anterior: sale con 1 si algo empeora
+más que --tolerance y además más que --min-delta-s / --min-delta-mb (en
+casos chicos un 25% son milisegundos de ruido).
+
+Uso:
+    python -m benchmarks.bench_pipelines --sizes 1k,10k,100k --out baseline.json
+    python -m benchmarks.bench_pipelines --sizes 1k,10k,100k --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_catalog import cached_catalog, parse_size
+
+PIPELINES = ("normalize", "conversion", "conversion_qa")
+LAYOUTS = {"normalize": "normal", "conversion": "conversion", "conversion_qa": "conversion"}
+MB = 1024 * 1024
+
+
+# ============================================================
+# Un caso (se ejecuta en el subproceso)
+# ============================================================
+def run_case(pipeline: str, path: str) -> dict:
+    import pandas as pd
+
+    from app.services.conversion_processor import generar_excel_conversion_bytes
+    from app.services.excel_conversion_service import (
+        build_conversion_df_from_file,
+        build_conversion_qa_excel_bytes,
+    )
+    from app.services.excel_normalize_service import normalize_excel_bytes
+    from app.services.stage_metrics import _rss_peak_bytes
+
+    fd, out = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    rss_start = _rss_peak_bytes()
+    try:
+        t0 = time.perf_counter()
+        if pipeline == "normalize":
+            with open(path, "rb") as f:
+                data = f.read()
+            _, stats = normalize_excel_bytes(data, apply_igv_cost=True, out=out)
+            stages = stats["stages"]
+        elif pipeline == "conversion":
+            _, stats = generar_excel_conversion_bytes(path, apply_igv_cost=True, apply_igv_sale=True, out=out)
+            stages = stats["stages"]
+        else:
+            # build_conversion_qa_excel_bytes recibe el DF ya leído: la lectura se mide aquí
+            df = build_conversion_df_from_file(path)
+            lectura = {
+                "stage": "lectura", "seconds": time.perf_counter() - t0,
+                "rows": len(df), "peak_bytes": _rss_peak_bytes(),
+            }
+            _, stats = build_conversion_qa_excel_bytes(df, apply_igv_cost=True, out=out)
+            stages = [lectura] + stats["stages"]
+        elapsed = time.perf_counter() - t0
+    finally:
+        os.remove(out)
+
+    rows = stats["rows_before"]
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(_rss_peak_bytes() / MB, 1),
+        "start_rss_mb": round(rss_start / MB, 1),
+        "stages": {
+            s["stage"]: {
+                "seconds": round(s["seconds"], 4),
+                "rows": s["rows"],
+                "rows_per_s": round(s["rows"] / s["seconds"], 1) if s["rows"] and s["seconds"] else None,
+                "peak_rss_mb": round(s["peak_bytes"] / MB, 1) if s["peak_bytes"] is not None else None,
+            }
+            for s in stages
+        },
+        "pandas": pd.__version__,
+    }
+
+
+def run_subprocess(pipeline: str, path: str) -> dict:
+    env = {**os.environ, "STAGE_MEMORY": "rss"}
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_pipelines", "--case", pipeline, "--path", path],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{pipeline} falló:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def median_result(runs: list[dict]) -> dict:
+    """La corrida de tiempo mediano, con la mediana del pico de RSS."""
+    runs = sorted(runs, key=lambda r: r["seconds"])
+    r = dict(runs[len(runs) // 2])
+    r["peak_rss_mb"] = statistics.median(x["peak_rss_mb"] for x in runs)
+    r["repeat"] = len(runs)
+    return r
+
+
+# ============================================================
+# Comparación con baseline
+# ============================================================
+def compare(
+    current: dict, baseline: dict, tolerance: float, min_delta_s: float = 0.0, min_delta_mb: float = 0.0,
+) -> list[str]:
+    """Casos que empeoran más de tolerance y más del delta mínimo en tiempo o pico de RSS."""
+    regresiones = []
+    for key, cur in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            print(f"{key:24s} (sin baseline)")
+            continue
+        t_ratio = cur["seconds"] / base["seconds"] if base["seconds"] else 1.0
+        m_ratio = cur["peak_rss_mb"] / base["peak_rss_mb"] if base["peak_rss_mb"] else 1.0
+        t_peor = t_ratio > 1 + tolerance and cur["seconds"] - base["seconds"] > min_delta_s
+        m_peor = m_ratio > 1 + tolerance and cur["peak_rss_mb"] - base["peak_rss_mb"] > min_delta_mb
+        marca = ""
+        if t_peor or m_peor:
+            marca = "  REGRESIÓN"
+            regresiones.append(key)
+        print(
+            f"{key:24s} tiempo {base['seconds']:8.2f} -> {cur['seconds']:8.2f} s ({t_ratio:5.2f}x)  "
+            f"rss {base['peak_rss_mb']:7.1f} -> {cur['peak_rss_mb']:7.1f} MB ({m_ratio:5.2f}x){marca}"
+        )
+        for stage, s in cur["stages"].items():
+            b = base["stages"].get(stage)
+            if b and b["seconds"]:
+                print(f"    {stage:10s} {b['seconds']:8.2f} -> {s['seconds']:8.2f} s ({s['seconds'] / b['seconds']:5.2f}x)")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1k,10k,100k", help="CSV de tamaños: 1k,10k,100k,500k o números")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help="CSV de " + ", ".join(PIPELINES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--conversions", type=int, default=5, help="columnas de conversión del layout conversion")
+    parser.add_argument("--cache-dir", default=None, help="carpeta de los libros generados (default: temp)")
+    parser.add_argument("--out", default=None, help="guardar resultados como JSON (baseline)")
+    parser.add_argument("--compare", default=None, help="baseline JSON con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="empeoramiento permitido (0.25 = +25%%)")
+    parser.add_argument("--min-delta-s", type=float, default=0.25, help="empeoramiento mínimo en segundos para fallar")
+    parser.add_argument("--min-delta-mb", type=float, default=16.0, help="empeoramiento mínimo de RSS en MB para fallar")
+    parser.add_argument("--repeat", type=int, default=3, help="corridas por caso (se toma la mediana)")
+    # interno: un solo caso, imprime JSON
+    parser.add_argument("--case", choices=PIPELINES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.path)))
+        return
+
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    invalidos = set(pipelines) - set(PIPELINES)
+    if invalidos:
+        parser.error(f"pipelines inválidos: {sorted(invalidos)}")
+
+    results = {}
+    for size in args.sizes.split(","):
+        rows = parse_size(size.strip())
+        for pipeline in pipelines:
+            path = cached_catalog(
+                rows, layout=LAYOUTS[pipeline], seed=args.seed,
+                conversiones=args.conversions, cache_dir=args.cache_dir,
+            )
+            r = median_result([run_subprocess(pipeline, path) for _ in range(max(1, args.repeat))])
+            results[f"{pipeline}/{rows}"] = r
+            etapas = "  ".join(f"{k} {v['seconds']:.2f}s" for k, v in r["stages"].items())
+            print(
+                f"{pipeline:14s} {rows:>7d} filas  {r['seconds']:8.2f} s  {r['rows_per_s']:>10,.0f} filas/s  "
+                f"rss {r['peak_rss_mb']:7.1f} MB  | {etapas}"
+            )
+
+    current = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "conversions": args.conversions,
+            "repeat": args.repeat,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+        print(f"resultados en {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regresiones = compare(current, baseline, args.tolerance, args.min_delta_s, args.min_delta_mb)
+        if regresiones:
+            print(
+                f"FALLA: {len(regresiones)} caso(s) empeoran más de {args.tolerance:.0%} "
+                f"(y más de {args.min_delta_s:g} s / {args.min_delta_mb:g} MB): {', '.join(regresiones)}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Motor de texto python (object) vs arrow (string[pyarrow]): limpieza encadenada
+con apply_unique, duplicados por NOMBRE, groupby y XML de la hoja, sobre una
+columna de texto repetido. Sin pyarrow solo se mide python.
+
+Uso:
+    python -m benchmarks.bench_string_engine --cells 1000000
+"""
+import argparse
+import importlib.util
+import time
+
+import pandas as pd
+
+from app.services import excel_cleaners
+from app.services.excel_cleaners import apply_unique, clean_alnum_spaces, duplicated_values, normalize_text_value
+from app.services.excel_parallel_writer import _column_cells
+from benchmarks.bench_text_normalize import build_series
+
+
+def run(raw: pd.Series, arrow: bool) -> dict:
+    excel_cleaners.ARROW_STRINGS = arrow
+    tiempos = {}
+
+    t0 = time.perf_counter()
+    s = apply_unique(raw, normalize_text_value)
+    s = apply_unique(s, clean_alnum_spaces)
+    tiempos["limpieza"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    dup = duplicated_values(s)
+    tiempos["duplicated"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    s[dup].groupby(s[dup], sort=True).size()
+    tiempos["groupby"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    rows = [str(r) for r in range(2, 2 + len(s))]
+    _column_cells(s, "A", rows)
+    tiempos["xml"] = time.perf_counter() - t0
+
+    tiempos["dtype"] = str(s.dtype)
+    tiempos["MB"] = s.memory_usage(deep=True) / (1024 * 1024)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cells", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=50_000)
+    args = parser.parse_args()
+
+    raw = build_series(args.cells, args.distinct)
+    engines = [("python", False)]
+    if importlib.util.find_spec("pyarrow") is not None:
+        engines.append(("arrow", True))
+    else:
+        print("pyarrow no está instalado: solo se mide el motor python")
+
+    for name, arrow in engines:
+        t = run(raw, arrow)
+        print(
+            f"{name:7s} limpieza {t['limpieza']:6.2f} s  duplicated {t['duplicated']:6.3f} s  "
+            f"groupby {t['groupby']:6.3f} s  xml {t['xml']:6.2f} s  {t['dtype']:>15s} {t['MB']:7.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark de normalización de texto: normalize_text_value celda a celda
+vs normalize_text_series (operaciones .str) vs apply_unique (valores únicos + lote).
+
+Uso:
+    python -m benchmarks.bench_text_normalize --cells 1000000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from app.services.excel_cleaners import apply_unique, normalize_text_series, normalize_text_value
+
+SAMPLES = [
+    "Café  ñandú", "leche 1 . 5 L", "Agua 500 ml", "Ñoquis x2", "azúcar-rubia",
+    "Galleta  soda 6 x 40 g", "ACEITE vegetal 1 L", "Jabón líquido 250 ML",
+    "Fideo spaghetti 500 G", "  arroz extra  5 KG ", None, "",
+]
+
+
+def build_series(cells: int, distinct: int, seed: int = 0) -> pd.Series:
+    rnd = random.Random(seed)
+    pool = [
+        None if s is None else f"{s} {i}" if distinct > len(SAMPLES) else s
+        for i in range(max(1, distinct // len(SAMPLES)))
+        for s in SAMPLES
+    ]
+    return pd.Series([rnd.choice(pool) for _ in range(cells)], dtype=object)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cells", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=1_000_000,
+                        help="cantidad aproximada de valores distintos")
+    args = parser.parse_args()
+
+    s = build_series(args.cells, args.distinct)
+    print(f"{args.cells} celdas, {s.nunique(dropna=False)} valores distintos")
+
+    scalar, t_scalar = timed(lambda: s.apply(normalize_text_value))
+    vector, t_vector = timed(lambda: normalize_text_series(s))
+    unique, t_unique = timed(lambda: apply_unique(s, normalize_text_value))
+
+    assert scalar.equals(vector), "normalize_text_series difiere de normalize_text_value"
+    assert scalar.equals(unique), "apply_unique difiere de normalize_text_value"
+
+    print(f"apply(normalize_text_value)  {t_scalar:8.2f} s")
+    print(f"normalize_text_series        {t_vector:8.2f} s   x{t_scalar / t_vector:.1f}")
+    print(f"apply_unique                 {t_unique:8.2f} s   x{t_scalar / t_unique:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark de escritura del xlsx QA: pd.ExcelWriter (openpyxl normal, todo en
+memoria) vs write_sheets_xlsx (openpyxl write_only, por bloques) vs
+write_sheets_xlsx_parallel (XML propio, hojas en paralelo).
+Mide tiempo (y pico de memoria Python con --tracemalloc) y compara lo leído de vuelta.
+
+Uso:
+    python -m benchmarks.bench_xlsx_writer --rows 100000 --skip-legacy
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.services.excel_parallel_writer import write_sheets_xlsx_parallel
+from app.services.excel_writer import write_sheets_xlsx
+
+
+def build_sheets(rows: int, seed: int = 0) -> list[tuple[str, pd.DataFrame]]:
+    rng = np.random.default_rng(seed)
+    nombres = np.array([f"PRODUCTO {i}" for i in range(1000)], dtype=object)
+    productos = pd.DataFrame({
+        "Nombre": nombres[rng.integers(0, len(nombres), rows)],
+        "codigo": [f"CM{i:010d}" for i in range(rows)],
+        "Categoria": np.array(["ABARROTES", "LIMPIEZA", "SIN CATEGORIA"], dtype=object)[rng.integers(0, 3, rows)],
+        "stock": rng.integers(0, 500, rows).astype(float),
+        "stock minimo": np.where(rng.random(rows) < 0.5, np.nan, 1.0),
+        "precio costo": rng.random(rows) * 100,
+        "precio venta": rng.random(rows) * 120,
+        "porcentaje costo": 18,
+        "unidad": "UNIDAD",
+    })
+    errores = productos.iloc[: rows // 10, :6].copy()
+    return [
+        ("Errores_Detectados", errores),
+        ("Productos_OK", productos.iloc[: rows // 2]),
+        ("Productos_Corregidos", productos.iloc[rows // 2:]),
+        ("productos", productos),
+    ]
+
+
+def write_pandas(sheets, path):
+    with pd.ExcelWriter(path, engine="openpyxl") as w:
+        for name, df in sheets:
+            df.to_excel(w, index=False, sheet_name=name)
+
+
+def timed(fn, sheets, path):
+    t0 = time.perf_counter()
+    fn(sheets, path)
+    return time.perf_counter() - t0
+
+
+def measure(fn, sheets, path):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(sheets, path)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="no medir pd.ExcelWriter (lento)")
+    parser.add_argument("--tracemalloc", action="store_true", help="medir pico de memoria (más lento)")
+    args = parser.parse_args()
+
+    sheets = build_sheets(args.rows)
+    print(f"{args.rows} filas en 'productos' ({sum(len(df) for _, df in sheets)} filas en total)")
+
+    tmp = tempfile.mkdtemp()
+    writers = [
+        ("pd.ExcelWriter", write_pandas),
+        ("write_sheets_xlsx", write_sheets_xlsx),
+        ("write_sheets_xlsx_parallel", write_sheets_xlsx_parallel),
+    ]
+    if args.skip_legacy:
+        writers = writers[1:]
+
+    mb = 1024 * 1024
+    results = []
+    for name, fn in writers:
+        path = os.path.join(tmp, f"{fn.__name__}.xlsx")
+        if args.tracemalloc:
+            elapsed, peak = measure(fn, sheets, path)
+            pico = f"pico {peak / mb:8.1f} MB"
+        else:
+            elapsed, pico = timed(fn, sheets, path), ""
+        results.append((name, path))
+        print(f"{name:28s} {elapsed:8.2f} s   {os.path.getsize(path) / mb:6.1f} MB   {pico}")
+
+    base = pd.read_excel(results[0][1], sheet_name=None)
+    for name, path in results[1:]:
+        other = pd.read_excel(path, sheet_name=None)
+        assert list(base) == list(other), name
+        for k in base:
+            pd.testing.assert_frame_equal(base[k], other[k])
+
+    for _, path in results:
+        os.remove(path)
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
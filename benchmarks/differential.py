@@ -0,0 +1,293 @@
+"""
+Harness diferencial: corre los tres pipelines con dos motores lado a lado
+sobre catálogos generados y con fuzz (benchmarks.synthetic_catalog) y
+compara celda por celda (valor y tipo: '' vs vacío o 1 vs 1.0 son
+diferencias) las cuatro hojas de salida y los stats X-*.
+
+Un motor es un código fuente + variables de entorno:
+    worktree                          el árbol actual
+    git:<ref>                         app/ de un commit (p.ej. la versión escalar anterior)
+    worktree,CATALOG_STRING_ENGINE=arrow,XLSX_ENGINE=openpyxl
+
+Cada motor corre en su propio subproceso (los dos app/ no se mezclan).
+Los códigos CM generados al azar no se comparan por valor: se exige que
+estén en las mismas celdas, con formato CM + 10 alfanuméricos y sin
+repetirse. Se reporta la razón de tiempos candidato / legacy por caso.
+
+Uso:
+    python -m benchmarks.differential --legacy git:HEAD --candidate worktree
+    python -m benchmarks.differential --legacy worktree --candidate worktree,CATALOG_STRING_ENGINE=arrow --rows 5000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHEETS = ("Errores_Detectados", "Productos_OK", "Productos_Corregidos", "productos")
+STATS_KEYS = ("rows_before", "rows_ok", "rows_corrected", "errors_count", "codes_fixed")
+CM_CODE = re.compile(r"CM[A-Z0-9]{10}")
+
+# Parámetros por pipeline: solo los que aceptan también las versiones anteriores
+CASE_PARAMS = {
+    "normalize": [
+        {},
+        {"apply_igv_cost": True, "apply_igv_sale": True, "round_numeric": 2, "selected_row_ids": [5, 7, 9, 30], "tienda_nombre": "Lima"},
+    ],
+    "conversion": [
+        {},
+        {"apply_igv_cost": True, "apply_igv_sale": True, "selected_row_ids": [5, 8], "tienda_nombre": "Lima"},
+        {"apply_igv_cost": True, "is_selva": True},
+    ],
+    "conversion_qa": [
+        {},
+        {"apply_igv_cost": True, "apply_igv_sale": True, "round_numeric": 2},
+    ],
+}
+LAYOUTS = {"normalize": "normal", "conversion": "conversion", "conversion_qa": "conversion"}
+
+
+# ============================================================
+# Subproceso de un motor (solo stdlib a nivel de módulo: el app/
+# importado es el del motor, vía PYTHONPATH)
+# ============================================================
+def _run_pipeline(pipeline: str, path: str, params: dict) -> tuple[bytes, dict]:
+    if pipeline == "normalize":
+        from app.services.excel_normalize_service import normalize_excel_bytes
+
+        with open(path, "rb") as f:
+            return normalize_excel_bytes(f.read(), **params)
+    if pipeline == "conversion":
+        from app.services.conversion_processor import generar_excel_conversion_bytes
+
+        params = {**params, "selected_row_ids": set(params.get("selected_row_ids", ()))}
+        return generar_excel_conversion_bytes(path, **params)
+
+    from app.services.excel_conversion_service import build_conversion_df_from_file, build_conversion_qa_excel_bytes
+
+    return build_conversion_qa_excel_bytes(build_conversion_df_from_file(path), **params)
+
+
+def run_worker(cases_path: str, out_dir: str) -> None:
+    with open(cases_path, encoding="utf-8") as f:
+        cases = json.load(f)
+    # imports fuera de la medición de tiempos
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app.services.conversion_processor  # noqa: F401
+        import app.services.excel_conversion_service  # noqa: F401
+        import app.services.excel_normalize_service  # noqa: F401
+    results = {}
+    for case in cases:
+        t0 = time.perf_counter()
+        try:
+            # las versiones anteriores imprimen a stdout: se descarta
+            with contextlib.redirect_stdout(io.StringIO()):
+                data, stats = _run_pipeline(case["pipeline"], case["path"], case["params"])
+            with open(os.path.join(out_dir, f"{case['id']}.xlsx"), "wb") as f:
+                f.write(data)
+            results[case["id"]] = {
+                "seconds": time.perf_counter() - t0,
+                "stats": {k: stats.get(k) for k in STATS_KEYS},
+                "error": None,
+            }
+        except Exception as e:
+            results[case["id"]] = {"seconds": time.perf_counter() - t0, "stats": None, "error": f"{type(e).__name__}: {e}"}
+    with open(os.path.join(out_dir, "results.json"), "w", encoding="utf-8") as f:
+        json.dump(results, f)
+
+
+# ============================================================
+# Motores
+# ============================================================
+def parse_engine(spec: str) -> tuple[str, dict]:
+    """'git:HEAD,K=V,...' -> (fuente, env)."""
+    source, *overrides = [p.strip() for p in spec.split(",") if p.strip()]
+    if source != "worktree" and not source.startswith("git:"):
+        raise ValueError(f"motor inválido: {spec} (worktree | git:<ref>, seguido de K=V opcionales)")
+    env = {}
+    for item in overrides:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"variable inválida en el motor {spec}: {item}")
+        env[key] = value
+    return source, env
+
+
+def checkout_source(source: str, tmp: str) -> str:
+    """Carpeta con el app/ del motor (git:<ref> se extrae con git archive)."""
+    if source == "worktree":
+        return REPO_ROOT
+    ref = source[len("git:"):]
+    tar = subprocess.run(
+        ["git", "-C", REPO_ROOT, "archive", "--format=tar", ref, "app"],
+        capture_output=True, check=True,
+    ).stdout
+    dest = os.path.join(tmp, "src_" + re.sub(r"[^A-Za-z0-9_.-]", "_", ref))
+    with tarfile.open(fileobj=io.BytesIO(tar)) as t:
+        t.extractall(dest)
+    return dest
+
+
+def run_engine(spec: str, cases: list[dict], tmp: str, name: str) -> tuple[str, dict]:
+    source, overrides = parse_engine(spec)
+    src = checkout_source(source, tmp)
+    out_dir = os.path.join(tmp, name)
+    os.makedirs(out_dir, exist_ok=True)
+    cases_path = os.path.join(out_dir, "cases.json")
+    with open(cases_path, "w", encoding="utf-8") as f:
+        json.dump(cases, f)
+
+    env = {**os.environ, "PYTHONPATH": src, "WORKER_POOL_MODE": "thread", **overrides}
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", cases_path, "--out-dir", out_dir],
+        cwd=src, env=env, check=True,
+    )
+    with open(os.path.join(out_dir, "results.json"), encoding="utf-8") as f:
+        return out_dir, json.load(f)
+
+
+# ============================================================
+# Comparación
+# ============================================================
+def _cell(v):
+    """
+    (tipo, valor) tal como lo relee openpyxl: '' no es None y 1 no es 1.0.
+    Solo se enmascaran los CM generados al azar.
+    """
+    if isinstance(v, str) and CM_CODE.fullmatch(v):
+        return ("str", "<CM>")
+    return (type(v).__name__, v)
+
+
+def read_sheets(path: str) -> dict:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        return {ws.title: [list(r) for r in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+
+def check_cm_codes(sheets: dict) -> list[str]:
+    """Códigos CM de la plantilla: formato válido y sin repetir."""
+    rows = sheets.get("productos") or []
+    if not rows:
+        return []
+    problemas = []
+    for j, header in enumerate(rows[0]):
+        codigos = [r[j] for r in rows[1:] if j < len(r) and isinstance(r[j], str) and r[j].startswith("CM")]
+        generados = [c for c in codigos if CM_CODE.fullmatch(c)]
+        if not generados:
+            continue
+        if len(set(generados)) != len(generados):
+            problemas.append(f"productos[{header}]: {len(generados) - len(set(generados))} códigos CM repetidos")
+    return problemas
+
+
+def compare_outputs(path_a: str, path_b: str, max_diffs: int) -> list[str]:
+    a, b = read_sheets(path_a), read_sheets(path_b)
+    diffs = []
+    for name in SHEETS:
+        if (name in a) != (name in b):
+            diffs.append(f"{name}: hoja presente solo en {'legacy' if name in a else 'candidato'}")
+            continue
+        if name not in a:
+            continue
+        ra, rb = a[name], b[name]
+        if len(ra) != len(rb):
+            diffs.append(f"{name}: {len(ra)} filas vs {len(rb)}")
+        for i, (fa, fb) in enumerate(zip(ra, rb), start=1):
+            width = max(len(fa), len(fb))
+            fa, fb = fa + [None] * (width - len(fa)), fb + [None] * (width - len(fb))
+            for j, (va, vb) in enumerate(zip(fa, fb)):
+                if _cell(va) != _cell(vb):
+                    diffs.append(f"{name}!R{i}C{j + 1}: {va!r} ({type(va).__name__}) vs {vb!r} ({type(vb).__name__})")
+                    if len(diffs) >= max_diffs:
+                        return diffs
+    diffs += [f"legacy {p}" for p in check_cm_codes(a)]
+    diffs += [f"candidato {p}" for p in check_cm_codes(b)]
+    return diffs
+
+
+def build_cases(args) -> list[dict]:
+    from benchmarks.synthetic_catalog import cached_catalog
+
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    cases = []
+    for seed in range(args.seeds):
+        for fuzz in (0.0, args.fuzz):
+            for pipeline in pipelines:
+                path = cached_catalog(
+                    args.rows, layout=LAYOUTS[pipeline], seed=seed, fuzz=fuzz, cache_dir=args.cache_dir,
+                )
+                for k, params in enumerate(CASE_PARAMS[pipeline]):
+                    cases.append({
+                        "id": f"{pipeline}-s{seed}-f{fuzz:g}-p{k}",
+                        "pipeline": pipeline,
+                        "path": path,
+                        "params": params,
+                    })
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--legacy", default="git:HEAD", help="motor de referencia (default: git:HEAD)")
+    parser.add_argument("--candidate", default="worktree", help="motor a validar (default: worktree)")
+    parser.add_argument("--pipelines", default="normalize,conversion,conversion_qa")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--fuzz", type=float, default=0.05, help="probabilidad de celda basura en los casos con fuzz")
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--max-diffs", type=int, default=10, help="diferencias mostradas por caso")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.out_dir)
+        return
+
+    cases = build_cases(args)
+    with tempfile.TemporaryDirectory(prefix="differential_") as tmp:
+        dir_a, res_a = run_engine(args.legacy, cases, tmp, "legacy")
+        dir_b, res_b = run_engine(args.candidate, cases, tmp, "candidate")
+
+        fallas = 0
+        for case in cases:
+            cid = case["id"]
+            a, b = res_a[cid], res_b[cid]
+            ratio = b["seconds"] / a["seconds"] if a["seconds"] else float("nan")
+            if a["error"] or b["error"]:
+                diffs = [] if a["error"] == b["error"] else [f"error: {a['error']!r} vs {b['error']!r}"]
+            else:
+                diffs = [
+                    f"stats {k}: {a['stats'][k]!r} vs {b['stats'][k]!r}"
+                    for k in STATS_KEYS if a["stats"][k] != b["stats"][k]
+                ]
+                diffs += compare_outputs(
+                    os.path.join(dir_a, f"{cid}.xlsx"), os.path.join(dir_b, f"{cid}.xlsx"), args.max_diffs,
+                )
+            fallas += bool(diffs)
+            print(
+                f"{'OK  ' if not diffs else 'FAIL'} {cid:32s} legacy {a['seconds']:7.2f} s  "
+                f"candidato {b['seconds']:7.2f} s  ({ratio:5.2f}x)"
+            )
+            for d in diffs[: args.max_diffs]:
+                print(f"      {d}")
+
+    print(f"{len(cases) - fallas}/{len(cases)} casos iguales ({args.legacy} vs {args.candidate})")
+    if fallas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
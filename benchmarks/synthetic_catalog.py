@@ -0,0 +1,275 @@
+"""
+Generador de catálogos sintéticos (semilla fija) para los benchmarks de
+pipelines: mismo formato que las plantillas reales (título, dos filas
+vacías y encabezados en la fila 4) con datos sucios: precios con texto,
+comas o negativos, códigos cortos y duplicados, abreviaturas de unidad,
+nombres con tildes/ñ y N columnas de conversión (layout de conversión).
+Con fuzz > 0 además se quitan columnas opcionales, se cambia la escritura
+de los encabezados y se inyectan celdas basura y filas vacías.
+
+Uso:
+    python -m benchmarks.synthetic_catalog --layout normal --rows 10000 --out catalogo.xlsx
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+
+from openpyxl import Workbook
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "500k": 500_000}
+
+NORMAL_HEADERS = [
+    "CODIGO", "NOMBRE", "CODIGO PADRE", "DESCRIPCION", "CATEGORIA", "PRECIO DE COSTO",
+    "PRECIO DE VENTA", "UNIDAD", "CANTIDAD", "STOCK MINIMO", "MARCA", "MODELO",
+    "ALMACENABLE", "PORCENTAJE",
+]
+CONVERSION_HEADERS = [
+    "CODIGO DEL PRODUCTO", "CODIGO PADRE", "NOMBRE DEL PRODUCTO", "DESCRIPCION", "CATEGORIA",
+    "PRECIO DE COSTO", "PRECIO DE VENTA PRINCIPAL", "UNIDAD", "STOCK", "STOCK MINIMO", "MARCA",
+    "MODELO", "ALMACENABLE", "PRECIO LISTA 2", "PRECIO LISTA 3",
+]
+
+PRODUCTOS = [
+    "Café tostado", "Azúcar rubia", "Jabón líquido", "Ñoquis de papa", "Leche evaporada",
+    "Aceite vegetal", "Fideo spaghetti", "Galleta de soda", "Atún en aceite", "Limón sutil",
+    "Champú anticaspa", "Detergente en polvo", "Papel higiénico", "Agua de mesa", "Pan de molde",
+]
+PRESENTACIONES = ["1 L", "500 ml", "1 kg", "250 g", "x 6", "x12", "1.5 L", "", "2 x 40 g"]
+CATEGORIAS = ["Bebidas", "Lácteos", "Limpieza", "Abarrotes", "Panadería", "Cuidado personal", "", None, "***"]
+UNIDADES = ["UND", "und.", "Unid", "CJ", "caja x12", "Paq.", "PQT", "KG", "kg.", "Lt", "BOT", "BOLSA", "", None]
+MARCAS = ["ACME", " acme ", "Gloria", "Nestlé", "Alicorp", "", None, "S/M"]
+MODELOS = ["X1", "", None, "Estándar", "Clásico"]
+ALMACENABLE = ["SI", "si", "NO", "s", None, 1]
+
+# Columnas que el fuzz nunca quita (sin ellas los pipelines no aplican)
+FUZZ_REQUIRED = {"CODIGO", "NOMBRE", "CODIGO DEL PRODUCTO", "NOMBRE DEL PRODUCTO", "PRECIO LISTA 3"}
+BASURA = [
+    True, False, 0, -0.0, 1e20, -1e-9, 3.14159265358979, "NULL", "nan", "None", "  ", "-",
+    "ß€@#", "1,234.50", "12.345,6", "=1+1", "ÁÉÍÓÚ ñ", "x" * 300, datetime.datetime(2024, 2, 29, 13, 45),
+]
+
+
+def _precio(rnd: random.Random):
+    """Precio sucio: número, texto con coma o S/, negativo, vacío o basura."""
+    r = rnd.random()
+    valor = round(rnd.uniform(0.5, 150), 2)
+    if r < 0.70:
+        return valor
+    if r < 0.78:
+        return f"{valor:.2f}".replace(".", ",")
+    if r < 0.84:
+        return f"S/ {valor:.2f}"
+    if r < 0.88:
+        return -valor
+    if r < 0.94:
+        return None
+    return rnd.choice(["abc", "1.2.3", "NULL", "-", "0"])
+
+
+def _codigo(rnd: random.Random, i: int, vistos: list):
+    """Código válido, duplicado, corto, numérico, con símbolos o vacío."""
+    r = rnd.random()
+    if r < 0.70 or not vistos:
+        codigo = f"P{i:07d}"
+        vistos.append(codigo)
+        return codigo
+    if r < 0.80:
+        return rnd.choice(vistos)
+    if r < 0.86:
+        return rnd.choice(["AB", "X1", "7", "0012"])
+    if r < 0.90:
+        return rnd.randint(1000, 999_999)
+    if r < 0.94:
+        return rnd.choice(["ab-12#", "  cod 33 ", "Ñ-001"])
+    return None
+
+
+def _nombre(rnd: random.Random, distintos: int):
+    """Nombres con tildes/ñ y ruido de espacios/mayúsculas; ~distintos valores posibles."""
+    k = rnd.randrange(distintos)
+    base = f"{PRODUCTOS[k % len(PRODUCTOS)]} {PRESENTACIONES[k % len(PRESENTACIONES)]} {k // len(PRODUCTOS)}"
+    r = rnd.random()
+    if r < 0.1:
+        return base.upper()
+    if r < 0.15:
+        return f"  {base}  "
+    if r < 0.17:
+        return None
+    return base
+
+
+def _stock(rnd: random.Random):
+    r = rnd.random()
+    if r < 0.85:
+        return rnd.randint(0, 500)
+    if r < 0.90:
+        return -rnd.randint(1, 10)
+    if r < 0.95:
+        return str(rnd.randint(0, 50))
+    return None
+
+
+def _fila_normal(rnd: random.Random, i: int, vistos: list, distintos: int) -> list:
+    return [
+        _codigo(rnd, i, vistos),
+        _nombre(rnd, distintos),
+        rnd.choice([None, None, "PADRE1", "PA", 55555]),
+        rnd.choice(["Descripción de prueba", "Sin azúcar", "", None, "Envase retornable"]),
+        rnd.choice(CATEGORIAS),
+        _precio(rnd),
+        _precio(rnd),
+        rnd.choice(UNIDADES),
+        _stock(rnd),
+        rnd.choice([None, 1, 5, "2"]),
+        rnd.choice(MARCAS),
+        rnd.choice(MODELOS),
+        rnd.choice(ALMACENABLE),
+        rnd.choice([18, None, 0, 10, "12.5"]),
+    ]
+
+
+def _fila_conversion(rnd: random.Random, i: int, vistos: list, distintos: int, conversiones: int) -> list:
+    fila = [
+        _codigo(rnd, i, vistos),
+        rnd.choice([None, None, "PADRE1"]),
+        _nombre(rnd, distintos),
+        rnd.choice(["Descripción de prueba", "", None]),
+        rnd.choice(CATEGORIAS),
+        _precio(rnd),
+        _precio(rnd),
+        rnd.choice(UNIDADES),
+        _stock(rnd),
+        rnd.choice([None, 1, 5]),
+        rnd.choice(MARCAS),
+        rnd.choice(MODELOS),
+        rnd.choice(ALMACENABLE),
+        rnd.choice([None, _precio(rnd)]),
+        rnd.choice([None, _precio(rnd)]),
+    ]
+    # Conversiones dispersas: la mayoría de productos tiene 0-2
+    fila.extend(rnd.choice([None, None, None, rnd.randint(2, 48)]) for _ in range(conversiones))
+    return fila
+
+
+def _encabezado_fuzz(rnd: random.Random, h: str) -> str:
+    """Misma columna escrita distinto (minúsculas, tildes, espacios)."""
+    return rnd.choice([h, h.lower(), h.title(), f" {h} ", h.replace("CODIGO", "CÓDIGO").replace("DESCRIPCION", "DESCRIPCIÓN")])
+
+
+def write_catalog(
+    path: str,
+    rows: int,
+    layout: str = "normal",
+    seed: int = 0,
+    conversiones: int = 5,
+    fuzz: float = 0.0,
+) -> str:
+    """
+    Escribe el libro sintético en path (openpyxl write_only) y devuelve path.
+    fuzz: probabilidad por celda de basura / por fila de fila vacía.
+    """
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Plantilla")
+    ws.append(["PLANTILLA DE CARGA MASIVA"])
+    ws.append([])
+    ws.append([])
+
+    vistos = []
+    distintos = max(1, int(rows * 0.8))  # ~20% de nombres repetidos
+    if layout == "normal":
+        headers = list(NORMAL_HEADERS)
+        fila = lambda i: _fila_normal(rnd, i, vistos, distintos)
+    elif layout == "conversion":
+        headers = CONVERSION_HEADERS + [f"CAJA X{6 * (k + 1)}" for k in range(conversiones)]
+        fila = lambda i: _fila_conversion(rnd, i, vistos, distintos, conversiones)
+    else:
+        raise ValueError(f"layout inválido: {layout} (normal | conversion)")
+
+    columnas = list(range(len(headers)))
+    if fuzz:
+        columnas = [j for j in columnas if headers[j] in FUZZ_REQUIRED or rnd.random() > fuzz * 2]
+        headers = [_encabezado_fuzz(rnd, h) for h in headers]
+
+    ws.append([headers[j] for j in columnas])
+    for i in range(rows):
+        valores = fila(i)
+        if fuzz:
+            if rnd.random() < fuzz:
+                ws.append([])
+            valores = [rnd.choice(BASURA) if rnd.random() < fuzz else v for v in valores]
+        ws.append([valores[j] for j in columnas])
+
+    wb.save(path)
+    return path
+
+
+def catalog_frame(rows: int, layout: str = "normal", seed: int = 0, conversiones: int = 5):
+    """Los mismos datos de write_catalog (sin fuzz) como DataFrame, sin pasar por xlsx."""
+    import pandas as pd
+
+    rnd = random.Random(seed)
+    vistos = []
+    distintos = max(1, int(rows * 0.8))
+    if layout == "normal":
+        headers = list(NORMAL_HEADERS)
+        filas = [_fila_normal(rnd, i, vistos, distintos) for i in range(rows)]
+    elif layout == "conversion":
+        headers = CONVERSION_HEADERS + [f"CAJA X{6 * (k + 1)}" for k in range(conversiones)]
+        filas = [_fila_conversion(rnd, i, vistos, distintos, conversiones) for i in range(rows)]
+    else:
+        raise ValueError(f"layout inválido: {layout} (normal | conversion)")
+    return pd.DataFrame(filas, columns=headers)
+
+
+def cached_catalog(
+    rows: int,
+    layout: str = "normal",
+    seed: int = 0,
+    conversiones: int = 5,
+    cache_dir: str = None,
+    fuzz: float = 0.0,
+) -> str:
+    """Ruta del libro sintético; se genera una sola vez por (layout, filas, semilla, conversiones, fuzz)."""
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "bench_catalogs")
+    os.makedirs(cache_dir, exist_ok=True)
+    name = (
+        f"{layout}_{rows}_s{seed}"
+        + (f"_c{conversiones}" if layout == "conversion" else "")
+        + (f"_f{fuzz:g}" if fuzz else "")
+        + ".xlsx"
+    )
+    path = os.path.join(cache_dir, name)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        write_catalog(tmp, rows, layout=layout, seed=seed, conversiones=conversiones, fuzz=fuzz)
+        os.replace(tmp, path)
+    return path
+
+
+def parse_size(value: str) -> int:
+    """'10k' -> 10000 (también acepta números)."""
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--layout", choices=("normal", "conversion"), default="normal")
+    parser.add_argument("--rows", default="10k", help="1k | 10k | 100k | 500k o un número")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--conversions", type=int, default=5)
+    parser.add_argument("--fuzz", type=float, default=0.0, help="probabilidad de celda basura (0 = sin fuzz)")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    write_catalog(
+        args.out, parse_size(args.rows), layout=args.layout, seed=args.seed,
+        conversiones=args.conversions, fuzz=args.fuzz,
+    )
+    print(f"{args.out}: {os.path.getsize(args.out) / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
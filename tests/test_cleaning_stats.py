@@ -0,0 +1,38 @@
+"""
+Con el WorkerPool en modo process la limpieza corre en otros procesos: sus
+contadores del memo vuelven con cada resultado y se suman en el de la API.
+"""
+import asyncio
+
+import pandas as pd
+
+from app.services.excel_cleaners import apply_unique, cleaning_cache_stats, normalize_text_value
+from app.services.worker_pool import WorkerPool
+
+
+def _clean(values: list) -> list:
+    return apply_unique(pd.Series(values, dtype=object), normalize_text_value, memo=True).tolist()
+
+
+def test_process_pool_memo_stats_reach_parent():
+    values = ["  ácido ", "ACIDO", "  ácido ", None, "sal"]
+
+    async def main():
+        pool = WorkerPool("process", size=1, max_queue=2, start_method="spawn")
+        try:
+            first = await pool.run(_clean, values)
+            second = await pool.run(_clean, values)
+        finally:
+            pool.shutdown()
+        return first, second
+
+    before = cleaning_cache_stats()
+    first, second = asyncio.run(main())
+    after = cleaning_cache_stats()
+
+    assert first == second == _clean(values)
+    assert after["cells"] - before["cells"] == 2 * len(values)
+    # Segunda pasada: los 3 valores distintos salen del memo del worker
+    assert after["memo_misses"] - before["memo_misses"] == 3
+    assert after["memo_hits"] - before["memo_hits"] == 3
+    assert after["memo_processes"] == before["memo_processes"] + 1
@@ -0,0 +1,80 @@
+"""
+JobManager: un job cancelado mientras corre sigue pendiente (cancelling) hasta
+que el worker devuelve el cupo, y el estado no arrastra las listas por fila.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.job_queue import JobManager, JobQueueFullError
+from app.services.worker_pool import WorkerPool
+
+
+def _pipeline(release: threading.Event, progress, out):
+    # Avanza por etapas hasta que el test lo suelte (progress corta si se canceló)
+    progress("limpieza", 0.5)
+    release.wait(5)
+    progress("escritura", 0.9)
+    with open(out, "wb") as f:
+        f.write(b"ok")
+    return None, {"rows_before": 3, "codigos_info": [{"codigo": "x"}] * 3, "stages": []}
+
+
+async def _wait(jobs: JobManager, job_id: str, statuses: tuple) -> dict:
+    for _ in range(500):
+        status = jobs.status(job_id)
+        if status["status"] in statuses:
+            return status
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{job_id}: {status['status']}")
+
+
+def test_cancel_running_job_keeps_it_pending(tmp_path):
+    async def main():
+        pool = WorkerPool("thread", size=1, max_queue=4, start_method="spawn")
+        jobs = JobManager(pool, max_pending=1, ttl_seconds=60, result_dir=str(tmp_path))
+        entrada = tmp_path / "entrada.xlsx"
+        entrada.write_bytes(b"x")
+        release = threading.Event()
+        job = jobs.submit("normalize", _pipeline, {"release": release}, "a.xlsx", "x", cleanup=(str(entrada),))
+        await _wait(jobs, job["job_id"], ("running",))
+
+        assert jobs.cancel(job["job_id"])["status"] == "cancelling"
+        # El worker sigue ocupando el cupo: cuenta para max_pending y conserva su entrada
+        with pytest.raises(JobQueueFullError):
+            jobs.submit("normalize", _pipeline, {"release": release}, "b.xlsx", "x")
+        assert entrada.exists()
+
+        release.set()
+        await _wait(jobs, job["job_id"], ("cancelled",))
+        assert not entrada.exists()
+        assert pool.stats()["running"] == 0
+
+        done = jobs.submit("normalize", _pipeline, {"release": release}, "c.xlsx", "x")
+        status = await _wait(jobs, done["job_id"], ("done",))
+        assert status["stats"] == {"rows_before": 3, "stages": []}
+        pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancel_queued_job_is_immediate(tmp_path):
+    async def main():
+        pool = WorkerPool("thread", size=1, max_queue=4, start_method="spawn")
+        jobs = JobManager(pool, max_pending=4, ttl_seconds=60, result_dir=str(tmp_path))
+        release = threading.Event()
+        first = jobs.submit("normalize", _pipeline, {"release": release}, "a.xlsx", "x")
+        await _wait(jobs, first["job_id"], ("running",))
+        queued = jobs.submit("normalize", _pipeline, {"release": release}, "b.xlsx", "x")
+        await asyncio.sleep(0.05)
+
+        assert jobs.cancel(queued["job_id"])["status"] == "cancelled"
+        release.set()
+        await _wait(jobs, first["job_id"], ("done",))
+        await asyncio.sleep(0.05)
+        assert pool.stats()["running"] == 0
+        assert pool.stats()["queue_depth"] == 0
+        pool.shutdown()
+
+    asyncio.run(main())
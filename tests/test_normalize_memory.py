@@ -0,0 +1,23 @@
+"""
+Pico de memoria (tracemalloc) de normalize_excel_bytes a 200k filas, con la
+escritura incluida: a lo sumo 2x el DF de entrada más lo acotado del
+escritor xlsx (ver benchmarks.bench_normalize_memory.WRITER_ALLOWANCE).
+"""
+from benchmarks.bench_normalize_memory import MAX_RATIO, MB, WRITER_ALLOWANCE, allowed_peak, measure
+
+ROWS = 200_000
+
+
+def test_normalize_peak_memory_200k():
+    r = measure(ROWS)
+    base = r["base"]
+
+    # Sin el escritor, el pipeline pandas queda en MAX_RATIO x la entrada
+    assert r["pipeline"] <= MAX_RATIO * base, (
+        f"pico antes de escribir {r['pipeline'] / MB:.1f} MB > {MAX_RATIO}x {base / MB:.1f} MB"
+    )
+    # Toda la corrida: el escritor solo suma una cantidad que no crece con el catálogo
+    assert r["total"] <= allowed_peak(base), (
+        f"pico total {r['total'] / MB:.1f} MB > {MAX_RATIO}x {base / MB:.1f} MB + {WRITER_ALLOWANCE / MB:.0f} MB"
+    )
+    assert r["stats"]["rows_before"] == ROWS
@@ -0,0 +1,78 @@
+"""
+El escritor paralelo (XLSX_ENGINE=parallel) debe producir las mismas celdas
+que openpyxl (XLSX_ENGINE=openpyxl): mismo valor y mismo tipo al releer.
+"""
+import datetime
+import io
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from app.services import excel_writer
+from app.services.excel_normalize_service import normalize_excel_bytes
+from app.services.excel_parallel_writer import write_sheets_xlsx_parallel
+from benchmarks.synthetic_catalog import write_catalog
+
+CM = re.compile(r"^CM[A-Z0-9]{10}$")
+
+
+def _raw_cells(data: bytes) -> dict:
+    """{hoja: [[(valor, tipo), ...], ...]} leído con openpyxl, códigos CM enmascarados."""
+    wb = load_workbook(io.BytesIO(data))
+    out = {}
+    for ws in wb.worksheets:
+        out[ws.title] = [
+            [("CM#" if isinstance(v, str) and CM.match(v) else v, type(v).__name__) for v in row]
+            for row in ws.iter_rows(values_only=True)
+        ]
+    return out
+
+
+def _both_engines(sheets) -> tuple[dict, dict]:
+    a, b = io.BytesIO(), io.BytesIO()
+    excel_writer.write_sheets_xlsx(sheets, a)
+    write_sheets_xlsx_parallel(sheets, b)
+    return _raw_cells(a.getvalue()), _raw_cells(b.getvalue())
+
+
+def _assert_same(expected: dict, actual: dict) -> None:
+    assert list(expected) == list(actual)
+    for name in expected:
+        assert len(expected[name]) == len(actual[name]), name
+        for i, (row_e, row_a) in enumerate(zip(expected[name], actual[name]), start=1):
+            assert row_e == row_a, f"{name} fila {i}"
+
+
+def test_cell_types_match_openpyxl():
+    df = pd.DataFrame({
+        "int": [1, -2, 0, 12345678901234567],
+        "float": [1.0, 2.5, np.nan, 0.1 + 0.2],
+        "inf": [np.inf, -np.inf, 3.0, 1e20],
+        "texto": ["a", "", None, "  b "],
+        "mixto": [1, 1.0, "", True],
+        "bool": [True, False, True, False],
+        "fecha": [datetime.datetime(2024, 2, 29, 13, 45), None, datetime.datetime(2020, 1, 1), None],
+        "dia": [datetime.date(2024, 1, 1), datetime.date(1999, 12, 31), None, None],
+        "cat": pd.Categorical(["x", "", None, "x"]),
+    })
+    expected, actual = _both_engines([("Hoja", df), ("Vacia", df.iloc[:0])])
+    _assert_same(expected, actual)
+
+
+@pytest.fixture(scope="module")
+def fuzzed_catalog(tmp_path_factory) -> bytes:
+    path = tmp_path_factory.mktemp("catalogo") / "fuzz.xlsx"
+    write_catalog(str(path), 2000, seed=3, fuzz=0.05)
+    return path.read_bytes()
+
+
+def test_normalize_output_matches_openpyxl_engine(fuzzed_catalog, monkeypatch):
+    results = {}
+    for engine in ("openpyxl", "parallel"):
+        monkeypatch.setattr(excel_writer, "XLSX_ENGINE", engine)
+        data, _ = normalize_excel_bytes(fuzzed_catalog, apply_igv_cost=True, round_numeric=2)
+        results[engine] = _raw_cells(data)
+    _assert_same(results["openpyxl"], results["parallel"])
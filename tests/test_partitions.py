@@ -0,0 +1,29 @@
+"""
+Pool de particiones en modo process: si un proceso muere (p.ej. OOM) falla
+esa llamada, pero la siguiente arma un pool nuevo.
+"""
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import pytest
+
+from app.services import excel_partitions
+from app.services.excel_partitions import map_partitions
+
+
+def _die(chunk: pd.DataFrame, offset: int) -> None:
+    os._exit(1)
+
+
+def _rows(chunk: pd.DataFrame, offset: int) -> list:
+    return [offset + i for i in range(len(chunk))]
+
+
+def test_broken_partition_pool_is_rebuilt(monkeypatch):
+    monkeypatch.setattr(excel_partitions, "NORMALIZE_PARTITION_MODE", "process")
+    df = pd.DataFrame({"a": range(6)})
+
+    with pytest.raises(BrokenProcessPool):
+        map_partitions(_die, df, 2)
+    assert map_partitions(_rows, df, 2) == [[0, 1, 2], [3, 4, 5]]
@@ -0,0 +1,34 @@
+"""
+Métricas por etapa: el pico del modo rss se mide dentro de cada etapa (no es
+el ru_maxrss del proceso) y el texto Prometheus no redondea los valores.
+"""
+import pytest
+
+from app.services import stage_metrics
+from app.services.stage_metrics import MB, Histogram, StageRecorder, _rss_bytes
+
+
+@pytest.mark.skipif(_rss_bytes() is None, reason="sin /proc/self/statm")
+def test_rss_peak_is_per_stage(monkeypatch):
+    monkeypatch.setattr(stage_metrics, "STAGE_MEMORY", "rss")
+    report = StageRecorder()
+    report("lectura", 0.0)
+    grande = bytearray(256 * MB)
+    del grande
+    report("limpieza", 0.5)
+    stages = {s["stage"]: s["peak_bytes"] for s in report.close()}
+
+    assert stages["lectura"] >= 256 * MB
+    # Una etapa posterior más liviana no hereda el pico de la anterior
+    assert stages["limpieza"] < stages["lectura"] - 128 * MB
+
+
+def test_render_keeps_exact_numbers():
+    h = Histogram("x_bytes", "prueba", (16 * MB, 0.1), ("stage",))
+    h.observe(1234.5678, stage="a")
+    h.observe(16 * MB, stage="a")
+    lines = h.render()
+
+    assert 'x_bytes_bucket{stage="a",le="0.1"} 0' in lines
+    assert 'x_bytes_bucket{stage="a",le="16777216.0"} 2' in lines
+    assert f'x_bytes_sum{{stage="a"}} {16 * MB + 1234.5678!r}' in lines
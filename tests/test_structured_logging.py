@@ -0,0 +1,35 @@
+"""
+logger.exception() a través de la cola: el evento queda limpio y el
+traceback va en el campo "exc".
+"""
+import io
+import json
+import logging
+import queue
+
+from app.services.structured_logging import JsonFormatter, _QueueHandler
+
+
+def test_exception_keeps_event_and_exc_field():
+    q = queue.SimpleQueue()
+    logger = logging.getLogger("test.structured_logging")
+    logger.propagate = False
+    handler = _QueueHandler(q)
+    logger.addHandler(handler)
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("request.error")
+    finally:
+        logger.removeHandler(handler)
+
+    stream = io.StringIO()
+    out = logging.StreamHandler(stream)
+    out.setFormatter(JsonFormatter())
+    out.handle(q.get_nowait())
+    payload = json.loads(stream.getvalue())
+
+    assert payload["event"] == "request.error"
+    assert payload["exc"].startswith("Traceback")
+    assert "ValueError: boom" in payload["exc"]
@@ -0,0 +1,104 @@
+"""
+Derrames a disco: cada proceso usa su carpeta spill_dir/<host>-<pid>, la
+re-indexa al arrancar y reclama solo las de procesos muertos del mismo host.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from app.services.excel_reader import read_catalog_sheet
+from app.services.upload_store import LocalUploadStore
+from benchmarks.synthetic_catalog import write_catalog
+
+
+def _store(spill_dir, max_disk_bytes=1000, ttl_seconds=60) -> LocalUploadStore:
+    return LocalUploadStore(
+        max_memory_bytes=0, ttl_seconds=ttl_seconds, spill_dir=str(spill_dir), max_disk_bytes=max_disk_bytes,
+    )
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_restart_reindexes_own_spill_dir(tmp_path):
+    first = _store(tmp_path)
+    first.put("a", b"x" * 100)
+    first.put("b", b"y" * 100)
+    own = first.spill_dir
+    assert os.path.dirname(own) == str(tmp_path)
+    assert sorted(os.listdir(own)) == ["a.xlsx", "b.xlsx"]
+
+    restarted = _store(tmp_path)
+    assert restarted.stats()["disk_entries"] == 2
+    assert restarted.stats()["disk_bytes"] == 200
+    # Lo derramado se entrega como ruta (el worker la mapea)
+    assert restarted.get("a") == os.path.join(own, "a.xlsx")
+    restarted.delete("a")
+    assert os.listdir(own) == ["b.xlsx"]
+
+
+def test_restart_drops_expired_and_over_budget(tmp_path):
+    own = tmp_path / f"{socket.gethostname()}-{os.getpid()}"
+    own.mkdir()
+    (own / "viejo.xlsx").write_bytes(b"v" * 10)
+    antiguo = time.time() - 120
+    os.utime(own / "viejo.xlsx", (antiguo, antiguo))
+    for i, name in enumerate(("uno", "dos", "tres")):
+        (own / f"{name}.xlsx").write_bytes(b"z" * 40)
+        os.utime(own / f"{name}.xlsx", (time.time() - 30 + i, time.time() - 30 + i))
+    (own / "otro.tmp").write_bytes(b"?")
+
+    store = _store(tmp_path, max_disk_bytes=100)
+    stats = store.stats()
+    assert stats["expired"] == 1
+    assert stats["disk_evictions"] == 1
+    assert stats["disk_bytes"] == 80
+    # Se borra el más antiguo primero; lo que no es un derrame no se toca
+    assert sorted(os.listdir(own)) == ["dos.xlsx", "otro.tmp", "tres.xlsx"]
+
+
+def test_claims_only_dead_processes(tmp_path):
+    host = socket.gethostname()
+    dead = tmp_path / f"{host}-{_dead_pid()}"
+    alive = tmp_path / f"{host}-{os.getppid()}"
+    remote = tmp_path / f"otro-host-{_dead_pid()}"
+    for d in (dead, alive, remote):
+        d.mkdir()
+        (d / f"{d.name}.xlsx").write_bytes(b"w" * 10)
+
+    store = _store(tmp_path)
+    assert not dead.exists()
+    assert store.get(dead.name) == os.path.join(store.spill_dir, f"{dead.name}.xlsx")
+    # Un proceso vivo u otro host conservan sus archivos
+    assert os.listdir(alive) == [f"{alive.name}.xlsx"]
+    assert os.listdir(remote) == [f"{remote.name}.xlsx"]
+    assert store.get(alive.name) is None
+
+
+def test_missing_spill_file_is_a_miss(tmp_path):
+    store = _store(tmp_path)
+    store.put("a", b"x" * 100)
+    os.remove(store.get("a"))
+
+    assert store.get("a") is None
+    stats = store.stats()
+    assert stats["disk_entries"] == 0
+    assert stats["disk_bytes"] == 0
+    assert stats["misses"] == 1
+
+
+def test_spilled_upload_reads_from_path(tmp_path):
+    data = write_catalog(str(tmp_path / "catalogo.xlsx"), 50)
+    with open(data, "rb") as f:
+        content = f.read()
+    store = _store(tmp_path / "spill", max_disk_bytes=len(content) * 2)
+    store.put("c", content)
+
+    path = store.get("c")
+    assert isinstance(path, str)
+    assert read_catalog_sheet(path).equals(read_catalog_sheet(content))
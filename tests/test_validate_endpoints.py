@@ -0,0 +1,66 @@
+"""
+/excel/validate y /conversion/validate: mismas claves de counters (con
+rows_corrected igual al X-Rows-Corrected de la descarga) y el mismo manejo
+de errores que /conversion/excel; con la etapa memoizada no se mandan los
+bytes del upload al worker.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes.upload import UPLOADS, prepared_inputs
+from benchmarks.synthetic_catalog import write_catalog
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def _catalog(tmp_path, layout: str) -> bytes:
+    path = tmp_path / f"{layout}.xlsx"
+    write_catalog(str(path), 300, layout=layout, seed=4)
+    return path.read_bytes()
+
+
+def test_validate_counters_match_downloads(client, tmp_path):
+    normal = _catalog(tmp_path, "normal")
+    upload_id = client.post("/excel/analyze", files={"file": ("a.xlsx", normal)}).json()["upload_id"]
+    excel = client.post(f"/excel/validate?upload_id={upload_id}", json=[])
+    descarga = client.post(f"/excel/normalize?upload_id={upload_id}", json=[])
+
+    conversion = _catalog(tmp_path, "conversion")
+    conv = client.post("/conversion/validate", files={"file": ("c.xlsx", conversion)})
+    conv_descarga = client.post("/conversion/excel", files={"file": ("c.xlsx", conversion)})
+
+    assert excel.status_code == conv.status_code == 200
+    assert set(excel.json()["counters"]) == set(conv.json()["counters"])
+    for validate, download in ((excel, descarga), (conv, conv_descarga)):
+        counters = validate.json()["counters"]
+        assert counters["rows_corrected"] == int(download.headers["x-rows-corrected"])
+        assert counters["rows_ok"] == int(download.headers["x-rows-ok"])
+
+
+def test_conversion_validate_maps_errors(client):
+    basura = b"no es un xlsx"
+    excel = client.post("/conversion/excel", files={"file": ("c.xlsx", basura)})
+    validate = client.post("/conversion/validate", files={"file": ("c.xlsx", basura)})
+
+    assert validate.status_code == excel.status_code == 500
+    assert validate.json()["detail"]
+
+
+def test_prepared_inputs_skip_upload_bytes(client, tmp_path):
+    normal = _catalog(tmp_path, "normal")
+    upload_id = client.post("/excel/analyze", files={"file": ("a.xlsx", normal)}).json()["upload_id"]
+    content = UPLOADS.get(upload_id)
+
+    # analyze dejó el intermedio parseado
+    assert prepared_inputs(upload_id, [], content)["excel_bytes"] == b""
+    client.post(f"/excel/validate?upload_id={upload_id}", json=[])
+    inputs = prepared_inputs(upload_id, [], content)
+    assert inputs["prepared"] is not None and inputs["excel_bytes"] == b""
+
+    UPLOADS.delete(upload_id)
+    assert prepared_inputs(upload_id, [], content)["excel_bytes"] is content
@@ -0,0 +1,93 @@
+"""
+WorkerPool en modo process: se recrea una sola vez cuando un worker muere,
+y no se recrea por un BrokenProcessPool que lanzó la función misma;
+run_with_cleanup limpia recién cuando el worker terminó.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.worker_pool import WorkerPool
+
+
+def _die(delay: float) -> None:
+    time.sleep(delay)
+    os._exit(1)
+
+
+def _slow(delay: float) -> int:
+    time.sleep(delay)
+    return 1
+
+
+def _write_late(path: str, delay: float) -> None:
+    time.sleep(delay)
+    with open(path, "wb") as f:
+        f.write(b"x")
+
+
+def _inner_broken() -> None:
+    raise BrokenProcessPool("pool interno roto")
+
+
+def _pool(size: int = 2) -> WorkerPool:
+    return WorkerPool("process", size=size, max_queue=4, start_method="spawn")
+
+
+def test_dead_worker_restarts_pool_once():
+    async def main():
+        pool = _pool()
+        try:
+            results = await asyncio.gather(pool.run(_die, 0.2), pool.run(_die, 0.2), return_exceptions=True)
+            assert all(isinstance(r, BrokenProcessPool) for r in results)
+            assert pool.stats()["pool_restarts"] == 1
+            assert await pool.run(_slow, 0.0) == 1
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_broken_pool_raised_by_fn_keeps_pool():
+    async def main():
+        pool = _pool(size=1)
+        try:
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(_inner_broken)
+            assert pool.stats()["pool_restarts"] == 0
+            assert await pool.run(_slow, 0.0) == 1
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancelled_run_cleans_up_after_worker(tmp_path):
+    path = str(tmp_path / "qa_out.xlsx")
+    cleaned = []
+
+    def cleanup():
+        cleaned.append(os.path.exists(path))
+        if os.path.exists(path):
+            os.remove(path)
+
+    async def main():
+        pool = _pool(size=1)
+        try:
+            task = asyncio.ensure_future(pool.run_with_cleanup(cleanup, _write_late, path, 1.0))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # el worker sigue corriendo: todavía no se limpió nada
+            assert cleaned == []
+            assert await pool.run(_slow, 0.0) == 1
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+    assert cleaned == [True]
+    assert not os.path.exists(path)